@@ -2,17 +2,59 @@
 Silver Jewellery Studio - Material Tracker
 Main application entry point (refactored version)
 """
-from nicegui import ui
-from typing import Optional
+import os
+import sys
+
+import startup_profile
+
+# `python app_new.py --profile-startup` reports where startup time goes, then exits
+PROFILE_STARTUP = '--profile-startup' in sys.argv
+if PROFILE_STARTUP:
+    startup_profile.enable()
+
+# `python app_new.py --production` (or APP_ENV=production) runs without the
+# reloader, for the studio PC rather than development
+PRODUCTION = '--production' in sys.argv or os.environ.get('APP_ENV') == 'production'
+
+from nicegui import app, ui  # noqa: E402
+from typing import Optional  # noqa: E402
+
+import http_client  # noqa: E402
+import page_metrics  # noqa: E402
+import price_refresh  # noqa: E402
+import price_scheduler  # noqa: E402
+from database import Database  # noqa: E402
+
+# In production the schema and backup checks run once, from the startup hook
+# below, rather than while the pages are imported
+Database.defer_prepare = PRODUCTION
+
+from silver_price_fetcher import silver_fetcher  # noqa: E402
 
 # Import all page functions
-from pages.dashboard import dashboard_page
-from pages.students import students_page, student_detail_page
-from pages.materials import materials_page
-from pages.projects import projects_page
-from pages.purchases import purchases_page
-from pages.payments import payments_page
-from pages.payments_report import payments_report_page
+from pages.dashboard import dashboard_page  # noqa: E402
+from pages.students import students_page, student_detail_page  # noqa: E402
+from pages.materials import materials_page  # noqa: E402
+from pages.projects import projects_page  # noqa: E402
+from pages.purchases import purchases_page  # noqa: E402
+from pages.payments import payments_page  # noqa: E402
+from pages.payments_report import payments_report_page  # noqa: E402
+
+PORT = int(os.environ.get('APP_PORT', 8080))
+
+# Page metrics wrap every Database method and connection, so they are on in
+# development and off in production unless PAGE_METRICS=1
+PAGE_METRICS = os.environ.get('PAGE_METRICS', '0' if PRODUCTION else '1') == '1'
+
+# Seconds shutdown waits for background work to save, and for open
+# connections to close in production
+SHUTDOWN_TIMEOUT = 10
+
+
+# Time every page render and count its database work; slow renders are
+# logged to slow_pages.log with a per-query breakdown
+if PAGE_METRICS:
+    page_metrics.install()
 
 
 # Register all pages
@@ -56,6 +98,47 @@ def payments_report(filter: Optional[str] = None):
     payments_report_page(filter_type=filter)
 
 
+def prepare_database():
+    """Run the schema and backup checks deferred while the pages were imported"""
+    Database.defer_prepare = False
+    Database()
+
+
+def finish_background_writes():
+    """Let background price work save what it has fetched before the process exits"""
+    price_scheduler.stop()
+    price_refresh.stop_current_job(timeout=SHUTDOWN_TIMEOUT)
+    if not silver_fetcher.wait(timeout=SHUTDOWN_TIMEOUT):
+        print("⚠️ Silver price refresh still running at shutdown")
+    http_client.close()
+
+
+if PRODUCTION:
+    app.on_startup(prepare_database)
+
+# Refresh the stalest supplier prices in the background while the app is running
+app.on_startup(lambda: price_scheduler.start(Database()))
+app.on_shutdown(finish_background_writes)
+
+# Warm the silver price so the first dashboard visit doesn't find it missing
+app.on_startup(silver_fetcher.current)
+
+
+if PROFILE_STARTUP:
+    # Registered last so the time to ready includes the other startup hooks
+    app.on_startup(lambda: startup_profile.profile.app_started(PORT))
+
+
 # Run the app
 if __name__ in {"__main__", "__mp_main__"}:
-    ui.run(title='Silver Jewellery Studio Tracker', port=8080, reload=True)
+    if PRODUCTION:
+        try:
+            ui.run(title='Silver Jewellery Studio Tracker', port=PORT, reload=False,
+                   # Tablets reuse their connection between page loads; open
+                   # websockets get a bounded time to close on shutdown
+                   timeout_keep_alive=30, timeout_graceful_shutdown=SHUTDOWN_TIMEOUT, access_log=False)
+        except KeyboardInterrupt:
+            pass  # Ctrl+C: the shutdown hooks have already run
+    else:
+        # The reloader would import the app twice, so profile without it
+        ui.run(title='Silver Jewellery Studio Tracker', port=PORT, reload=not PROFILE_STARTUP)
@@ -0,0 +1,174 @@
+"""Local stand-in for the supplier sites, serving the recorded fixture pages.
+
+Lets the scrapers run (and be measured) with no network. Every product URL
+names a fixture page, so any number of distinct materials can point at the
+same recorded page:
+
+    /cooksongold.com/<fixture>/<id>     product page (any id)
+    /metalclay.co.uk/<fixture>/<id>     Metal Clay product page
+    /<supplier>/listing?page=N          category listing of LISTING_SIZE products per page
+    /silver                             the silver price page
+
+The supplier host in the path routes URLs to the right scraper, which picks
+its parser by the supplier name in the URL. Pages carry an ETag, so
+revalidations are answered 304 unless --no-etag is given.
+
+    python benchmarks/fixture_server.py --port 8765 --latency 80 --jitter 40 --error-rate 0.02
+"""
+import argparse
+import hashlib
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# Products per listing page, and listing pages per category
+LISTING_SIZE = 24
+LISTING_PAGES = 5
+
+_PRODUCT_PATH_RE = re.compile(r'^/(?P<supplier>[\w.-]+)/(?P<fixture>[\w-]+)(?:/.*)?$')
+
+
+class FixtureConfig:
+    """Behaviour of the stand-in server"""
+
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0, error_rate: float = 0,
+                 etag: bool = True, fixtures_dir: str = FIXTURES_DIR):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.etag = etag
+        self.pages: Dict[str, bytes] = {}
+        for name in os.listdir(fixtures_dir):
+            if name.endswith('.html'):
+                with open(os.path.join(fixtures_dir, name), 'rb') as f:
+                    self.pages[name[:-5]] = f.read()
+        self.stats = {'requests': 0, 'ok': 0, 'not_modified': 0, 'errors': 0}
+        self._lock = threading.Lock()
+
+    def count(self, key: str):
+        with self._lock:
+            self.stats['requests'] += 1
+            self.stats[key] += 1
+
+    def delay(self):
+        if self.latency_ms or self.jitter_ms:
+            time.sleep(max(0.0, random.gauss(self.latency_ms, self.jitter_ms)) / 1000)
+
+
+def listing_page(supplier: str, page: int, fixtures) -> bytes:
+    """A category listing of fixture products, with rel=next pagination"""
+    cards = []
+    for i in range(LISTING_SIZE):
+        product_id = (page - 1) * LISTING_SIZE + i
+        fixture = fixtures[product_id % len(fixtures)]
+        price = 1 + (product_id % 97) * 0.37
+        cards.append(f'<li class="product"><a href="/{supplier}/{fixture}/{product_id}">Product {product_id}</a>'
+                     f'<span class="price">£{price:.2f}</span></li>')
+    next_link = f'<a rel="next" href="/{supplier}/listing?page={page + 1}">Next</a>' if page < LISTING_PAGES else ''
+    return (f'<html><head><title>Listing page {page}</title></head><body><h1>Category</h1>'
+            f'<ul class="products">{"".join(cards)}</ul>{next_link}</body></html>').encode()
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    config: FixtureConfig  # set on the class by make_server()
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real sites
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        config = self.config
+        config.delay()
+        if config.error_rate and random.random() < config.error_rate:
+            config.count('errors')
+            self._send(503, b'Service Unavailable')
+            return
+
+        body = self._route()
+        if body is None:
+            config.count('errors')
+            self._send(404, b'Not Found')
+            return
+
+        etag = f'"{hashlib.md5(body).hexdigest()}"' if config.etag else None
+        if etag and self.headers.get('If-None-Match') == etag:
+            config.count('not_modified')
+            self._send(304, b'', etag)
+            return
+        config.count('ok')
+        self._send(200, body, etag)
+
+    def _route(self) -> Optional[bytes]:
+        parsed = urlparse(self.path)
+        if parsed.path == '/silver':
+            return self.config.pages.get('cooksongold_sheet')
+        match = _PRODUCT_PATH_RE.match(parsed.path)
+        if not match:
+            return None
+        supplier, fixture = match.group('supplier'), match.group('fixture')
+        if fixture == 'listing':
+            page = int(parse_qs(parsed.query).get('page', ['1'])[0])
+            prefix = supplier.split('.')[0]
+            fixtures = sorted(name for name in self.config.pages if name.startswith(prefix)) or \
+                sorted(self.config.pages)
+            return listing_page(supplier, page, fixtures) if 1 <= page <= LISTING_PAGES else None
+        return self.config.pages.get(fixture)
+
+    def _send(self, status: int, body: bytes, etag: Optional[str] = None):
+        self.send_response(status)
+        if status != 304:
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        if etag:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+
+def make_server(config: FixtureConfig, port: int = 0, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """A fixture server (port 0 picks a free port; see server.server_address)"""
+    handler = type('ConfiguredFixtureHandler', (FixtureHandler,), {'config': config})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_in_background(config: FixtureConfig, port: int = 0) -> ThreadingHTTPServer:
+    """Start a fixture server on a daemon thread; stop it with server.shutdown()"""
+    server = make_server(config, port)
+    threading.Thread(target=server.serve_forever, name='fixture-server', daemon=True).start()
+    return server
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0, help='mean response delay in ms')
+    parser.add_argument('--jitter', type=float, default=0, help='standard deviation of the delay in ms')
+    parser.add_argument('--error-rate', type=float, default=0, help='fraction of requests answered 503')
+    parser.add_argument('--no-etag', action='store_true', help='never answer 304')
+    args = parser.parse_args()
+
+    config = FixtureConfig(args.latency, args.jitter, args.error_rate, etag=not args.no_etag)
+    server = make_server(config, args.port)
+    print(f"Serving {len(config.pages)} fixture pages on http://127.0.0.1:{server.server_address[1]}/ "
+          f"({', '.join(sorted(config.pages))})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(f"Requests: {config.stats}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,208 @@
+"""N+1 check: render every page against a realistic database and count its queries.
+
+Seeds a scratch database (students across classes, materials across
+categories, projects, purchases and payments), starts the app on it with
+page_metrics logging every render and requests each page. Then does the same
+again with --scale times as much data. Fails if a page errors, runs more SQL
+statements than its limit at the first size, or runs more statements at the
+second size than the first: a count that grows with the data is an N+1.
+
+    python benchmarks/page_queries.py
+    python benchmarks/page_queries.py --students 200 --purchases 3000 --scale 3
+    python benchmarks/page_queries.py --max-queries 25     # same limit for every page
+
+The per-query breakdown of every render at the larger size is printed at the end.
+"""
+import argparse
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Statements allowed per render at the first data size
+PAGE_QUERY_LIMITS = {
+    '/': 55,
+    '/students': 10,
+    '/student/1': 10,
+    '/materials': 15,
+    '/projects': 20,
+    '/purchases': 35,
+    '/payments': 5,
+    '/payments_report': 5,
+}
+
+# Known N+1s, allowed to grow by this many statements per added row while
+# they are fixed: the dashboard loads each student separately, and the
+# projects and purchases pages run two queries per project. Any other page
+# growing, or these growing faster, fails
+KNOWN_GROWTH = {
+    '/': ('students', 1),
+    '/projects': ('projects', 2),
+    '/purchases': ('projects', 2),
+}
+
+# "2026-01-02 10:00:00 /materials 17 ms: 6 statements, 3 connections, 5 rows"
+_SUMMARY_RE = re.compile(r'^\S+ \S+ (?P<label>.+) (?P<ms>\d+) ms: (?P<statements>\d+) statements, '
+                         r'(?P<connections>\d+) connections, (?P<rows>\d+) rows$')
+
+
+def seed(students: int, materials: int, projects: int, purchases: int, seed_value: int = 1):
+    """Fill the database in the current directory"""
+    from database import Database
+    random.seed(seed_value)
+    db = Database()
+    classes = ['Monday', 'Tuesday', 'Wednesday', 'Thursday Evening']
+    categories = ['Sheet Silver', 'Wire', 'Findings', 'Chain', 'Tools']
+    student_ids = [db.add_student(f'Student {i}', class_name=classes[i % len(classes)]) for i in range(students)]
+    material_ids = [db.add_material(f'Material {i}', categories[i % len(categories)], 'item', 1 + i % 17,
+                                    markup_percentage=20) for i in range(materials)]
+    project_ids = [db.add_project(f'Project {i}') for i in range(projects)]
+    for i in range(purchases):
+        db.add_purchase(random.choice(student_ids), random.choice(material_ids), random.randint(1, 5),
+                        project_id=random.choice(project_ids) if i % 3 == 0 else None,
+                        purchase_date=f'2026-{1 + i % 12:02d}-{1 + i % 28:02d} 10:00:00')
+    for i in range(purchases // 4):
+        db.add_payment(random.choice(student_ids), random.randint(5, 50), 'Cash',
+                       payment_date=f'2026-{1 + i % 12:02d}-{1 + i % 28:02d}')
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _get(url: str) -> int:
+    try:
+        with urllib.request.urlopen(url, timeout=60) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def read_renders(log_path: str) -> Dict[str, Dict]:
+    """{page label: summary numbers} of the last render of each page in the log"""
+    renders = {}
+    if not os.path.exists(log_path):
+        return renders
+    with open(log_path, encoding='utf-8') as f:
+        for line in f:
+            match = _SUMMARY_RE.match(line.rstrip('\n'))
+            if match:
+                renders[match.group('label')] = {key: int(value) for key, value in match.groupdict().items()
+                                                 if key != 'label'}
+    return renders
+
+
+def measure(sizes: Dict[str, int], max_queries: int) -> Tuple[Dict[str, int], Dict[str, Dict], str]:
+    """Seed a scratch database of this size, request every page once and
+    return ({path: status}, {path: render numbers}, the log of every render)"""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='page-queries-') as scratch:
+        os.chdir(scratch)
+        try:
+            seed(**sizes)
+            port = _free_port()
+            log_path = os.path.join(scratch, 'pages.log')
+            env = dict(os.environ, APP_PORT=str(port), SLOW_PAGE_SECONDS='0', SLOW_PAGE_LOG=log_path,
+                       MAX_PAGE_QUERIES=str(max_queries), PRICE_SCHEDULE_INTERVAL='0',
+                       PAGE_METRICS='1')
+            server = subprocess.Popen([sys.executable, os.path.join(ROOT, 'app_new.py'), '--production'],
+                                      env=env, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+            try:
+                base_url = f'http://127.0.0.1:{port}'
+                deadline = time.monotonic() + 60
+                while time.monotonic() < deadline:
+                    try:
+                        _get(base_url + '/students')
+                        break
+                    except OSError:
+                        time.sleep(0.2)
+                statuses = {path: _get(base_url + path) for path in PAGE_QUERY_LIMITS}
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+
+            renders = read_renders(log_path)
+            breakdown = ''
+            if os.path.exists(log_path):
+                with open(log_path, encoding='utf-8') as f:
+                    breakdown = f.read()
+        finally:
+            os.chdir(cwd)
+
+    # Pages with parameters are logged under their route, e.g. /student/{student_id} (student_id=1)
+    by_path = {}
+    for path in statuses:
+        by_path[path] = next((numbers for label, numbers in renders.items()
+                              if label == path or label.startswith(path.rsplit('/', 1)[0] + '/{')), None)
+    return statuses, by_path, breakdown
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--students', type=int, default=40)
+    parser.add_argument('--materials', type=int, default=60)
+    parser.add_argument('--projects', type=int, default=8)
+    parser.add_argument('--purchases', type=int, default=400)
+    parser.add_argument('--scale', type=float, default=2,
+                        help='the second run has this many times the data (default: %(default)s)')
+    parser.add_argument('--max-queries', type=int, default=0,
+                        help='statement limit for every page, also enforced inside the app '
+                             '(default: the per-page limits)')
+    args = parser.parse_args()
+
+    small = {'students': args.students, 'materials': args.materials,
+             'projects': args.projects, 'purchases': args.purchases}
+    large = {name: max(count + 1, int(count * args.scale)) for name, count in small.items()}
+    small_statuses, small_renders, _ = measure(small, args.max_queries)
+    large_statuses, large_renders, breakdown = measure(large, args.max_queries)
+
+    print('\n' + breakdown)
+    for label, sizes in (('small', small), ('large', large)):
+        print(f"{label}: {sizes['students']} students, {sizes['materials']} materials, "
+              f"{sizes['projects']} projects, {sizes['purchases']} purchases")
+    print(f"\n{'page':<22}{'status':>7}{'ms':>7}{'statements':>12}{'limit':>7}{'large':>7}{'allowed':>9}"
+          f"{'connections':>13}{'rows':>7}")
+    failures = []
+    for path in PAGE_QUERY_LIMITS:
+        limit = args.max_queries or PAGE_QUERY_LIMITS[path]
+        render, larger = small_renders[path], large_renders[path]
+        rows, per_row = KNOWN_GROWTH.get(path, ('students', 0))
+        allowed = per_row * (large[rows] - small[rows])
+        if render is None or larger is None:
+            print(f"{path:<22}{small_statuses[path]:>7}")
+        else:
+            print(f"{path:<22}{small_statuses[path]:>7}{render['ms']:>7}{render['statements']:>12}{limit:>7}"
+                  f"{larger['statements']:>7}{'+' + str(allowed):>9}{render['connections']:>13}{render['rows']:>7}")
+        for statuses in (small_statuses, large_statuses):
+            if statuses[path] != 200:
+                failures.append(f"{path} answered {statuses[path]}")
+                break
+        if render is not None and render['statements'] > limit:
+            failures.append(f"{path} ran {render['statements']} statements (limit {limit})")
+        if render is not None and larger is not None and larger['statements'] - render['statements'] > allowed:
+            failures.append(f"{path} grows with the data: {render['statements']} statements, then "
+                            f"{larger['statements']} with {args.scale:g}x the rows (allowed +{allowed})")
+
+    print()
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print("✅ Every page within its query limits")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
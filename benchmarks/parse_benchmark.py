@@ -0,0 +1,178 @@
+"""Per-page parse time of the supplier scrapers on saved fixture pages.
+
+Compares the original extraction (full html.parser parse, whole-page text
+scans, regexes compiled per call) with the current one (lxml, only the
+product tags parsed, precompiled patterns) and checks both extract the same
+values.
+
+    python benchmarks/parse_benchmark.py                 # run on benchmarks/fixtures/*.html
+    python benchmarks/parse_benchmark.py --runs 50
+    python benchmarks/parse_benchmark.py --record URL NAME   # save a live page as a fixture
+
+Fixture names decide the supplier: files starting with 'metalclay' are
+parsed as Metal Clay pages, everything else as Cooksongold pages. The
+*_div_markup pages put prices and weights directly in <div>s and links, as
+many supplier templates do; record live pages with --record to check the
+parsers against the sites as they are today.
+"""
+import argparse
+import os
+import re
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+import http_client  # noqa: E402
+from metalclay_price_scraper import MetalClayPriceScraper  # noqa: E402
+from price_scraper import extract_product  # noqa: E402
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+COOKSONGOLD_URL = 'https://www.cooksongold.com/fixture'
+METALCLAY_URL = 'https://www.metalclay.co.uk/fixture/'
+
+
+# ============ ORIGINAL EXTRACTION (baseline) ============
+
+def legacy_cooksongold(content: bytes) -> dict:
+    """The Cooksongold extraction as it was before the lxml/strainer parser"""
+    soup = BeautifulSoup(content, 'html.parser')
+    result = {'inc_vat': None, 'per_gram_inc_vat': None, 'weight_per_100': None}
+
+    price_inc_vat = None
+    for element in soup.find_all(string=re.compile(r'£\d+\.\d+')):
+        text = element.strip()
+        if 'exc' not in text.lower() and price_inc_vat is None:
+            match = re.search(r'£(\d+\.\d+)', text)
+            if match:
+                price_inc_vat = float(match.group(1))
+    result['inc_vat'] = price_inc_vat
+
+    meta_price = soup.find('meta', {'itemprop': 'price'})
+    if meta_price and 'content' in meta_price.attrs:
+        content_attr = str(meta_price['content'])
+        match = re.search(r'([\d,]+\.?\d*)\s*per\s*kg', content_attr, re.IGNORECASE)
+        if match:
+            result['per_gram_inc_vat'] = float(match.group(1).replace(',', '')) / 1000
+        else:
+            match = re.search(r'([\d,]+\.?\d*)\s*per\s*g(?!\w)', content_attr, re.IGNORECASE)
+            if match:
+                result['per_gram_inc_vat'] = float(match.group(1).replace(',', ''))
+
+    page_text = soup.get_text()
+    for pattern in (r'(?:approx(?:imate)?\.?\s+)?weight\s+(?:of\s+)?100\s+(?:\w+\s+)?(?:is\s+)?(\d+\.?\d*)\s*g',
+                    r'weight\s+per\s+100[:\s]+(\d+\.?\d*)\s*g',
+                    r'100\s+(?:pieces|items|rings|units)\s+weigh\s+(?:approx(?:imately)?\.?\s+)?(\d+\.?\d*)\s*g'):
+        match = re.search(pattern, page_text, re.IGNORECASE)
+        if match:
+            result['weight_per_100'] = float(match.group(1))
+            break
+    else:
+        for item in soup.find_all(['li', 'td', 'dd']):
+            match = re.search(r'(?:weight|approx).*?100.*?(\d+\.?\d*)\s*g', item.get_text(), re.IGNORECASE)
+            if match:
+                result['weight_per_100'] = float(match.group(1))
+                break
+    return result
+
+
+def legacy_metalclay(content: bytes) -> dict:
+    """The Metal Clay extraction as it was before the lxml/strainer parser"""
+    soup = BeautifulSoup(content.decode('utf-8', errors='replace'), 'html.parser')
+    title_tag = soup.find('h1')
+    price_text = soup.get_text()
+    inc = re.search(r'£([\d,]+\.?\d*)\s*inc\.\s*VAT', price_text, re.IGNORECASE)
+    ex = re.search(r'£([\d,]+\.?\d*)\s*ex\.\s*VAT', price_text, re.IGNORECASE)
+    return {
+        'title': title_tag.get_text(strip=True) if title_tag else None,
+        'inc_vat': float(inc.group(1).replace(',', '')) if inc else None,
+        'exc_vat': float(ex.group(1).replace(',', '')) if ex else None,
+    }
+
+
+# ============ CURRENT EXTRACTION ============
+
+_metalclay = MetalClayPriceScraper()
+
+
+def current_cooksongold(content: bytes) -> dict:
+    product = extract_product(content, COOKSONGOLD_URL)
+    return {key: product[key] for key in ('inc_vat', 'per_gram_inc_vat', 'weight_per_100')}
+
+
+def current_metalclay(content: bytes) -> dict:
+    data = _metalclay.parse_product_page(content, METALCLAY_URL) or {}
+    return {'title': data.get('product_title'), 'inc_vat': data.get('price_inc_vat'),
+            'exc_vat': data.get('price_ex_vat')}
+
+
+# ============ HARNESS ============
+
+def time_ms(func, content: bytes, runs: int) -> list:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func(content)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def run(runs: int) -> int:
+    fixtures = sorted(f for f in os.listdir(FIXTURES_DIR) if f.endswith('.html'))
+    if not fixtures:
+        print(f'No fixture pages in {FIXTURES_DIR}')
+        return 1
+
+    print(f"{'page':<32}{'KB':>6}{'before ms':>12}{'after ms':>11}{'speedup':>9}  same result")
+    mismatches = 0
+    for name in fixtures:
+        with open(os.path.join(FIXTURES_DIR, name), 'rb') as f:
+            content = f.read()
+        if name.startswith('metalclay'):
+            before_func, after_func = legacy_metalclay, current_metalclay
+        else:
+            before_func, after_func = legacy_cooksongold, current_cooksongold
+
+        before, after = before_func(content), after_func(content)
+        same = all(
+            before[key] == after[key] or (isinstance(before[key], float) and after[key] is not None
+                                          and abs(before[key] - after[key]) < 1e-9)
+            for key in before
+        )
+        mismatches += not same
+
+        before_ms = statistics.median(time_ms(before_func, content, runs))
+        after_ms = statistics.median(time_ms(after_func, content, runs))
+        print(f"{name:<32}{len(content) / 1024:>6.0f}{before_ms:>12.2f}{after_ms:>11.2f}"
+              f"{before_ms / after_ms:>8.1f}x  {'yes' if same else 'NO'}")
+        if not same:
+            print(f'    before: {before}\n    after:  {after}')
+
+    return 1 if mismatches else 0
+
+
+def record(url: str, name: str) -> int:
+    response = http_client.get(url)
+    path = os.path.join(FIXTURES_DIR, name if name.endswith('.html') else f'{name}.html')
+    with open(path, 'wb') as f:
+        f.write(response.content)
+    print(f'Saved {len(response.content) / 1024:.0f} KB to {path}')
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--runs', type=int, default=20, help='timed runs per page (median is reported)')
+    parser.add_argument('--record', nargs=2, metavar=('URL', 'NAME'), help='save a live page as a fixture')
+    args = parser.parse_args()
+    if args.record:
+        return record(*args.record)
+    return run(args.runs)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""Throughput of an "Update All Prices" refresh against the local fixture server.
+
+Creates N materials pointing at recorded supplier pages served by
+benchmarks/fixture_server.py, then runs the same PriceRefreshJob as the app
+and reports pages/sec, p50/p95 fetch latency and the CPU time spent parsing.
+The first run downloads every page; later runs start with the result cache
+cleared but the page cache kept, so they measure 304 revalidation and fail
+unless every material (Metal Clay included) is revalidated with a 304 and
+reuses the product parsed from the unchanged page instead of parsing it again.
+
+Everything runs in a temporary directory (database, page cache, results
+cache), so no network and no app data are touched.
+
+    python benchmarks/refresh_benchmark.py
+    python benchmarks/refresh_benchmark.py --materials 500 --latency 120 --jitter 60 --error-rate 0.02
+    python benchmarks/refresh_benchmark.py --workers 6 --runs 3 --no-etag
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fixture_server import FixtureConfig, start_in_background  # noqa: E402
+
+# Unchanged pages reuse their parsed product, so a revalidate run may spend at
+# most this fraction of the cold run's parse CPU
+REVALIDATE_PARSE_FRACTION = 0.05
+
+# (supplier path, fixture page, pricing type) - materials cycle through these
+MATERIAL_MIX = [
+    ('cooksongold.com', 'cooksongold_sheet', 'per_kg'),
+    ('cooksongold.com', 'cooksongold_jump_rings', 'fixed'),
+    ('metalclay.co.uk', 'metalclay_clay', 'fixed'),
+]
+
+
+class Timings:
+    """Thread-safe collection of per-page fetch latency and parse CPU time"""
+
+    def __init__(self):
+        self.latencies = []
+        self.parse_cpu = 0.0
+        self._lock = threading.Lock()
+
+    def add_latency(self, seconds: float):
+        with self._lock:
+            self.latencies.append(seconds)
+
+    def add_parse_cpu(self, seconds: float):
+        with self._lock:
+            self.parse_cpu += seconds
+
+
+def percentile(values, fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class Instrumentation:
+    """Wraps the fetch and parse functions once; each run swaps in fresh Timings"""
+
+    def __init__(self):
+        import price_scraper
+        self.timings = Timings()
+        self._fetch_product = price_scraper.fetch_product
+        price_scraper.extract_product = self._cpu_timed(price_scraper.extract_product)
+        price_scraper.metalclay_scraper.parse_product_page = \
+            self._cpu_timed(price_scraper.metalclay_scraper.parse_product_page)
+
+    def _cpu_timed(self, func):
+        def wrapper(*args, **kwargs):
+            start = time.thread_time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.timings.add_parse_cpu(time.thread_time() - start)
+        return wrapper
+
+    def fetch(self, url, max_age=None):
+        start = time.perf_counter()
+        try:
+            return self._fetch_product(url, max_age=max_age)
+        finally:
+            self.timings.add_latency(time.perf_counter() - start)
+
+
+def run(args) -> int:
+    # Imported here, after moving to the scratch directory, so every cache and
+    # the database are created there
+    import price_refresh
+    from database import Database
+    from scraper_cache import results_cache
+    from supplier_health import supplier_health
+
+    config = FixtureConfig(args.latency, args.jitter, args.error_rate, etag=not args.no_etag)
+    server = start_in_background(config)
+    base_url = f'http://127.0.0.1:{server.server_address[1]}'
+
+    db = Database()
+    materials = []
+    for i in range(args.materials):
+        supplier, fixture, pricing_type = MATERIAL_MIX[i % len(MATERIAL_MIX)]
+        material_id = db.add_material(f'{fixture} {i}', 'Benchmark', 'item', 1.0,
+                                      supplier_url=f'{base_url}/{supplier}/{fixture}/{i}',
+                                      pricing_type=pricing_type)
+        materials.append(db.get_material(material_id))
+
+    print(f"\n{args.materials} materials, {args.workers} requests in flight per supplier, "
+          f"latency {args.latency:.0f}±{args.jitter:.0f} ms, error rate {args.error_rate:.0%}\n")
+    print(f"{'run':<14}{'pages/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'parse CPU ms':>14}{'per page':>10}"
+          f"{'200':>6}{'304':>6}{'errors':>8}{'failed':>8}")
+
+    instrumentation = Instrumentation()
+    failed_runs = 0
+    cold_parse_cpu = 0.0
+    for run_number in range(1, args.runs + 1):
+        results_cache.delete()
+        supplier_health.reset()
+        timings = instrumentation.timings = Timings()
+        server_before = dict(config.stats)
+
+        job = price_refresh.PriceRefreshJob(db, materials, fetch=instrumentation.fetch, per_supplier=args.workers)
+        start = time.perf_counter()
+        job.run()
+        elapsed = time.perf_counter() - start
+        state = job.snapshot()
+
+        server_delta = {key: config.stats[key] - server_before[key] for key in config.stats}
+        pages = len(timings.latencies)
+        label = 'cold' if run_number == 1 else 'revalidate'
+        print(f"{run_number}: {label:<11}{pages / elapsed:>9.1f}"
+              f"{percentile(timings.latencies, 0.5) * 1000:>9.1f}{percentile(timings.latencies, 0.95) * 1000:>9.1f}"
+              f"{timings.parse_cpu * 1000:>14.1f}{timings.parse_cpu * 1000 / max(pages, 1):>10.2f}"
+              f"{server_delta['ok']:>6}{server_delta['not_modified']:>6}{server_delta['errors']:>8}"
+              f"{state['failed'] + state['unavailable']:>8}")
+        if state['failed'] + state['unavailable'] == state['total']:
+            failed_runs += 1
+        # Every supplier's pages are already cached after the cold run, so a
+        # revalidation should cost one 304 per material and no full downloads
+        elif run_number > 1 and not args.no_etag and not args.error_rate and \
+                (server_delta['ok'] or server_delta['not_modified'] != len(materials)):
+            print(f"   expected {len(materials)} 304s and no 200s")
+            failed_runs += 1
+        elif run_number > 1 and not args.no_etag and not args.error_rate and \
+                timings.parse_cpu > cold_parse_cpu * REVALIDATE_PARSE_FRACTION:
+            print(f"   expected next to no parse CPU for unchanged pages "
+                  f"(at most {cold_parse_cpu * REVALIDATE_PARSE_FRACTION * 1000:.1f} ms)")
+            failed_runs += 1
+        if run_number == 1:
+            cold_parse_cpu = timings.parse_cpu
+
+    server.shutdown()
+    return 1 if failed_runs else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--materials', type=int, default=200, help='materials to refresh (default: %(default)s)')
+    parser.add_argument('--runs', type=int, default=2, help='refreshes to run; the first is cold (default: %(default)s)')
+    parser.add_argument('--workers', type=int, default=3, help='requests in flight per supplier (default: %(default)s)')
+    parser.add_argument('--latency', type=float, default=50, help='mean server delay in ms (default: %(default)s)')
+    parser.add_argument('--jitter', type=float, default=20, help='delay standard deviation in ms (default: %(default)s)')
+    parser.add_argument('--error-rate', type=float, default=0, help='fraction of requests answered 503')
+    parser.add_argument('--no-etag', action='store_true', help='server never answers 304')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='refresh-benchmark-') as scratch:
+        os.chdir(scratch)
+        return run(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
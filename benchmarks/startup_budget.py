@@ -0,0 +1,171 @@
+"""Check that the app's startup stays within its time budget.
+
+Two checks, both in a scratch directory so a new empty database is created
+there rather than touching the studio's data:
+
+  - imports app_new in fresh interpreters, fails if the median import time is
+    over budget or if any module that should load on first use (the supplier
+    scrapers) was imported at startup
+  - runs `app_new.py --profile-startup` (see startup_profile.py) and fails if
+    any phase - imports, schema checks, backup check, page registration, time
+    to ready and to the first response - is over its budget, or regressed
+    beyond the tolerance against a saved baseline
+
+    python benchmarks/startup_budget.py
+    python benchmarks/startup_budget.py --save-baseline startup_baseline.json
+    python benchmarks/startup_budget.py --baseline startup_baseline.json --tolerance 0.25
+
+Exits 0 within budget, 1 otherwise, so it can run before deploying.
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Seconds allowed for `import app_new`, NiceGUI included
+DEFAULT_BUDGET = 2.0
+
+# Seconds allowed per startup phase (phases not listed are reported only)
+PHASE_BUDGETS = {
+    'imports': 2.0,
+    'schema checks': 0.25,
+    'backup check': 0.25,
+    'page registration': 0.1,
+    'ready': 3.0,
+    'first_response': 4.0,
+}
+
+# Against a baseline, a phase may be this much slower (fraction, plus seconds
+# so millisecond-sized phases don't fail on noise)
+DEFAULT_TOLERANCE = 0.25
+TOLERANCE_SLACK = 0.02
+
+# Loaded through scraping.py when a price is first fetched, never at startup
+LAZY_MODULES = ['price_scraper', 'listing_scraper', 'metalclay_price_scraper', 'page_parser', 'lxml']
+
+_MEASURE = """
+import json, sys, time
+start = time.perf_counter()
+import app_new
+seconds = time.perf_counter() - start
+print(json.dumps({'seconds': seconds, 'modules': sorted(sys.modules)}))
+"""
+
+
+def _env() -> Dict[str, str]:
+    return dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def measure_import(scratch: str) -> dict:
+    """{'seconds', 'modules'} for one import of app_new in a fresh interpreter"""
+    result = subprocess.run([sys.executable, '-c', _MEASURE], cwd=scratch, env=_env(),
+                            capture_output=True, text=True, check=True)
+    # The app may print while importing; the measurement is the last line
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def profile_startup(scratch: str) -> Dict[str, float]:
+    """{phase: seconds} from one `app_new.py --profile-startup` run"""
+    env = dict(_env(), APP_PORT=str(_free_port()))
+    subprocess.run([sys.executable, os.path.join(ROOT, 'app_new.py'), '--profile-startup'],
+                   cwd=scratch, env=env, capture_output=True, text=True, check=True, timeout=120)
+    with open(os.path.join(scratch, 'startup_profile.json'), encoding='utf-8') as f:
+        report = json.load(f)
+    phases = {name: phase['seconds'] for name, phase in report['phases'].items()}
+    phases['ready'] = report['ready']
+    phases['first_response'] = report['first_response']
+    return phases
+
+
+def median_phases(runs: List[Dict[str, float]]) -> Dict[str, float]:
+    names = {name for run in runs for name in run}
+    return {name: statistics.median(run[name] for run in runs if run.get(name) is not None)
+            for name in sorted(names) if any(run.get(name) is not None for run in runs)}
+
+
+def check_phases(phases: Dict[str, float], baseline: Dict[str, float], tolerance: float) -> List[str]:
+    """Print the phase table and return the failures"""
+    failures = []
+    print(f"\n{'phase':<20}{'seconds':>9}{'budget':>9}{'baseline':>10}")
+    for name in list(PHASE_BUDGETS) + sorted(phases.keys() - PHASE_BUDGETS.keys()):
+        seconds = phases.get(name)
+        budget = PHASE_BUDGETS.get(name)
+        previous = baseline.get(name)
+        print(f"{name:<20}{'-' if seconds is None else f'{seconds:.3f}':>9}"
+              f"{'' if budget is None else f'{budget:.3f}':>9}"
+              f"{'' if previous is None else f'{previous:.3f}':>10}")
+        if seconds is None:
+            if name == 'first_response':
+                failures.append('the app never answered')
+            continue
+        if budget is not None and seconds > budget:
+            failures.append(f"{name} took {seconds:.3f}s, budget {budget:.3f}s")
+        if previous is not None and seconds > previous * (1 + tolerance) + TOLERANCE_SLACK:
+            failures.append(f"{name} regressed: {seconds:.3f}s against {previous:.3f}s")
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET,
+                        help='seconds allowed for the import (default: %(default)s)')
+    parser.add_argument('--runs', type=int, default=5, help='fresh imports to time (default: %(default)s)')
+    parser.add_argument('--profile-runs', type=int, default=3,
+                        help='profiled app starts to time (default: %(default)s)')
+    parser.add_argument('--baseline', help='fail on phases slower than this saved report')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='fraction a phase may be slower than the baseline (default: %(default)s)')
+    parser.add_argument('--save-baseline', help='write the measured phases here')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='startup-budget-') as scratch:
+        # The first import creates the database; time the ones after it, like a real restart
+        measure_import(scratch)
+        runs = [measure_import(scratch) for _ in range(args.runs)]
+        phases = median_phases([profile_startup(scratch) for _ in range(args.profile_runs)])
+
+    seconds = statistics.median(run['seconds'] for run in runs)
+    eager = sorted({name for run in runs for name in run['modules']
+                    if name.split('.')[0] in LAZY_MODULES})
+
+    print(f"import app_new: {seconds * 1000:.0f} ms median of {args.runs} "
+          f"(min {min(run['seconds'] for run in runs) * 1000:.0f} ms), budget {args.budget * 1000:.0f} ms")
+    failures = []
+    if seconds > args.budget:
+        failures.append(f"import app_new over budget by {(seconds - args.budget) * 1000:.0f} ms")
+    if eager:
+        failures.append(f"imported at startup but should load on first use: {', '.join(eager)}")
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    failures += check_phases(phases, baseline, args.tolerance)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(phases, f, indent=2)
+        print(f"\nBaseline written to {args.save_baseline}")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print("✅ Within budget")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
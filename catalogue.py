@@ -0,0 +1,120 @@
+"""Shared catalogue snapshots (materials, projects, classes), rebuilt only when their data changes"""
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from database import Database
+
+ALL_CATEGORIES = 'All Categories'
+
+# Above this many options the material select stops sending every option to the
+# browser and searches on the server instead
+SEARCH_THRESHOLD = 200
+SEARCH_LIMIT = 50
+
+
+def material_label(material: Dict) -> str:
+    """Label used for a material in purchase dropdowns"""
+    return f"{material['name']} ({material.get('category') or 'Uncategorized'})"
+
+
+class MaterialCatalogue:
+    """Snapshot of the active materials and their per-category option maps.
+
+    A snapshot is built once per catalogue version (see Database.get_cache_version)
+    and shared by every session, so switching category in a form only swaps in a
+    prebuilt dict instead of re-filtering and re-formatting the whole list.
+    """
+
+    def __init__(self, version: int, materials: List[Dict]):
+        self.version = version
+        self.materials = materials
+        self.materials_by_id = {m['id']: m for m in materials}
+        self.categories = sorted(set(m.get('category') or 'Uncategorized' for m in materials))
+
+        # {name: material_id} for dialogs that list materials by name only
+        self.options_by_name: Dict[str, int] = {}
+
+        # category -> {label: material_id}, in catalogue order
+        self.options_by_category: Dict[str, Dict[str, int]] = {ALL_CATEGORIES: {}}
+        for category in self.categories:
+            self.options_by_category[category] = {}
+
+        # category -> [(lowercase label, label)] for server-side search
+        self._search_index: Dict[str, List[tuple]] = {ALL_CATEGORIES: []}
+        for category in self.categories:
+            self._search_index[category] = []
+
+        for material in materials:
+            label = material_label(material)
+            category = material.get('category') or 'Uncategorized'
+            entry = (label.lower(), label)
+            self.options_by_category[ALL_CATEGORIES][label] = material['id']
+            self.options_by_category[category][label] = material['id']
+            self.options_by_name[material['name']] = material['id']
+            self._search_index[ALL_CATEGORIES].append(entry)
+            self._search_index[category].append(entry)
+
+        self._labels_by_category = {
+            category: list(options.keys()) for category, options in self.options_by_category.items()
+        }
+
+    @property
+    def all_options(self) -> Dict[str, int]:
+        """Every active material as {label: material_id}"""
+        return self.options_by_category[ALL_CATEGORIES]
+
+    def options(self, category: Optional[str] = None) -> Dict[str, int]:
+        """Prebuilt {label: material_id} options for a category (or all categories)"""
+        return self.options_by_category.get(category or ALL_CATEGORIES, {})
+
+    def labels(self, category: Optional[str] = None) -> List[str]:
+        """Prebuilt option labels for a category (shared - do not mutate)"""
+        return self._labels_by_category.get(category or ALL_CATEGORIES, [])
+
+    def is_large(self, category: Optional[str] = None) -> bool:
+        """Whether a category has too many options to send to the browser at once"""
+        return len(self.options(category)) > SEARCH_THRESHOLD
+
+    def search(self, category: Optional[str], query: str, limit: int = SEARCH_LIMIT) -> List[str]:
+        """Return up to `limit` labels in a category containing `query` (case-insensitive)"""
+        needle = (query or '').strip().lower()
+        results = []
+        for lowered, label in self._search_index.get(category or ALL_CATEGORIES, []):
+            if needle in lowered:
+                results.append(label)
+                if len(results) >= limit:
+                    break
+        return results
+
+
+_lock = threading.Lock()
+# (database file, dataset) -> (version, value); versions are per database, so
+# two databases (e.g. a test copy alongside the real one) never share entries
+_cache: Dict[Tuple[str, str], tuple] = {}
+
+
+def _get_cached(db: Database, version_name: str, build: Callable[[int], object]):
+    """Return the cached value for a dataset, rebuilding it if its version changed"""
+    version = db.get_cache_version(version_name)
+    key = (os.path.abspath(db.db_path), version_name)
+    with _lock:
+        cached = _cache.get(key)
+        if cached is None or cached[0] != version:
+            cached = _cache[key] = (version, build(version))
+        return cached[1]
+
+
+def get_material_catalogue(db: Database) -> MaterialCatalogue:
+    """Get the shared catalogue snapshot, rebuilding it if the catalogue version changed"""
+    return _get_cached(db, 'catalogue', lambda version: MaterialCatalogue(version, db.get_active_materials_ordered()))
+
+
+def get_project_options(db: Database) -> Dict[str, int]:
+    """Shared {project name: project_id} options (newest first) - do not mutate"""
+    return _get_cached(db, 'projects', lambda version: {p['name']: p['id'] for p in db.get_project_names()})
+
+
+def get_class_names(db: Database) -> List[str]:
+    """Shared sorted list of class names for autocomplete - do not mutate"""
+    return _get_cached(db, 'students', lambda version: sorted(db.get_ordered_classes()))
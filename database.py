@@ -1,20 +1,43 @@
 import sqlite3
+import threading
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import Iterable, List, Dict, Optional
 import os
 import shutil
 from pathlib import Path
 
 class Database:
+    # Database files whose schema and backup checks have run in this process
+    _prepared = set()
+    _prepare_lock = threading.Lock()
+
+    # While True, new instances leave the checks to an explicit prepare()
+    # (the production app runs it once from its startup hook)
+    defer_prepare = False
+
+    # Class of every connection opened (page_metrics swaps in one that counts
+    # statements and rows)
+    connection_factory = sqlite3.Connection
+
     def __init__(self, db_path: str = "jewelry_business.db"):
         self.db_path = db_path
         self.backup_folder = "database_backups"
-        self.init_database()
-        self.check_and_create_backup()
+        if not Database.defer_prepare:
+            self.prepare()
+
+    def prepare(self):
+        """Check the schema and the backup, once per database file per process"""
+        key = os.path.abspath(self.db_path)
+        with Database._prepare_lock:
+            if key in Database._prepared:
+                return
+            self.init_database()
+            self.check_and_create_backup()
+            Database._prepared.add(key)
     
     def get_connection(self):
         """Create a database connection"""
-        return sqlite3.connect(self.db_path)
+        return sqlite3.connect(self.db_path, factory=self.connection_factory)
     
     def init_database(self):
         """Initialize the database with required tables"""
@@ -90,6 +113,13 @@ class Database:
         if 'weight_per_unit' not in columns:
             cursor.execute("ALTER TABLE materials ADD COLUMN weight_per_unit REAL")
         
+        # Spot price link - materials whose price tracks a spot index (e.g. 'silver')
+        # are repriced as spot_multiplier x the index price instead of being scraped
+        if 'spot_index' not in columns:
+            cursor.execute("ALTER TABLE materials ADD COLUMN spot_index TEXT")
+            cursor.execute("ALTER TABLE materials ADD COLUMN spot_multiplier REAL")
+            cursor.execute("ALTER TABLE materials ADD COLUMN spot_calibrated_at TIMESTAMP")
+        
         # Projects table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS projects (
@@ -162,6 +192,51 @@ class Database:
             )
         ''')
         
+        # Price checks - when each material's supplier price was last checked, whether
+        # or not it changed. Kept out of materials so a check that finds the same
+        # price writes nothing to the catalogue (and doesn't invalidate its cache)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS price_checks (
+                material_id INTEGER PRIMARY KEY,
+                checked_at TIMESTAMP NOT NULL,
+                FOREIGN KEY (material_id) REFERENCES materials (id)
+            )
+        ''')
+        
+        # Silver price history - one row per fetch (fallbacks flagged), plus a
+        # per-day rollup maintained on insert so charts over years of history
+        # read a few hundred pre-aggregated rows instead of every fetch
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS silver_price_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                recorded_at TIMESTAMP NOT NULL,
+                price_per_kg REAL NOT NULL,
+                source TEXT,
+                is_fallback INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS silver_price_daily (
+                day TEXT PRIMARY KEY,
+                min_per_kg REAL NOT NULL,
+                max_per_kg REAL NOT NULL,
+                sum_per_kg REAL NOT NULL,
+                samples INTEGER NOT NULL
+            )
+        ''')
+        
+        # Cache versions table - bumped by triggers whenever cached data changes,
+        # so in-process caches (e.g. the material catalogue) know when to rebuild
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS cache_versions (
+                name TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        self._create_version_triggers(cursor, 'catalogue', ['materials', 'category_order', 'material_order'])
+        self._create_version_triggers(cursor, 'students', ['students'])
+        self._create_version_triggers(cursor, 'projects', ['projects'])
+        
         # Create indexes for better query performance
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_purchases_student ON purchases(student_id)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_purchases_material ON purchases(material_id)')
@@ -169,12 +244,37 @@ class Database:
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_purchases_date ON purchases(purchase_date)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_payments_student ON payments(student_id)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_payments_date ON payments(payment_date)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_purchases_student_date ON purchases(student_id, purchase_date)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_payments_student_date ON payments(student_id, payment_date)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_materials_active ON materials(is_active)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_class_order ON class_order(sort_order)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_silver_price_history_time ON silver_price_history(recorded_at)')
         
         conn.commit()
         conn.close()
     
+    def _create_version_triggers(self, cursor, name: str, tables: List[str]):
+        """Bump cache_versions[name] on any insert, update or delete in the given tables"""
+        cursor.execute('INSERT OR IGNORE INTO cache_versions (name, version) VALUES (?, 0)', (name,))
+        for table in tables:
+            for event in ('INSERT', 'UPDATE', 'DELETE'):
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()}_{name}_version
+                    AFTER {event} ON {table}
+                    BEGIN
+                        UPDATE cache_versions SET version = version + 1 WHERE name = '{name}';
+                    END
+                ''')
+    
+    def get_cache_version(self, name: str) -> int:
+        """Get the current version counter for a cached dataset (e.g. 'catalogue')"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('SELECT version FROM cache_versions WHERE name = ?', (name,))
+        row = cursor.fetchone()
+        conn.close()
+        return row[0] if row else 0
+    
     # ============ BACKUP MANAGEMENT ============
     
     def check_and_create_backup(self):
@@ -331,6 +431,43 @@ class Database:
         conn.close()
         return dict(row) if row else None
     
+    def get_student_profile(self, student_id: int, page_size: int = 50) -> Optional[Dict]:
+        """Get everything the student detail page needs in one read transaction.
+        
+        Returns:
+            Dict with 'student', 'balance', 'projects', the first `page_size`
+            'purchases' and 'payments' (newest first) and 'has_more_purchases' /
+            'has_more_payments' flags, or None if the student doesn't exist.
+        """
+        conn = self.get_connection()
+        conn.row_factory = sqlite3.Row
+        try:
+            cursor = conn.cursor()
+            # One snapshot so the balance always matches the rows shown
+            cursor.execute('BEGIN')
+            
+            cursor.execute('SELECT * FROM students WHERE id = ?', (student_id,))
+            row = cursor.fetchone()
+            if not row:
+                return None
+            
+            # Fetch one extra row to know whether there is another page
+            purchases = self._query_student_purchases(cursor, student_id, page_size + 1)
+            payments = self._query_student_payments(cursor, student_id, page_size + 1)
+            
+            return {
+                'student': dict(row),
+                'balance': self._query_student_balance(cursor, student_id),
+                'purchases': purchases[:page_size],
+                'has_more_purchases': len(purchases) > page_size,
+                'payments': payments[:page_size],
+                'has_more_payments': len(payments) > page_size,
+                'projects': self._query_student_projects(cursor, student_id)
+            }
+        finally:
+            conn.rollback()
+            conn.close()
+    
     def update_student(self, student_id: int, name: str, email: str = "", phone: str = "", notes: str = "", class_name: str = "", is_sales_channel: bool = False):
         """Update student information"""
         conn = self.get_connection()
@@ -454,7 +591,8 @@ class Database:
         return self.get_all_materials(include_inactive=False)
     
     def get_active_materials_ordered(self) -> List[Dict]:
-        """Get active materials in proper order (by category order, then material order within category)"""
+        """Get active materials in proper order (by category order, then material order within category),
+        followed by any without a category"""
         ordered_categories = self.get_ordered_categories()
         result = []
         
@@ -465,6 +603,18 @@ class Database:
             active_materials = [m for m in materials if m.get('is_active', 1) == 1]
             result.extend(active_materials)
         
+        # get_ordered_categories() skips empty categories, so add those materials last
+        conn = self.get_connection()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT * FROM materials
+            WHERE is_active = 1 AND (category IS NULL OR category = '')
+            ORDER BY name
+        ''')
+        result.extend(dict(row) for row in cursor.fetchall())
+        conn.close()
+        
         return result
     
     def get_material(self, material_id: int) -> Optional[Dict]:
@@ -506,27 +656,204 @@ class Database:
         conn.close()
     
     def update_material_price(self, material_id: int, new_base_price: float, new_markup: float = None):
-        """Update material base price and optionally markup"""
+        """Update material base price and optionally markup (last_updated only moves if they changed)"""
         conn = self.get_connection()
         cursor = conn.cursor()
         if new_markup is not None:
             cursor.execute(
-                'UPDATE materials SET base_price = ?, markup_percentage = ?, last_updated = CURRENT_TIMESTAMP WHERE id = ?',
-                (new_base_price, new_markup, material_id)
+                '''UPDATE materials SET base_price = ?, markup_percentage = ?, last_updated = CURRENT_TIMESTAMP
+                   WHERE id = ? AND (base_price IS NOT ? OR markup_percentage IS NOT ?)''',
+                (new_base_price, new_markup, material_id, new_base_price, new_markup)
             )
         else:
             cursor.execute(
-                'UPDATE materials SET base_price = ?, last_updated = CURRENT_TIMESTAMP WHERE id = ?',
-                (new_base_price, material_id)
+                'UPDATE materials SET base_price = ?, last_updated = CURRENT_TIMESTAMP WHERE id = ? AND base_price IS NOT ?',
+                (new_base_price, material_id, new_base_price)
+            )
+        self._record_price_checks(cursor, [material_id])
+        conn.commit()
+        conn.close()
+
+    def update_material_prices(self, prices: Dict[int, float]) -> int:
+        """Save checked supplier prices for several materials in one transaction.
+
+        Only materials whose price actually changed are written (and get a new
+        last_updated); all of them are recorded as checked.
+
+        Args:
+            prices: {material_id: new_base_price}
+
+        Returns:
+            Number of materials whose price changed
+        """
+        if not prices:
+            return 0
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.executemany(
+                'UPDATE materials SET base_price = ?, last_updated = CURRENT_TIMESTAMP WHERE id = ? AND base_price IS NOT ?',
+                [(price, material_id, price) for material_id, price in prices.items()]
+            )
+            changed = cursor.rowcount
+            self._record_price_checks(cursor, prices.keys())
+            self._calibrate_spot_links(cursor, prices.keys())
+            conn.commit()
+            return changed
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def _record_price_checks(self, cursor, material_ids: Iterable[int]):
+        cursor.executemany(
+            'INSERT OR REPLACE INTO price_checks (material_id, checked_at) VALUES (?, CURRENT_TIMESTAMP)',
+            [(material_id,) for material_id in material_ids]
+        )
+
+    def get_price_refresh_queue(self, limit: int, min_age_hours: float = 0,
+                                usage_days: int = 90, recalibrate_days: Optional[int] = 30) -> List[Dict]:
+        """Active materials with supplier URLs, most in need of a price check first.
+
+        Priority is the hours since the price was last checked (or changed),
+        weighted by how many purchases used the material in the last
+        `usage_days` days, so stale, popular materials come first. Spot-linked
+        materials follow the spot price and are only included once their
+        calibration is `recalibrate_days` old.
+
+        Args:
+            limit: Maximum materials to return
+            min_age_hours: Leave out materials checked more recently than this
+            usage_days: Window for counting purchases
+            recalibrate_days: Re-scrape spot-linked materials this often (None
+                              treats them like any other material)
+
+        Returns:
+            Material dicts with extra 'age_hours', 'uses' and 'priority' keys
+        """
+        conn = self.get_connection()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT *, age_hours * (1 + uses) AS priority FROM (
+                SELECT m.*,
+                       (julianday('now') - julianday(MAX(m.last_updated, COALESCE(pc.checked_at, m.last_updated)))) * 24
+                           AS age_hours,
+                       COALESCE(u.uses, 0) AS uses
+                FROM materials m
+                LEFT JOIN price_checks pc ON pc.material_id = m.id
+                LEFT JOIN (
+                    SELECT material_id, COUNT(*) AS uses FROM purchases
+                    WHERE purchase_date >= datetime('now', ?)
+                    GROUP BY material_id
+                ) u ON u.material_id = m.id
+                WHERE m.is_active = 1 AND m.supplier_url IS NOT NULL AND m.supplier_url != ''
+                  AND (? OR m.spot_multiplier IS NULL OR m.spot_calibrated_at < datetime('now', ?))
             )
+            WHERE age_hours >= ?
+            ORDER BY priority DESC, id
+            LIMIT ?
+        ''', (f'-{int(usage_days)} days', recalibrate_days is None, f'-{int(recalibrate_days or 0)} days',
+              min_age_hours, limit))
+        materials = [dict(row) for row in cursor.fetchall()]
+        conn.close()
+        return materials
+
+    # ---- spot-linked pricing ----
+    
+    def _latest_spot_price(self, cursor, spot_index: str) -> Optional[float]:
+        """Latest fetched (not fallback) price per gram of a spot index, or None"""
+        if spot_index != 'silver':
+            return None
+        cursor.execute('''SELECT price_per_kg FROM silver_price_history WHERE is_fallback = 0
+                          ORDER BY recorded_at DESC LIMIT 1''')
+        row = cursor.fetchone()
+        return row[0] / 1000 if row else None
+    
+    def _calibrate_spot_links(self, cursor, material_ids: Iterable[int]):
+        """Set the spot multiplier of linked materials from their current (just scraped) price"""
+        material_ids = list(material_ids)
+        spot = self._latest_spot_price(cursor, 'silver')
+        if not spot or not material_ids:
+            return
+        placeholders = ','.join('?' * len(material_ids))
+        cursor.execute(
+            f'''UPDATE materials SET spot_multiplier = base_price / ?, spot_calibrated_at = CURRENT_TIMESTAMP
+                WHERE spot_index = 'silver' AND id IN ({placeholders})''',
+            [spot, *material_ids]
+        )
+    
+    def set_material_spot_link(self, material_id: int, spot_index: Optional[str]):
+        """Link a material to a spot index ('silver'), or unlink it with None.
+
+        The multiplier is calibrated from the material's current price and the
+        latest spot price, so link a material right after its price was scraped.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            if spot_index:
+                cursor.execute(
+                    '''UPDATE materials SET spot_index = ?, spot_multiplier = NULL, spot_calibrated_at = NULL
+                       WHERE id = ? AND spot_index IS NOT ?''',
+                    (spot_index, material_id, spot_index)
+                )
+                self._calibrate_spot_links(cursor, [material_id])
+            else:
+                cursor.execute(
+                    '''UPDATE materials SET spot_index = NULL, spot_multiplier = NULL, spot_calibrated_at = NULL
+                       WHERE id = ? AND spot_index IS NOT NULL''',
+                    (material_id,)
+                )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+    
+    def calibrate_spot_link(self, material_id: int):
+        """Recalibrate a linked material's multiplier after its price was scraped"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        self._calibrate_spot_links(cursor, [material_id])
         conn.commit()
         conn.close()
     
+    def reprice_spot_linked(self, spot_index: str, spot_price_per_gram: float) -> int:
+        """Reprice every calibrated material linked to a spot index in one UPDATE.
+
+        Each price becomes spot_multiplier x the spot price per gram; only
+        prices that change are written.
+
+        Returns:
+            Number of materials repriced
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                '''UPDATE materials SET base_price = ROUND(spot_multiplier * ?, 4), last_updated = CURRENT_TIMESTAMP
+                   WHERE spot_index = ? AND spot_multiplier IS NOT NULL
+                     AND base_price IS NOT ROUND(spot_multiplier * ?, 4)''',
+                (spot_price_per_gram, spot_index, spot_price_per_gram)
+            )
+            changed = cursor.rowcount
+            conn.commit()
+            return changed
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+    
     def delete_material(self, material_id: int):
         """Delete a material"""
         conn = self.get_connection()
         cursor = conn.cursor()
         cursor.execute('DELETE FROM materials WHERE id = ?', (material_id,))
+        cursor.execute('DELETE FROM price_checks WHERE material_id = ?', (material_id,))
         conn.commit()
         conn.close()
     
@@ -583,6 +910,12 @@ class Database:
         conn = self.get_connection()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
+        projects = self._query_student_projects(cursor, student_id)
+        conn.close()
+        return projects
+    
+    def _query_student_projects(self, cursor, student_id: int) -> List[Dict]:
+        """Run the student projects query on an existing cursor"""
         cursor.execute('''
             SELECT DISTINCT p.* 
             FROM projects p
@@ -590,6 +923,14 @@ class Database:
             WHERE pur.student_id = ?
             ORDER BY p.created_at DESC
         ''', (student_id,))
+        return [dict(row) for row in cursor.fetchall()]
+    
+    def get_project_names(self) -> List[Dict]:
+        """Get id and name of all projects (newest first) - lightweight list for dropdowns"""
+        conn = self.get_connection()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute('SELECT id, name FROM projects ORDER BY created_at DESC')
         projects = [dict(row) for row in cursor.fetchall()]
         conn.close()
         return projects
@@ -704,11 +1045,17 @@ class Database:
         finally:
             conn.close()
     
-    def get_student_purchases(self, student_id: int) -> List[Dict]:
-        """Get all purchases for a student with material details"""
+    def get_student_purchases(self, student_id: int, limit: Optional[int] = None, offset: int = 0) -> List[Dict]:
+        """Get purchases for a student with material details (newest first, optionally one page)"""
         conn = self.get_connection()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
+        purchases = self._query_student_purchases(cursor, student_id, limit, offset)
+        conn.close()
+        return purchases
+    
+    def _query_student_purchases(self, cursor, student_id: int, limit: Optional[int] = None, offset: int = 0) -> List[Dict]:
+        """Run the student purchases query on an existing cursor"""
         cursor.execute(
             '''SELECT p.*, m.name as material_name, m.unit_type, m.category,
                       pr.name as project_name
@@ -716,12 +1063,11 @@ class Database:
                JOIN materials m ON p.material_id = m.id
                LEFT JOIN projects pr ON p.project_id = pr.id
                WHERE p.student_id = ?
-               ORDER BY p.purchase_date DESC''',
-            (student_id,)
+               ORDER BY p.purchase_date DESC, p.id DESC
+               LIMIT ? OFFSET ?''',
+            (student_id, -1 if limit is None else limit, offset)
         )
-        purchases = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return purchases
+        return [dict(row) for row in cursor.fetchall()]
     
     def get_all_purchases(self) -> List[Dict]:
         """Get all purchases with student and material details"""
@@ -828,19 +1174,23 @@ class Database:
         finally:
             conn.close()
     
-    def get_student_payments(self, student_id: int) -> List[Dict]:
-        """Get all payments from a student"""
+    def get_student_payments(self, student_id: int, limit: Optional[int] = None, offset: int = 0) -> List[Dict]:
+        """Get payments from a student (newest first, optionally one page)"""
         conn = self.get_connection()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
-        cursor.execute(
-            'SELECT * FROM payments WHERE student_id = ? ORDER BY payment_date DESC',
-            (student_id,)
-        )
-        payments = [dict(row) for row in cursor.fetchall()]
+        payments = self._query_student_payments(cursor, student_id, limit, offset)
         conn.close()
         return payments
     
+    def _query_student_payments(self, cursor, student_id: int, limit: Optional[int] = None, offset: int = 0) -> List[Dict]:
+        """Run the student payments query on an existing cursor"""
+        cursor.execute(
+            'SELECT * FROM payments WHERE student_id = ? ORDER BY payment_date DESC, id DESC LIMIT ? OFFSET ?',
+            (student_id, -1 if limit is None else limit, offset)
+        )
+        return [dict(row) for row in cursor.fetchall()]
+    
     def delete_payment(self, payment_id: int) -> bool:
         """Delete a payment by ID"""
         conn = self.get_connection()
@@ -933,7 +1283,12 @@ class Database:
         """Calculate student's balance (debt/credit)"""
         conn = self.get_connection()
         cursor = conn.cursor()
-        
+        balance_info = self._query_student_balance(cursor, student_id)
+        conn.close()
+        return balance_info
+    
+    def _query_student_balance(self, cursor, student_id: int) -> Dict:
+        """Run the student balance queries on an existing cursor"""
         # Total purchases
         cursor.execute(
             'SELECT COALESCE(SUM(total_cost), 0) as total FROM purchases WHERE student_id = ?',
@@ -948,8 +1303,6 @@ class Database:
         )
         total_payments = cursor.fetchone()[0]
         
-        conn.close()
-        
         balance = total_payments - total_purchases
         
         return {
@@ -959,20 +1312,107 @@ class Database:
             'status': 'credit' if balance > 0 else 'debt' if balance < 0 else 'settled'
         }
     
+    def get_student_ledger(self, student_id: int, cursor: Optional[tuple] = None, limit: int = 50) -> Dict:
+        """Get a page of a student's purchases and payments as one ledger with a running balance.
+        
+        Entries are newest first. The running balance (payments minus purchases,
+        like get_student_balance) is computed by SQLite over the whole history
+        with a window function, so every page shows the true balance after each entry.
+        
+        Args:
+            student_id: The student
+            cursor: Keyset cursor from the previous page's 'next_cursor' (None for the first page)
+            limit: Maximum entries per page
+        
+        Returns:
+            Dict with 'entries' and 'next_cursor' (None when there are no more entries)
+        """
+        query = '''
+            WITH entries AS (
+                SELECT 'purchase' AS entry_type, p.id, p.purchase_date AS entry_date,
+                       -p.total_cost AS amount, m.name AS description,
+                       p.quantity, m.unit_type, p.notes
+                FROM purchases p
+                JOIN materials m ON p.material_id = m.id
+                WHERE p.student_id = ?
+                UNION ALL
+                SELECT 'payment' AS entry_type, id, payment_date AS entry_date,
+                       amount, COALESCE(NULLIF(payment_method, ''), 'Payment') AS description,
+                       NULL AS quantity, NULL AS unit_type, notes
+                FROM payments
+                WHERE student_id = ?
+            ),
+            ledger AS (
+                SELECT *,
+                       SUM(amount) OVER (
+                           ORDER BY entry_date, entry_type, id
+                           ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
+                       ) AS running_balance
+                FROM entries
+            )
+            SELECT * FROM ledger
+        '''
+        params: list = [student_id, student_id]
+        if cursor is not None:
+            query += ' WHERE (entry_date, entry_type, id) < (?, ?, ?)'
+            params.extend(cursor)
+        query += ' ORDER BY entry_date DESC, entry_type DESC, id DESC LIMIT ?'
+        params.append(limit + 1)  # One extra row tells us whether another page exists
+        
+        conn = self.get_connection()
+        conn.row_factory = sqlite3.Row
+        rows = [dict(row) for row in conn.execute(query, params).fetchall()]
+        conn.close()
+        
+        entries = rows[:limit]
+        next_cursor = None
+        if len(rows) > limit:
+            last = entries[-1]
+            next_cursor = (last['entry_date'], last['entry_type'], last['id'])
+        
+        return {'entries': entries, 'next_cursor': next_cursor}
+    
+    def get_student_summaries(self) -> List[Dict]:
+        """Get all students with their purchase/payment totals and balance in one query"""
+        conn = self.get_connection()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT s.*,
+                   COALESCE(pu.total, 0) AS total_purchases,
+                   COALESCE(pa.total, 0) AS total_payments
+            FROM students s
+            LEFT JOIN (
+                SELECT student_id, SUM(total_cost) AS total FROM purchases GROUP BY student_id
+            ) pu ON pu.student_id = s.id
+            LEFT JOIN (
+                SELECT student_id, SUM(amount) AS total FROM payments GROUP BY student_id
+            ) pa ON pa.student_id = s.id
+            ORDER BY s.name
+        ''')
+        summaries = [dict(row) for row in cursor.fetchall()]
+        conn.close()
+        
+        for summary in summaries:
+            balance = summary['total_payments'] - summary['total_purchases']
+            summary['balance'] = balance
+            summary['status'] = 'credit' if balance > 0 else 'debt' if balance < 0 else 'settled'
+        
+        return summaries
+    
     def get_all_student_balances(self) -> List[Dict]:
         """Get balances for all students"""
-        students = self.get_all_students()
-        balances = []
-        
-        for student in students:
-            balance_info = self.get_student_balance(student['id'])
-            balances.append({
-                'student_id': student['id'],
-                'student_name': student['name'],
-                **balance_info
-            })
-        
-        return balances
+        return [
+            {
+                'student_id': summary['id'],
+                'student_name': summary['name'],
+                'total_purchases': summary['total_purchases'],
+                'total_payments': summary['total_payments'],
+                'balance': summary['balance'],
+                'status': summary['status']
+            }
+            for summary in self.get_student_summaries()
+        ]
     
     # ============ CLASS ORDERING ============
     
@@ -1390,4 +1830,85 @@ class Database:
             raise Exception(f"Failed to move material down: {e}")
         finally:
             conn.close()
+    
+    # ============ SILVER PRICE HISTORY ============
+    
+    def add_silver_price(self, price_per_kg: float, source: str = "", is_fallback: bool = False,
+                         recorded_at: Optional[str] = None) -> int:
+        """Record a silver price fetch.
+
+        Fresh prices also update that day's rollup; fallbacks (an old price
+        re-served because the fetch failed) are kept in the history only.
+
+        Args:
+            price_per_kg: Price in £ per kg
+            source: Where the price came from
+            is_fallback: True if this is an old price served after a failed fetch
+            recorded_at: 'YYYY-MM-DD HH:MM:SS' (defaults to now)
+
+        Returns:
+            ID of the history row
+        """
+        recorded_at = recorded_at or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                'INSERT INTO silver_price_history (recorded_at, price_per_kg, source, is_fallback) VALUES (?, ?, ?, ?)',
+                (recorded_at, price_per_kg, source, 1 if is_fallback else 0)
+            )
+            history_id = cursor.lastrowid
+            if not is_fallback:
+                cursor.execute('''
+                    INSERT INTO silver_price_daily (day, min_per_kg, max_per_kg, sum_per_kg, samples)
+                    VALUES (date(?), ?, ?, ?, 1)
+                    ON CONFLICT(day) DO UPDATE SET
+                        min_per_kg = MIN(min_per_kg, excluded.min_per_kg),
+                        max_per_kg = MAX(max_per_kg, excluded.max_per_kg),
+                        sum_per_kg = sum_per_kg + excluded.sum_per_kg,
+                        samples = samples + 1
+                ''', (recorded_at, price_per_kg, price_per_kg, price_per_kg))
+            conn.commit()
+            return history_id
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+    
+    def get_silver_price_history(self, bucket: str = 'day', since: Optional[str] = None) -> List[Dict]:
+        """Silver price min/max/average per day or week, oldest first.
+
+        Read from the daily rollup, so the cost depends on the number of
+        buckets, not the number of fetches.
 
+        Args:
+            bucket: 'day' or 'week' (weeks start on Monday)
+            since: Only buckets from this date ('YYYY-MM-DD') onwards
+
+        Returns:
+            List of {'period', 'min_per_kg', 'max_per_kg', 'avg_per_kg', 'samples'}
+        """
+        if bucket == 'day':
+            period = 'day'
+        elif bucket == 'week':
+            period = "date(day, '-6 days', 'weekday 1')"
+        else:
+            raise ValueError(f"Unknown bucket {bucket!r} (expected 'day' or 'week')")
+        conn = self.get_connection()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT {period} AS period,
+                   MIN(min_per_kg) AS min_per_kg,
+                   MAX(max_per_kg) AS max_per_kg,
+                   SUM(sum_per_kg) / SUM(samples) AS avg_per_kg,
+                   SUM(samples) AS samples
+            FROM silver_price_daily
+            WHERE day >= ?
+            GROUP BY period
+            ORDER BY period
+        ''', (since or '0000-00-00',))
+        history = [dict(row) for row in cursor.fetchall()]
+        conn.close()
+        return history
@@ -0,0 +1,208 @@
+"""Disk-backed HTTP cache for supplier pages.
+
+Pages are stored in a small SQLite database (kept separate from the business
+database so it never ends up in backups) keyed by URL, with the ETag and
+Last-Modified validators, the time they were fetched and the zlib-compressed
+body. Within the TTL a cached page is returned without touching the network;
+after that it is revalidated with If-None-Match / If-Modified-Since, so an
+unchanged page costs a 304 instead of a full download.
+
+Scrapers can also store what they parsed from a page (save_parsed). It is
+kept until the page changes, so an unchanged page costs neither a download
+nor a parse: CachedPage.parsed hands it back and the body is never
+decompressed.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, Optional
+
+import http_client
+
+CACHE_DB_PATH = 'http_cache.db'
+
+# Seconds a cached page is used without revalidating. Override with the
+# SCRAPER_HTTP_CACHE_TTL environment variable (0 = always revalidate).
+DEFAULT_TTL = int(os.environ.get('SCRAPER_HTTP_CACHE_TTL', 15 * 60))
+
+
+class CachedPage:
+    """A page body served from the network or the cache"""
+
+    def __init__(self, url: str, content: Optional[bytes], encoding: Optional[str], fetched_at: float,
+                 from_cache: bool, revalidated: bool = False, compressed: Optional[bytes] = None,
+                 parsed: Any = None):
+        self.url = url
+        self._content = content
+        self._compressed = compressed     # cached body, decompressed on first use
+        self.encoding = encoding or 'utf-8'
+        self.fetched_at = fetched_at
+        self.from_cache = from_cache      # body came from the cache
+        self.revalidated = revalidated    # ...after a 304 from the server
+        self.parsed = parsed              # what a scraper saved for this body, if anything
+
+    @property
+    def content(self) -> bytes:
+        if self._content is None:
+            self._content = zlib.decompress(self._compressed)
+        return self._content
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding, errors='replace')
+
+
+class HttpCache:
+    """SQLite-backed store of page bodies and their HTTP validators"""
+
+    def __init__(self, db_path: str = CACHE_DB_PATH, ttl: int = DEFAULT_TTL):
+        self.db_path = db_path
+        self.ttl = ttl
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def get_connection(self):
+        """Create a cache database connection"""
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    self._init_schema(conn)
+                    self._initialized = True
+        return conn
+
+    def _init_schema(self, conn):
+        # WAL lets the price refresh workers write while pages read
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS http_cache (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                encoding TEXT,
+                fetched_at REAL NOT NULL,
+                body BLOB NOT NULL
+            )
+        ''')
+        columns = [row[1] for row in conn.execute('PRAGMA table_info(http_cache)')]
+        # What a scraper parsed from the body (JSON), cleared whenever the body changes
+        if 'parsed' not in columns:
+            conn.execute('ALTER TABLE http_cache ADD COLUMN parsed TEXT')
+        conn.commit()
+
+    # ---- storage ----
+
+    def lookup(self, url: str) -> Optional[Dict]:
+        """Cached entry for a URL (body still compressed), or None"""
+        conn = self.get_connection()
+        try:
+            row = conn.execute(
+                'SELECT etag, last_modified, encoding, fetched_at, body, parsed FROM http_cache WHERE url = ?',
+                (url,)
+            ).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        return {'etag': row[0], 'last_modified': row[1], 'encoding': row[2],
+                'fetched_at': row[3], 'body': row[4], 'parsed': json.loads(row[5]) if row[5] else None}
+
+    def store(self, url: str, content: bytes, etag: Optional[str], last_modified: Optional[str],
+              encoding: Optional[str], fetched_at: float):
+        """Save (or replace) the cached copy of a page, dropping anything parsed from the old one"""
+        conn = self.get_connection()
+        try:
+            conn.execute(
+                '''INSERT OR REPLACE INTO http_cache (url, etag, last_modified, encoding, fetched_at, body)
+                   VALUES (?, ?, ?, ?, ?, ?)''',
+                (url, etag, last_modified, encoding, fetched_at, zlib.compress(content))
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def save_parsed(self, url: str, parsed: Any):
+        """Keep what was parsed from the cached body, until the page changes"""
+        conn = self.get_connection()
+        try:
+            conn.execute('UPDATE http_cache SET parsed = ? WHERE url = ?', (json.dumps(parsed), url))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def touch(self, url: str, fetched_at: float):
+        """Mark a cached page as fresh again after a 304"""
+        conn = self.get_connection()
+        try:
+            conn.execute('UPDATE http_cache SET fetched_at = ? WHERE url = ?', (fetched_at, url))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def invalidate(self, url: Optional[str] = None):
+        """Drop one cached page, or all of them"""
+        conn = self.get_connection()
+        try:
+            if url:
+                conn.execute('DELETE FROM http_cache WHERE url = ?', (url,))
+            else:
+                conn.execute('DELETE FROM http_cache')
+            conn.commit()
+        finally:
+            conn.close()
+
+    # ---- fetching ----
+
+    def get(self, url: str, ttl: Optional[int] = None) -> CachedPage:
+        """
+        Get a page, from the cache while it is fresh and revalidating it afterwards.
+
+        Args:
+            url: Page URL
+            ttl: Seconds a cached copy is used without asking the server
+                 (defaults to the cache TTL; 0 always revalidates)
+
+        Raises:
+            requests.exceptions.RequestException if the page has to be fetched and can't be
+        """
+        ttl = self.ttl if ttl is None else ttl
+        now = time.time()
+        cached = self.lookup(url)
+
+        if cached and now - cached['fetched_at'] < ttl:
+            return CachedPage(url, None, cached['encoding'], cached['fetched_at'], from_cache=True,
+                              compressed=cached['body'], parsed=cached['parsed'])
+
+        headers = {}
+        if cached and cached['etag']:
+            headers['If-None-Match'] = cached['etag']
+        if cached and cached['last_modified']:
+            headers['If-Modified-Since'] = cached['last_modified']
+
+        response = http_client.get(url, headers=headers)
+
+        if response.status_code == 304 and cached:
+            self.touch(url, now)
+            return CachedPage(url, None, cached['encoding'], now, from_cache=True, revalidated=True,
+                              compressed=cached['body'], parsed=cached['parsed'])
+
+        self.store(url, response.content, response.headers.get('ETag'),
+                   response.headers.get('Last-Modified'), response.encoding, now)
+        return CachedPage(url, response.content, response.encoding, now, from_cache=False)
+
+
+# Shared cache used by the scrapers
+page_cache = HttpCache()
+
+
+def get(url: str, ttl: Optional[int] = None) -> CachedPage:
+    """Get a page through the shared cache (see HttpCache.get)"""
+    return page_cache.get(url, ttl=ttl)
+
+
+def save_parsed(url: str, parsed: Any):
+    """Keep what was parsed from a page in the shared cache (see HttpCache.save_parsed)"""
+    page_cache.save_parsed(url, parsed)
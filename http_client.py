@@ -0,0 +1,90 @@
+"""Shared HTTP client for all supplier and price scrapers.
+
+Every scraper fetches through this module so requests to the same supplier
+reuse pooled keep-alive connections instead of paying for a new TCP and TLS
+handshake per page. Headers, compression and timeouts are set here once, and
+requests are retried and circuit-broken per supplier (see supplier_health).
+
+requests.Session objects are not safe to share between threads, so each
+thread gets its own lightweight session; all of them mount the same
+HTTPAdapter, which holds the per-host connection pools.
+"""
+import asyncio
+import threading
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+
+from supplier_health import supplier_health
+
+# Disable SSL warnings - supplier pages are fetched with verify=False to avoid
+# certificate issues on macOS
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+# (connect, read) timeouts in seconds
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 10
+DEFAULT_TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+# Number of hosts to keep pools for, and keep-alive connections per host
+POOL_HOSTS = 10
+POOL_SIZE_PER_HOST = 8
+
+DEFAULT_HEADERS = {
+    'User-Agent': USER_AGENT,
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-GB,en;q=0.9',
+    'Accept-Encoding': ACCEPT_ENCODING,  # gzip/deflate, plus br/zstd when available
+    'Connection': 'keep-alive',
+}
+
+_adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=POOL_SIZE_PER_HOST)
+_local = threading.local()
+
+
+def get_session() -> requests.Session:
+    """This thread's session, sharing the process-wide connection pools"""
+    session = getattr(_local, 'session', None)
+    if session is None:
+        session = requests.Session()
+        session.headers.update(DEFAULT_HEADERS)
+        session.verify = False
+        session.mount('https://', _adapter)
+        session.mount('http://', _adapter)
+        _local.session = session
+    return session
+
+
+def get(url: str, timeout=DEFAULT_TIMEOUT, **kwargs) -> requests.Response:
+    """GET a URL through the shared pools.
+
+    Transient failures are retried with backoff. Raises
+    requests.exceptions.RequestException on network errors and HTTP error
+    statuses (the response is checked with raise_for_status), and
+    supplier_health.SupplierUnavailable without making a request while the
+    supplier is failing.
+    """
+    def request():
+        response = get_session().get(url, timeout=timeout, **kwargs)
+        response.raise_for_status()
+        return response
+
+    return supplier_health.call(url, request)
+
+
+async def get_async(url: str, timeout=DEFAULT_TIMEOUT, **kwargs) -> requests.Response:
+    """Async version of get() for use from the UI event loop.
+
+    Runs the request on a worker thread so it shares the same connection
+    pools as synchronous callers.
+    """
+    return await asyncio.to_thread(get, url, timeout=timeout, **kwargs)
+
+
+def close():
+    """Close all pooled connections (e.g. on shutdown)"""
+    _adapter.close()
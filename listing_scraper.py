@@ -0,0 +1,177 @@
+"""Bulk pricing from supplier category/search listing pages.
+
+A category page lists many products with their prices, so repricing a whole
+category (e.g. all silver wire) from its listing costs one request per page
+of results instead of one per product. Products are read from schema.org
+ItemList/Product data when the page has it, otherwise from the product cards
+(the innermost blocks holding both a product link and a £ price).
+Pagination is followed through rel="next" links or "Next" buttons.
+"""
+import re
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urljoin, urlparse, urlunparse
+
+from lxml import etree
+
+import http_cache
+import page_parser
+
+# Safety limit on pages followed for one listing
+MAX_PAGES = 20
+
+VAT_RATE = 1.2
+
+# Innermost blocks containing both a link and a £ price - one per product card
+_CARD = etree.XPath(
+    '//*[self::li or self::article or self::div]'
+    '[.//a[@href]][contains(., "£")]'
+    '[not(.//*[self::li or self::article or self::div][.//a[@href]][contains(., "£")])]'
+)
+_CARD_LINKS = etree.XPath('.//a[@href]')
+_CARD_IMAGE_ALT = etree.XPath('.//img/@alt')
+_NEXT_LINK = etree.XPath(
+    '//link[@rel="next"]/@href | //a[@rel="next"]/@href'
+    ' | //a[contains(concat(" ", normalize-space(@class), " "), " next ")]/@href'
+    ' | //a[normalize-space(.)="Next" or normalize-space(.)="›" or normalize-space(.)="»"'
+    ' or normalize-space(@aria-label)="Next"]/@href'
+)
+
+_CARD_PRICE_RE = re.compile(r'£\s*([\d,]+\.\d{2})')
+_CARD_EX_VAT_RE = re.compile(r'£\s*([\d,]+\.\d{2})\s*(?:exc?\.?|excluding)\s*VAT', re.IGNORECASE)
+_CARD_PER_WEIGHT_RE = re.compile(r'per\s*(?:kg|g)(?!\w)|/\s*(?:kg|g)(?!\w)', re.IGNORECASE)
+
+
+def normalize_product_url(url: str) -> str:
+    """Comparable form of a product URL: no scheme, www., query, fragment or trailing slash"""
+    parts = urlparse(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    return urlunparse(('', host, parts.path.rstrip('/'), '', '', '')).lstrip('/').lower()
+
+
+def _listing_product(url: str, title: Optional[str], inc_vat: float, exc_vat: Optional[float]) -> Dict:
+    return {
+        'url': url,
+        'title': title,
+        'inc_vat': inc_vat,
+        'exc_vat': exc_vat if exc_vat is not None else inc_vat / VAT_RATE,
+    }
+
+
+def _json_ld_list_entries(doc):
+    """JSON-LD objects with ItemList.itemListElement entries expanded in place"""
+    for item in page_parser.json_ld_objects(doc):
+        if page_parser.is_schema_type(item, 'ItemList'):
+            yield from page_parser.json_ld_items(item.get('itemListElement'))
+        else:
+            yield item
+
+
+def _json_ld_products(doc, page_url: str) -> List[Dict]:
+    """Products from schema.org ItemList / Product JSON-LD"""
+    products = []
+    for item in _json_ld_list_entries(doc):
+        # ItemList entries wrap the product in ListItem.item
+        if page_parser.is_schema_type(item, 'ListItem') and isinstance(item.get('item'), dict):
+            item = item['item']
+        if not page_parser.is_schema_type(item, 'Product') or not item.get('url'):
+            continue
+        offers = item.get('offers')
+        for offer in (offers if isinstance(offers, list) else [offers]):
+            if not isinstance(offer, dict):
+                continue
+            if offer.get('priceCurrency') and str(offer['priceCurrency']).upper() != 'GBP':
+                continue
+            price = page_parser.parse_amount(offer.get('price', offer.get('lowPrice')))
+            if price is not None:
+                products.append(_listing_product(urljoin(page_url, item['url']), item.get('name'), price, None))
+                break
+    return products
+
+
+def _card_products(doc, page_url: str) -> List[Dict]:
+    """Products from listing cards (link + price blocks)"""
+    products = []
+    for card in _CARD(doc):
+        text = ' '.join(card.text_content().split())
+        # Per-weight prices can't be compared with a fixed base price
+        if _CARD_PER_WEIGHT_RE.search(text):
+            continue
+        ex_vat_match = _CARD_EX_VAT_RE.search(text)
+        inc_vat = None
+        for match in _CARD_PRICE_RE.finditer(text):
+            if not ex_vat_match or match.start() != ex_vat_match.start():
+                inc_vat = float(match.group(1).replace(',', ''))
+                break
+        if inc_vat is None:
+            continue
+
+        link = next((a for a in _CARD_LINKS(card) if not a.get('href', '').startswith(('#', 'javascript:'))), None)
+        if link is None:
+            continue
+        title = ' '.join(link.text_content().split()) or next(iter(_CARD_IMAGE_ALT(card)), None)
+        exc_vat = float(ex_vat_match.group(1).replace(',', '')) if ex_vat_match else None
+        products.append(_listing_product(urljoin(page_url, link.get('href')), title, inc_vat, exc_vat))
+    return products
+
+
+def parse_listing_page(content, page_url: str) -> Dict:
+    """
+    Products and the next-page URL from one listing page.
+
+    Returns:
+        {'products': [{'url', 'title', 'inc_vat', 'exc_vat'}], 'next_url': str or None}
+    """
+    doc = page_parser.parse_page(content)
+    products = _json_ld_products(doc, page_url) or _card_products(doc, page_url)
+
+    next_url = None
+    for href in _NEXT_LINK(doc):
+        candidate = urljoin(page_url, str(href))
+        if candidate != page_url:
+            next_url = candidate
+            break
+    return {'products': products, 'next_url': next_url}
+
+
+def scrape_listing(url: str, max_pages: int = MAX_PAGES, max_age: Optional[int] = None) -> List[Dict]:
+    """
+    All products on a listing, following pagination.
+
+    Args:
+        url: Supplier category or search URL
+        max_pages: Stop after this many pages
+        max_age: Page cache max age (see http_cache.HttpCache.get)
+
+    Returns:
+        Products in listing order, de-duplicated by URL. Pages that fail to load end
+        the listing early; the products found so far are still returned.
+    """
+    products: Dict[str, Dict] = {}
+    seen_pages = set()
+    page_url = url
+    while page_url and len(seen_pages) < max_pages and page_url not in seen_pages:
+        seen_pages.add(page_url)
+        try:
+            page = http_cache.get(page_url, ttl=max_age)
+            listing = parse_listing_page(page.content, page_url)
+        except Exception as e:
+            print(f"Error reading listing page {page_url}: {e}")
+            break
+        for product in listing['products']:
+            products.setdefault(normalize_product_url(product['url']), product)
+        page_url = listing['next_url']
+    return list(products.values())
+
+
+def match_to_materials(products: Iterable[Dict], materials: Iterable[Dict]) -> Dict[int, Dict]:
+    """{material_id: listing product} for materials whose supplier_url appears in the listing"""
+    by_url = {normalize_product_url(product['url']): product for product in products}
+    matches = {}
+    for material in materials:
+        if material.get('supplier_url'):
+            product = by_url.get(normalize_product_url(material['supplier_url']))
+            if product:
+                matches[material['id']] = product
+    return matches
@@ -1,118 +1,132 @@
 """Fetch current prices from Metal Clay Ltd website"""
 import re
-import requests
-from bs4 import BeautifulSoup
 from datetime import datetime
-import json
-import os
 from typing import Optional, Dict
-import urllib3
+import http_cache
+import page_parser
+from scraper_cache import ScraperCache, results_cache, seconds_until_midnight, supplier_namespace
 
-# Disable SSL warnings
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+# Price patterns - inc. VAT and ex. VAT
+# Pattern: £64.95inc. VAT £54.12ex. VAT
+INC_VAT_RE = re.compile(r'£([\d,]+\.?\d*)\s*inc\.\s*VAT', re.IGNORECASE)
+EX_VAT_RE = re.compile(r'£([\d,]+\.?\d*)\s*ex\.\s*VAT', re.IGNORECASE)
+
+VAT_RATE = 1.2
+
+
+def _structured_prices(offer) -> Optional[Dict]:
+    prices = page_parser.offer_prices(offer, VAT_RATE)
+    if not prices:
+        return None
+    return {'price_inc_vat': prices['inc_vat'], 'price_ex_vat': prices['exc_vat']}
+
+
+def parse_json_ld_prices(doc) -> Optional[Dict]:
+    """inc/ex VAT prices from schema.org JSON-LD product data"""
+    return _structured_prices(page_parser.json_ld_offer(doc))
+
+
+def parse_microdata_prices(doc) -> Optional[Dict]:
+    """inc/ex VAT prices from schema.org microdata"""
+    return _structured_prices(page_parser.microdata_offer(doc))
+
+
+def parse_text_prices(doc) -> Optional[Dict]:
+    """inc/ex VAT prices from the "£64.95 inc. VAT £54.12 ex. VAT" price block text"""
+    # Product-detail text first; the whole page when the price sits in other markup
+    for whole_page in (False, True):
+        price_text = page_parser.product_text(doc, whole_page)
+        inc_vat_match = INC_VAT_RE.search(price_text)
+        ex_vat_match = EX_VAT_RE.search(price_text)
+        if inc_vat_match or ex_vat_match:
+            break
+    else:
+        return None
+    prices = {}
+    if inc_vat_match:
+        prices['price_inc_vat'] = float(inc_vat_match.group(1).replace(',', ''))
+    if ex_vat_match:
+        prices['price_ex_vat'] = float(ex_vat_match.group(1).replace(',', ''))
+    return prices
+
+
+# Cheapest first; the one that worked last is tried first (page_parser.StrategyMemo)
+PRICE_STRATEGIES = [
+    ('json_ld', parse_json_ld_prices),
+    ('microdata', parse_microdata_prices),
+    ('page_text', parse_text_prices),
+]
 
 class MetalClayPriceScraper:
-    def __init__(self, cache_dir="metalclay_cache"):
-        self.cache_dir = cache_dir
+    def __init__(self, cache: ScraperCache = results_cache):
+        self.cache = cache
         self.base_url = "https://www.metalclay.co.uk"
-        
-        # Create cache directory if it doesn't exist
-        if not os.path.exists(cache_dir):
-            os.makedirs(cache_dir)
+        self.namespace = supplier_namespace(self.base_url)
     
-    def _get_cache_filename(self, url: str) -> str:
-        """Generate a cache filename from URL"""
-        # Use the product slug from the URL as the cache key
-        slug = url.rstrip('/').split('/')[-1]
-        return os.path.join(self.cache_dir, f"{slug}.json")
-    
-    def get_cached_price(self, url: str) -> Optional[Dict]:
-        """Get price from cache if it's from today"""
-        cache_file = self._get_cache_filename(url)
-        
-        if not os.path.exists(cache_file):
-            return None
-        
-        try:
-            with open(cache_file, 'r') as f:
-                cache_data = json.load(f)
-            
-            cached_time = datetime.fromisoformat(cache_data['timestamp'])
-            if cached_time.date() == datetime.now().date():
-                return cache_data
-            
-        except Exception as e:
-            print(f"⚠️ Error reading cache for {url}: {e}")
-        
-        return None
+    def get_cached_price(self, url: str, max_age: Optional[int] = None) -> Optional[Dict]:
+        """Get price from cache if it's from today (and no older than max_age seconds)"""
+        return self.cache.get(url, namespace=self.namespace, max_age=max_age)
     
     def save_to_cache(self, url: str, price_data: Dict):
-        """Save price to cache"""
-        cache_file = self._get_cache_filename(url)
+        """Save price to cache until the end of the day"""
         try:
-            with open(cache_file, 'w') as f:
-                json.dump(price_data, f, indent=2)
+            self.cache.set(url, price_data, ttl=seconds_until_midnight(), namespace=self.namespace)
         except Exception as e:
             print(f"⚠️ Error saving cache for {url}: {e}")
     
-    def fetch_product_price(self, url: str) -> Optional[Dict]:
-        """Fetch price for a specific product from Metal Clay Ltd"""
+    def parse_product_page(self, content, url: str = '') -> Optional[Dict]:
+        """Extract title and inc/ex VAT prices from a product page, or None if no price is found"""
+        doc = page_parser.parse_page(content)
+        
+        # Get product title
+        product_title = page_parser.heading(doc) or "Unknown Product"
+        
+        prices = page_parser.strategy_memo.run(self.namespace, PRICE_STRATEGIES, doc)
+        if not prices:
+            return None
+        
+        price_data = {
+            'url': url,
+            'product_title': product_title,
+            'timestamp': datetime.now().isoformat(),
+            'source': 'Metal Clay Ltd',
+            **prices
+        }
+        
+        # Use ex. VAT price as the main price (for business use)
+        price_data['price'] = price_data.get('price_ex_vat', price_data.get('price_inc_vat', 0))
+        return price_data
+    
+    def fetch_product_price(self, url: str, max_age: Optional[int] = None) -> Optional[Dict]:
+        """
+        Fetch price for a specific product from Metal Clay Ltd
+
+        Args:
+            url: Product page URL
+            max_age: Seconds a cached price or page may be used without revalidating
+                     (0 always asks the site, which costs only a 304 when unchanged)
+        """
         # Try to get from cache first
-        cached = self.get_cached_price(url)
+        cached = self.get_cached_price(url, max_age=max_age)
         if cached:
             return cached
         
         try:
             print(f"🔍 Fetching price from {url}...")
             
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            
-            # Disable SSL verification to avoid certificate issues
-            response = requests.get(url, headers=headers, timeout=10, verify=False)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Get product title
-            title_tag = soup.find('h1')
-            product_title = title_tag.get_text(strip=True) if title_tag else "Unknown Product"
-            
-            # Look for price patterns - inc. VAT and ex. VAT
-            # Pattern: £64.95inc. VAT £54.12ex. VAT
-            price_text = soup.get_text()
-            
-            # Try to find inc. VAT price
-            inc_vat_pattern = r'£([\d,]+\.?\d*)\s*inc\.\s*VAT'
-            inc_vat_match = re.search(inc_vat_pattern, price_text, re.IGNORECASE)
-            
-            # Try to find ex. VAT price
-            ex_vat_pattern = r'£([\d,]+\.?\d*)\s*ex\.\s*VAT'
-            ex_vat_match = re.search(ex_vat_pattern, price_text, re.IGNORECASE)
+            response = http_cache.get(url, ttl=max_age)
+            # An unchanged page (304) reuses the price parsed from it last time
+            price_data = response.parsed
+            if price_data:
+                price_data['timestamp'] = datetime.now().isoformat()
+            else:
+                price_data = self.parse_product_page(response.content, url)
+                if price_data:
+                    http_cache.save_parsed(url, price_data)
             
-            if inc_vat_match or ex_vat_match:
-                price_data = {
-                    'url': url,
-                    'product_title': product_title,
-                    'timestamp': datetime.now().isoformat(),
-                    'source': 'Metal Clay Ltd'
-                }
-                
-                if inc_vat_match:
-                    inc_vat_price_str = inc_vat_match.group(1).replace(',', '')
-                    price_data['price_inc_vat'] = float(inc_vat_price_str)
-                
-                if ex_vat_match:
-                    ex_vat_price_str = ex_vat_match.group(1).replace(',', '')
-                    price_data['price_ex_vat'] = float(ex_vat_price_str)
-                
-                # Use ex. VAT price as the main price (for business use)
-                price_data['price'] = price_data.get('price_ex_vat', price_data.get('price_inc_vat', 0))
-                
+            if price_data:
                 self.save_to_cache(url, price_data)
-                print(f"✅ Fetched price for '{product_title}': £{price_data['price']:.2f} (ex. VAT)")
-                
+                print(f"✅ Fetched price for '{price_data['product_title']}': £{price_data['price']:.2f} (ex. VAT)")
                 return price_data
             else:
                 print(f"⚠️ Could not find price on page: {url}")
@@ -131,17 +145,8 @@ class MetalClayPriceScraper:
     
     def clear_cache(self, url: Optional[str] = None):
         """Clear cache for a specific URL or all cached prices"""
-        if url:
-            cache_file = self._get_cache_filename(url)
-            if os.path.exists(cache_file):
-                os.remove(cache_file)
-                print(f"✅ Cache cleared for {url}")
-        else:
-            # Clear all cache files
-            for filename in os.listdir(self.cache_dir):
-                if filename.endswith('.json'):
-                    os.remove(os.path.join(self.cache_dir, filename))
-            print("✅ All cache cleared")
+        self.cache.delete(url=url, namespace=self.namespace)
+        print(f"✅ Cache cleared for {url}" if url else "✅ All cache cleared")
 
 
 # Example usage
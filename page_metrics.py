@@ -0,0 +1,242 @@
+"""Render time and database work of every page, and a log of the slow ones.
+
+install() wraps every @ui.page handler registered after it and every
+Database method. Each page render records its wall time, the SQL statements
+run, the connections opened and the rows fetched, broken down by the
+Database method responsible. Renders slower than SLOW_PAGE_SECONDS are
+appended to SLOW_PAGE_LOG with that breakdown, so a lagging page shows
+whether it is one slow query or the same query run once per row (an N+1).
+
+app_new installs it in development, and in production only with
+PAGE_METRICS=1, since it wraps every database call.
+
+Only work done while the handler builds the page is counted: the render's
+context follows asyncio.to_thread, but not background threads or later
+button clicks.
+
+Configured with environment variables:
+    SLOW_PAGE_SECONDS   renders slower than this are logged (default 0.5)
+    SLOW_PAGE_LOG       log file (default slow_pages.log)
+    MAX_PAGE_QUERIES    N+1 detector for tests: a render running more
+                        statements than this fails with an AssertionError
+                        (default 0, off)
+"""
+import contextvars
+import functools
+import inspect
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+SLOW_PAGE_SECONDS = float(os.environ.get('SLOW_PAGE_SECONDS', 0.5))
+SLOW_PAGE_LOG = os.environ.get('SLOW_PAGE_LOG', 'slow_pages.log')
+MAX_PAGE_QUERIES = int(os.environ.get('MAX_PAGE_QUERIES', 0))
+
+# Transaction control isn't a query
+_TRANSACTION_STATEMENTS = ('BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE')
+
+# The trace callback sees statements with their parameters filled in; strings,
+# blobs and numbers go back to ? so the same query with different values is
+# counted as one statement run N times
+_LITERAL_RE = re.compile(r"[xX]?'(?:[^']|'')*'|\b\d+(?:\.\d+)?(?:[eE][+-]?\d+)?\b")
+
+# Statements outside any Database method (e.g. a page opening its own connection)
+DIRECT = '(direct)'
+
+_current: contextvars.ContextVar[Optional['PageRender']] = contextvars.ContextVar('page_render', default=None)
+
+
+class PageRender:
+    """Wall time and database work of one page render"""
+
+    def __init__(self, path: str, params: Dict):
+        self.path = path
+        self.params = params
+        self.seconds = 0.0
+        self.statements = 0
+        self.connections = 0
+        self.rows = 0
+        self.methods: Dict[str, Dict] = {}  # method: {'calls', 'seconds', 'statements', 'rows'}
+        self.sql: Dict[str, int] = {}  # statement text: times run
+        self.method: Optional[str] = None  # outermost Database method running now
+        self._lock = threading.Lock()
+
+    def _method(self, name: str) -> Dict:
+        return self.methods.setdefault(name, {'calls': 0, 'seconds': 0.0, 'statements': 0, 'rows': 0})
+
+    def add_call(self, method: str, seconds: float):
+        with self._lock:
+            entry = self._method(method)
+            entry['calls'] += 1
+            entry['seconds'] += seconds
+
+    def add_statement(self, sql: str):
+        sql = _LITERAL_RE.sub('?', ' '.join(sql.split()))
+        if sql.upper().startswith(_TRANSACTION_STATEMENTS):
+            return
+        with self._lock:
+            self.statements += 1
+            self._method(self.method or DIRECT)['statements'] += 1
+            self.sql[sql] = self.sql.get(sql, 0) + 1
+
+    def add_rows(self, count: int):
+        with self._lock:
+            self.rows += count
+            self._method(self.method or DIRECT)['rows'] += count
+
+    def add_connection(self):
+        with self._lock:
+            self.connections += 1
+
+    @property
+    def label(self) -> str:
+        params = ', '.join(f'{name}={value!r}' for name, value in self.params.items() if value is not None)
+        return f'{self.path} ({params})' if params else self.path
+
+    def summary(self) -> str:
+        return (f"{self.label} {self.seconds * 1000:.0f} ms: {self.statements} statements, "
+                f"{self.connections} connections, {self.rows} rows")
+
+    def breakdown(self) -> str:
+        """The summary, then each Database method's share and the most repeated statements"""
+        lines = [f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} {self.summary()}"]
+        for name, entry in sorted(self.methods.items(), key=lambda item: -item[1]['seconds']):
+            lines.append(f"  {name:<36}{entry['calls']:>5} calls{entry['seconds'] * 1000:>9.1f} ms"
+                         f"{entry['statements']:>6} statements{entry['rows']:>7} rows")
+        repeated = sorted(self.sql.items(), key=lambda item: -item[1])[:5]
+        for sql, count in repeated:
+            lines.append(f"  {count:>5}x  {sql[:150]}")
+        return '\n'.join(lines)
+
+
+class MeteredCursor(sqlite3.Cursor):
+    """Counts the rows fetched toward the page render that opened its connection"""
+
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None and self.connection.render is not None:
+            self.connection.render.add_rows(1)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = super().fetchmany(*args, **kwargs)
+        if self.connection.render is not None:
+            self.connection.render.add_rows(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        if self.connection.render is not None:
+            self.connection.render.add_rows(len(rows))
+        return rows
+
+
+class MeteredConnection(sqlite3.Connection):
+    """Counts itself and its statements toward the current page render, if any"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.render = _current.get()
+        if self.render is not None:
+            self.render.add_connection()
+            self.set_trace_callback(self.render.add_statement)
+
+    def cursor(self, factory=MeteredCursor):
+        return super().cursor(factory)
+
+    # The shortcut methods would otherwise create plain cursors
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, parameters):
+        return self.cursor().executemany(sql, parameters)
+
+
+def _metered_method(name: str, method: Callable) -> Callable:
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        render = _current.get()
+        if render is None or render.method is not None:  # nested calls count toward the outer one
+            return method(*args, **kwargs)
+        render.method = name
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            render.method = None
+            render.add_call(name, time.perf_counter() - start)
+    return wrapper
+
+
+def _finish(render: PageRender):
+    if render.seconds >= SLOW_PAGE_SECONDS:
+        print(f"🐢 Slow page {render.summary()}")
+        try:
+            with open(SLOW_PAGE_LOG, 'a', encoding='utf-8') as f:
+                f.write(render.breakdown() + '\n\n')
+        except OSError as e:
+            print(f"Could not write {SLOW_PAGE_LOG}: {e}")
+    if MAX_PAGE_QUERIES and render.statements > MAX_PAGE_QUERIES:
+        raise AssertionError(f"{render.label} ran {render.statements} statements "
+                             f"(limit {MAX_PAGE_QUERIES}):\n{render.breakdown()}")
+
+
+def metered_page(path: str, func: Callable) -> Callable:
+    """Wrap a page handler so each render is timed and its database work counted"""
+    def start(kwargs):
+        render = PageRender(path, dict(kwargs))
+        return render, _current.set(render), time.perf_counter()
+
+    def stop(render, token, started):
+        render.seconds = time.perf_counter() - started
+        _current.reset(token)
+        _finish(render)
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            render, token, started = start(kwargs)
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                stop(render, token, started)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        render, token, started = start(kwargs)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stop(render, token, started)
+    return wrapper
+
+
+_installed = False
+
+
+def install():
+    """Meter every Database method and every page registered from now on"""
+    global _installed
+    if _installed:
+        return
+    _installed = True
+
+    from nicegui import ui
+    from database import Database
+
+    Database.connection_factory = MeteredConnection
+    for name, member in list(vars(Database).items()):
+        if inspect.isfunction(member) and not name.startswith('__') and name != 'get_connection':
+            setattr(Database, name, _metered_method(name, member))
+
+    register = ui.page.__call__
+
+    @functools.wraps(register)
+    def metered_register(page, func):
+        return register(page, metered_page(page.path, func))
+    ui.page.__call__ = metered_register
@@ -0,0 +1,229 @@
+"""Shared HTML parsing for the supplier scrapers.
+
+Pages are parsed straight into an lxml tree, which happens entirely in C, and
+the extractors read only the parts of the page they need through precompiled
+XPath queries: the price meta tag, the heading, and the text of the tags that
+hold prices and spec lists. Navigation links, scripts, styles and the rest of
+the page chrome are never turned into Python objects or scanned by regexes.
+"""
+import json
+import re
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import lxml.html
+from lxml import etree
+
+# Tags whose own text holds product details (prices, spec lists, descriptions).
+# Text inside links is excluded, which keeps menus and related-product names out.
+_PRODUCT_TEXT_PARENTS = ' or '.join(
+    f'parent::{tag}' for tag in
+    ('h1', 'p', 'div', 'span', 'strong', 'b', 'em', 'small', 'label', 'li', 'td', 'th', 'dt', 'dd')
+)
+# Every visible text node, for when the product-detail tags don't hold what
+# an extractor is looking for
+_VISIBLE_TEXT = 'not(ancestor::script or ancestor::style or ancestor::noscript)'
+
+_PRODUCT_TEXT = etree.XPath(f'//body//text()[{_PRODUCT_TEXT_PARENTS}]')
+_PRICE_TEXT = etree.XPath(f'//body//text()[contains(., "£")][{_PRODUCT_TEXT_PARENTS}]')
+_PAGE_TEXT = etree.XPath(f'//body//text()[{_VISIBLE_TEXT}]')
+_PAGE_PRICE_TEXT = etree.XPath(f'//body//text()[contains(., "£")][{_VISIBLE_TEXT}]')
+_META_BY_ITEMPROP = etree.XPath('//meta[@itemprop=$name]/@content')
+_META_BY_PROPERTY = etree.XPath('//meta[@property=$name]/@content')
+_HEADING = etree.XPath('//h1')
+# List items outside the page header/navigation/footer, plus table and definition cells
+_SPEC_CELLS = etree.XPath('//li[not(ancestor::nav or ancestor::header or ancestor::footer)] | //td | //dd')
+_JSON_LD = etree.XPath('//script[@type="application/ld+json"]/text()')
+_MICRODATA_PRODUCT = etree.XPath('//*[@itemscope][contains(@itemtype, "schema.org/Product")]')
+_ITEMPROP = etree.XPath('.//*[@itemprop=$name]')
+
+# A plain amount such as "3.32", "£1,234.50" - not "2,889.44 per kg"
+_PLAIN_AMOUNT_RE = re.compile(r'^\s*£?\s*([\d,]*\d(?:\.\d+)?)\s*$')
+
+
+def parse_page(content) -> etree._Element:
+    """Parse a page (bytes, so the page's declared encoding is honoured)"""
+    return lxml.html.fromstring(content)
+
+
+def product_text(doc, whole_page: bool = False) -> str:
+    """Text of the product-detail tags (or of the whole page body), space separated"""
+    return ' '.join((_PAGE_TEXT if whole_page else _PRODUCT_TEXT)(doc))
+
+
+def price_texts(doc, whole_page: bool = False) -> List[str]:
+    """Product-detail (or any visible) text nodes containing a £ sign, in document order"""
+    return [str(text) for text in (_PAGE_PRICE_TEXT if whole_page else _PRICE_TEXT)(doc)]
+
+
+def meta_itemprop(doc, name: str) -> Optional[str]:
+    """content of the first <meta itemprop=name>"""
+    values = _META_BY_ITEMPROP(doc, name=name)
+    return str(values[0]) if values else None
+
+
+def meta_property(doc, name: str) -> Optional[str]:
+    """content of the first <meta property=name> (Open Graph tags)"""
+    values = _META_BY_PROPERTY(doc, name=name)
+    return str(values[0]) if values else None
+
+
+def heading(doc) -> Optional[str]:
+    """Text of the first <h1>"""
+    headings = _HEADING(doc)
+    if not headings:
+        return None
+    return ' '.join(headings[0].text_content().split()) or None
+
+
+def spec_cells(doc) -> List[str]:
+    """Text of list items, table cells and definitions (spec lists)"""
+    return [cell.text_content() for cell in _SPEC_CELLS(doc)]
+
+
+# ============ STRUCTURED DATA (schema.org) ============
+
+def parse_amount(value) -> Optional[float]:
+    """A plain price amount as a float, or None for anything else (ranges, per-weight prices)"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _PLAIN_AMOUNT_RE.match(str(value or ''))
+    return float(match.group(1).replace(',', '')) if match else None
+
+
+def json_ld_items(data):
+    """Walk a JSON-LD document, yielding every object (handles @graph and lists)"""
+    if isinstance(data, list):
+        for item in data:
+            yield from json_ld_items(item)
+    elif isinstance(data, dict):
+        yield data
+        if '@graph' in data:
+            yield from json_ld_items(data['@graph'])
+
+
+def json_ld_objects(doc):
+    """Every object in the page's JSON-LD blocks (malformed blocks are skipped)"""
+    for block in _JSON_LD(doc):
+        try:
+            data = json.loads(block)
+        except ValueError:
+            continue
+        yield from json_ld_items(data)
+
+
+def is_schema_type(item: Dict, type_name: str) -> bool:
+    types = item.get('@type')
+    return type_name in (types if isinstance(types, list) else [types])
+
+
+def json_ld_offer(doc) -> Optional[Dict]:
+    """
+    First schema.org Product offer in the page's JSON-LD.
+
+    Returns:
+        {'name', 'price', 'currency', 'vat_included'} (vat_included is None when the
+        page doesn't say), or None if there is no product with a plain price
+    """
+    for item in json_ld_objects(doc):
+        if not is_schema_type(item, 'Product'):
+            continue
+        offers = item.get('offers')
+        for offer in (offers if isinstance(offers, list) else [offers]):
+            if not isinstance(offer, dict):
+                continue
+            price = parse_amount(offer.get('price', offer.get('lowPrice')))
+            vat_included = None
+            spec = offer.get('priceSpecification')
+            for entry in (spec if isinstance(spec, list) else [spec]):
+                if isinstance(entry, dict):
+                    if price is None:
+                        price = parse_amount(entry.get('price'))
+                    if 'valueAddedTaxIncluded' in entry:
+                        vat_included = str(entry['valueAddedTaxIncluded']).lower() == 'true'
+            if price is not None:
+                return {
+                    'name': item.get('name'),
+                    'price': price,
+                    'currency': offer.get('priceCurrency'),
+                    'vat_included': vat_included,
+                }
+    return None
+
+
+def _itemprop_value(scope, name: str) -> Optional[str]:
+    elements = _ITEMPROP(scope, name=name)
+    if not elements:
+        return None
+    element = elements[0]
+    value = element.get('content')
+    return value if value is not None else element.text_content().strip()
+
+
+def microdata_offer(doc) -> Optional[Dict]:
+    """
+    schema.org Product microdata (itemprop="price" etc.), same shape as json_ld_offer().
+
+    Only a plain amount counts as a price, so per-weight prices such as
+    "2,889.44 per kg" are left to the per-gram extractor.
+    """
+    for scope in _MICRODATA_PRODUCT(doc) or [doc]:
+        price = parse_amount(_itemprop_value(scope, 'price'))
+        if price is not None:
+            return {
+                'name': _itemprop_value(scope, 'name'),
+                'price': price,
+                'currency': _itemprop_value(scope, 'priceCurrency'),
+                'vat_included': None,
+            }
+    return None
+
+
+def offer_prices(offer: Optional[Dict], vat_rate: float) -> Optional[Dict[str, float]]:
+    """
+    {'inc_vat', 'exc_vat'} from a structured offer, or None if it isn't a GBP price.
+
+    Shop prices shown to UK consumers include VAT, so that is assumed unless the
+    page says otherwise.
+    """
+    if not offer or (offer['currency'] and offer['currency'].upper() != 'GBP'):
+        return None
+    if offer['vat_included'] is False:
+        return {'inc_vat': offer['price'] * vat_rate, 'exc_vat': offer['price']}
+    return {'inc_vat': offer['price'], 'exc_vat': offer['price'] / vat_rate}
+
+
+# ============ STRATEGY MEMO ============
+
+class StrategyMemo:
+    """
+    Remembers which extraction strategy last worked for each key (e.g. supplier host).
+
+    Strategies are given cheapest first. The remembered one is tried first on the
+    next page from the same key, so pages skip strategies known not to work there;
+    the others are still tried, in order, if it stops working.
+    """
+
+    def __init__(self):
+        self._preferred: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def preferred(self, key: str) -> Optional[str]:
+        return self._preferred.get(key)
+
+    def run(self, key: str, strategies: Sequence[Tuple[str, Callable]], *args):
+        """Result of the first strategy that returns something other than None"""
+        preferred = self._preferred.get(key)
+        ordered = sorted(strategies, key=lambda strategy: strategy[0] != preferred)
+        for name, extract in ordered:
+            result = extract(*args)
+            if result is not None:
+                if name != preferred:
+                    with self._lock:
+                        self._preferred[key] = name
+                return result
+        return None
+
+
+# Shared by all scrapers; keyed by supplier host
+strategy_memo = StrategyMemo()
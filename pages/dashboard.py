@@ -1,14 +1,84 @@
 """Dashboard page - Main overview"""
 from nicegui import ui
-from datetime import datetime
+from datetime import datetime, timedelta
 from database import Database
 from utils import create_header, format_currency
-from silver_price_fetcher import SilverPriceFetcher
+from silver_price_fetcher import silver_fetcher
 from urllib.parse import quote
-import os
 
 db = Database()
-silver_fetcher = SilverPriceFetcher()
+
+
+def silver_history_chart_options(history):
+    """ECharts options for a min-max band with the average line, in £ per gram"""
+    periods = [row['period'] for row in history]
+    low = [round(row['min_per_kg'] / 1000, 4) for row in history]
+    spread = [round((row['max_per_kg'] - row['min_per_kg']) / 1000, 4) for row in history]
+    average = [round(row['avg_per_kg'] / 1000, 4) for row in history]
+    return {
+        'tooltip': {'trigger': 'axis'},
+        'grid': {'left': 50, 'right': 20, 'top': 20, 'bottom': 30},
+        'xAxis': {'type': 'category', 'data': periods, 'boundaryGap': False},
+        'yAxis': {'type': 'value', 'scale': True, 'name': '£/g'},
+        'series': [
+            {'name': 'Low', 'type': 'line', 'data': low, 'stack': 'range',
+             'lineStyle': {'opacity': 0}, 'symbol': 'none'},
+            {'name': 'Range', 'type': 'line', 'data': spread, 'stack': 'range',
+             'lineStyle': {'opacity': 0}, 'symbol': 'none',
+             'areaStyle': {'color': '#fcd34d', 'opacity': 0.4}},
+            {'name': 'Average', 'type': 'line', 'data': average, 'symbol': 'none',
+             'lineStyle': {'color': '#d97706', 'width': 2}},
+        ],
+    }
+
+
+def show_silver_history_dialog():
+    """Silver price trend from the pre-aggregated daily history"""
+    ranges = {90: '3 months', 365: '1 year', 0: 'All'}
+    
+    with ui.dialog() as dialog, ui.card().classes('w-[48rem] max-w-full'):
+        ui.label('Silver Price History').classes('text-xl font-bold')
+        with ui.row().classes('items-center gap-4'):
+            bucket_toggle = ui.toggle({'day': 'Daily', 'week': 'Weekly'}, value='day')
+            range_toggle = ui.toggle(ranges, value=365)
+        chart = ui.echart(silver_history_chart_options([])).classes('w-full h-72')
+        empty_label = ui.label('No price history yet - prices are recorded each time they are fetched.') \
+            .classes('text-sm text-gray-500')
+        summary_label = ui.label().classes('text-sm text-gray-600')
+        
+        # How each price source has performed (best first)
+        source_stats = silver_fetcher.sources.source_stats()
+        if any(stats['attempts'] for stats in source_stats.values()):
+            ui.label('Price sources').classes('text-sm font-bold text-gray-700 mt-2')
+            for name, stats in source_stats.items():
+                latency = f" · {stats['latency'] * 1000:.0f} ms" if stats['latency'] is not None else ''
+                ui.label(f"{name}: {stats['success_rate']:.0%} of {stats['attempts']} fetches{latency}") \
+                    .classes('text-xs text-gray-600')
+        
+        with ui.row().classes('w-full justify-end'):
+            ui.button('Close', on_click=dialog.close).props('flat')
+    
+    def load():
+        since = None
+        if range_toggle.value:
+            since = (datetime.now() - timedelta(days=range_toggle.value)).strftime('%Y-%m-%d')
+        history = db.get_silver_price_history(bucket_toggle.value, since=since)
+        chart.options.clear()
+        chart.options.update(silver_history_chart_options(history))
+        chart.update()
+        empty_label.set_visibility(not history)
+        if history:
+            low = min(row['min_per_kg'] for row in history) / 1000
+            high = max(row['max_per_kg'] for row in history) / 1000
+            summary_label.set_text(f"Low £{low:.3f}/g · High £{high:.3f}/g · Latest average "
+                                   f"£{history[-1]['avg_per_kg'] / 1000:.3f}/g")
+        else:
+            summary_label.set_text('')
+    
+    bucket_toggle.on_value_change(load)
+    range_toggle.on_value_change(load)
+    load()
+    dialog.open()
 
 
 def dashboard_page():
@@ -92,49 +162,69 @@ def dashboard_page():
             def _render_silver_content(container: ui.column):
                 container.clear()
                 with container:
-                    # Fetch silver price (cached or fresh)
-                    silver_price = silver_fetcher.get_price()
+                    # Last known price, straight from memory - a refresh (if one is
+                    # due) happens in the background and the poll below redraws
+                    silver_price = silver_fetcher.current()
 
-                    if silver_price and not silver_price.get('is_fallback'):
+                    if silver_price:
                         ui.label(f"£{silver_price['price_per_gram']:.3f}").classes('text-4xl font-bold text-amber-600')
                         ui.label('Silver Price (per gram)').classes('text-gray-600 text-sm')
 
                         timestamp = datetime.fromisoformat(silver_price['timestamp'])
                         time_str = timestamp.strftime('%d/%m/%y')
-                        ui.label(f"Updated: {time_str}").classes('text-xs text-gray-500 mt-1')
+                        if silver_fetcher.refreshing:
+                            ui.label(f"Updated: {time_str} · updating…").classes('text-xs text-gray-500 mt-1')
+                        elif silver_price['is_stale']:
+                            ui.label(f"Last known: {time_str}").classes('text-xs text-orange-600 mt-1')
+                        else:
+                            ui.label(f"Updated: {time_str}").classes('text-xs text-gray-500 mt-1')
 
-                        ui.button('🔄 Refresh', on_click=lambda: refresh_silver_price(force=True)).props('flat dense size=sm').classes('mt-1 text-xs')
+                        with ui.row().classes('gap-1 mt-1'):
+                            ui.button('🔄 Refresh', on_click=lambda: refresh_silver_price(force=True)).props('flat dense size=sm').classes('text-xs')
+                            ui.button('📈 History', on_click=show_silver_history_dialog).props('flat dense size=sm').classes('text-xs')
+                    elif silver_fetcher.refreshing:
+                        ui.label('Silver Price').classes('text-xl font-bold text-amber-600')
+                        ui.spinner(size='md', color='amber').classes('mt-2')
                     else:
                         ui.label('Silver Price').classes('text-xl font-bold text-amber-600')
                         ui.label('Unable to fetch price').classes('text-gray-500 text-sm mt-2')
                         ui.button('🔄 Try Again', on_click=lambda: refresh_silver_price(force=True)).props('flat dense size=sm').classes('mt-2 text-xs')
 
-            def refresh_silver_price(force: bool = False, notify: bool = False):
-                """Refresh the silver price display.
+            seen_version = silver_fetcher.version
+            seen_refreshing = silver_fetcher.refreshing
+            notify_on_update = False
 
-                - force=True clears cache and fetches fresh
-                - notify=True shows a success toast
-                """
-                if force:
-                    cache_file = "silver_price_cache.json"
-                    if os.path.exists(cache_file):
-                        os.remove(cache_file)
+            def refresh_silver_price(force: bool = False):
+                """Start a background refresh (force=True ignores the cache) and show it's updating"""
+                nonlocal notify_on_update
+                silver_fetcher.revalidate(force=force)
+                notify_on_update = force
+                poll_silver_price()
+
+            def poll_silver_price():
+                """Redraw the card when a background refresh starts or finishes"""
+                nonlocal seen_version, seen_refreshing, notify_on_update
+                silver_fetcher.revalidate()  # no-op unless the price has expired
+                if silver_fetcher.version == seen_version and silver_fetcher.refreshing == seen_refreshing:
+                    return
+                seen_version, seen_refreshing = silver_fetcher.version, silver_fetcher.refreshing
                 _render_silver_content(silver_content)
-                if notify:
-                    ui.notify('Silver price updated!', type='positive')
+                if notify_on_update and not seen_refreshing:
+                    notify_on_update = False
+                    price = silver_fetcher.current()
+                    if price and not price['is_stale']:
+                        ui.notify('Silver price updated!', type='positive')
+                    else:
+                        ui.notify('Could not fetch the silver price', type='warning')
             
             with silver_card:
                 with ui.column().classes('items-center justify-center h-full'):
                     silver_content = ui.column().classes('items-center justify-center h-full')
                     _render_silver_content(silver_content)
+                    seen_refreshing = silver_fetcher.refreshing
 
-                    def _auto_refresh_if_needed():
-                        # If cache isn't valid for today, refresh the card.
-                        if silver_fetcher.get_cached_price() is None:
-                            refresh_silver_price(force=False, notify=False)
-
-                    # Check hourly while the dashboard is open.
-                    ui.timer(60 * 60, _auto_refresh_if_needed)
+                    # Cheap in-memory check; picks up prices fetched for any client
+                    ui.timer(2, poll_silver_price)
         
         # Sales Channels Summary section
         if sales_channels:
@@ -3,7 +3,8 @@ from nicegui import ui
 from datetime import datetime
 from database import Database
 from utils import create_header, format_currency
-from price_scraper import get_material_price_from_url, scrape_weight_per_unit
+from scraping import fetch_product, product_price
+import price_refresh
 from ui_helpers import create_price_calculator
 
 db = Database()
@@ -40,36 +41,138 @@ def toggle_material_status(material, refresh_callback):
     refresh_callback()
 
 
+STATUS_ICONS = {
+    price_refresh.PENDING: '⏳',
+    price_refresh.FETCHING: '🔄',
+    price_refresh.UPDATED: '✅',
+    price_refresh.UNCHANGED: '➖',
+    price_refresh.FAILED: '❌',
+    price_refresh.CANCELLED: '⏹️',
+    price_refresh.SKIPPED: '⏭️',
+    price_refresh.UNAVAILABLE: '🚫',
+}
+
+
 def update_all_prices(refresh_callback):
-    """Update prices for all materials with supplier URLs"""
-    materials = db.get_all_materials()
-    materials_with_urls = [m for m in materials if m.get('supplier_url')]
+    """Update prices for all materials with supplier URLs as a background job"""
+    job = price_refresh.get_current_job()
+    if job is None or not job.running:
+        materials = db.get_all_materials()
+        materials_with_urls = [m for m in materials if m.get('supplier_url')]
+        
+        if not materials_with_urls:
+            ui.notify('No materials have supplier URLs to update', type='warning')
+            return
+        
+        job = price_refresh.start_price_refresh(db, materials_with_urls)
     
-    if not materials_with_urls:
-        ui.notify('No materials have supplier URLs to update', type='warning')
+    show_price_refresh_dialog(job, refresh_callback)
+
+
+def show_listing_refresh_dialog(refresh_callback):
+    """Reprice materials from a supplier category or search page in one pass"""
+    job = price_refresh.get_current_job()
+    if job is not None and job.running:
+        show_price_refresh_dialog(job, refresh_callback)
         return
     
-    ui.notify(f'Updating prices for {len(materials_with_urls)} materials...', type='info')
-    
-    updated = 0
-    failed = 0
+    with ui.dialog() as dialog, ui.card().classes('w-[32rem] max-w-full'):
+        ui.label('Update from Category Page').classes('text-xl font-bold')
+        ui.label(
+            'Paste a supplier category or search results URL. Every material from that supplier '
+            'whose product appears on the listing (all pages) is repriced from it.'
+        ).classes('text-sm text-gray-600')
+        url_input = ui.input('Category page URL').classes('w-full')
+        
+        def start():
+            url = (url_input.value or '').strip()
+            if not url.startswith(('http://', 'https://')):
+                ui.notify('Enter a full category page URL', type='warning')
+                return
+            materials = price_refresh.listing_candidates(url, db.get_all_materials())
+            if not materials:
+                ui.notify('No fixed-price materials from this supplier to update', type='warning')
+                return
+            dialog.close()
+            show_price_refresh_dialog(price_refresh.start_listing_refresh(db, url, materials), refresh_callback)
+        
+        with ui.row().classes('w-full justify-end gap-2 mt-2'):
+            ui.button('Cancel', on_click=dialog.close).props('flat')
+            ui.button('Start', on_click=start).props('color=orange')
     
-    for material in materials_with_urls:
-        pricing_type = material.get('pricing_type', 'fixed')
-        new_price = get_material_price_from_url(
-            material['supplier_url'], 
-            use_vat=True,
-            pricing_type=pricing_type
-        )
-        
-        if new_price:
-            db.update_material_price(material['id'], new_price)
-            updated += 1
-        else:
-            failed += 1
+    dialog.open()
+
+
+def show_price_refresh_dialog(job, refresh_callback):
+    """Show live progress of a price refresh job, with a cancel button"""
+    row_labels = {}
+    seen_version = -1
+    
+    with ui.dialog().props('persistent') as dialog, ui.card().classes('w-[36rem] max-w-full'):
+        ui.label('Updating Prices').classes('text-xl font-bold')
+        progress = ui.linear_progress(value=0, show_value=False).classes('w-full')
+        summary_label = ui.label().classes('text-sm text-gray-600')
+        
+        with ui.scroll_area().classes('w-full h-80 border rounded'):
+            with ui.column().classes('w-full gap-1 p-2'):
+                for row in job.snapshot()['rows']:
+                    row_labels[row['id']] = ui.label().classes('text-sm')
+        
+        with ui.row().classes('w-full justify-end gap-2 mt-2'):
+            cancel_button = ui.button('Cancel', on_click=lambda: (job.cancel(), cancel_button.disable())).props('color=red flat')
+            close_button = ui.button('Close', on_click=dialog.close)
+            close_button.set_visibility(False)
+    
+    def row_text(row):
+        text = f"{STATUS_ICONS[row['status']]} {row['name']}"
+        if row['status'] == price_refresh.UPDATED:
+            text += f" — {format_currency(row['old_price'])} → {format_currency(row['new_price'])}"
+        elif row['status'] == price_refresh.FAILED:
+            text += ' — could not fetch price'
+        elif row['status'] == price_refresh.SKIPPED:
+            text += ' — not on this listing'
+        elif row['status'] == price_refresh.UNAVAILABLE:
+            text += ' — supplier unavailable'
+        return text
+    
+    def poll():
+        nonlocal seen_version
+        if job.version == seen_version:
+            return
+        seen_version = job.version
+        state = job.snapshot()
+        
+        for row in state['rows']:
+            label = row_labels[row['id']]
+            text = row_text(row)
+            if label.text != text:
+                label.set_text(text)
+        
+        progress.set_value(state['done'] / state['total'] if state['total'] else 1)
+        summary = f"{state['done']} of {state['total']} checked · {state['updated']} changed · {state['failed']} failed"
+        if state['unavailable']:
+            summary += f" · {state['unavailable']} supplier unavailable"
+        summary_label.set_text(summary)
+        
+        if state['finished']:
+            timer.deactivate()
+            cancel_button.set_visibility(False)
+            close_button.set_visibility(True)
+            if state['error']:
+                ui.notify(f"Could not save prices: {state['error']}", type='negative')
+            else:
+                stopped = ' (cancelled)' if state['cancelled'] else ''
+                unavailable = f" {state['unavailable']} skipped (supplier unavailable)." if state['unavailable'] else ''
+                ui.notify(
+                    f"Saved {state['saved']} changed prices{stopped}. {state['failed']} failed.{unavailable}",
+                    type='positive' if state['failed'] == 0 and not state['unavailable'] and not state['cancelled'] else 'warning'
+                )
+            refresh_callback()
     
-    ui.notify(f'Updated {updated} prices. {failed} failed.', type='positive' if failed == 0 else 'warning')
-    refresh_callback()
+    timer = ui.timer(0.5, poll)
+    poll()
+    dialog.on('hide', timer.cancel)
+    dialog.open()
 
 
 def delete_material(material, refresh_callback):
@@ -103,17 +206,14 @@ def update_price_from_url(material, refresh_callback):
     # Get pricing type (default to 'fixed' for existing materials)
     pricing_type = material.get('pricing_type', 'fixed')
     
-    # Scrape the price
-    new_price = get_material_price_from_url(
-        material['supplier_url'], 
-        use_vat=True,
-        pricing_type=pricing_type
-    )
+    # Download the product page once and read both the price and the weight from it
+    product = fetch_product(material['supplier_url'])
+    new_price = product_price(product, use_vat=True, pricing_type=pricing_type)
     
-    # If it's item weight-based pricing, also try to scrape weight per unit
+    # If it's item weight-based pricing, also use the weight per unit from the page
     weight_per_unit = None
-    if pricing_type == 'per_kg_item':
-        weight_per_unit = scrape_weight_per_unit(material['supplier_url'])
+    if pricing_type == 'per_kg_item' and product:
+        weight_per_unit = product['weight_per_unit']
     
     if new_price:
         # Update the base price in database
@@ -136,6 +236,8 @@ def update_price_from_url(material, refresh_callback):
             pricing_type=pricing_type,
             weight_per_unit=weight_per_unit if weight_per_unit else material.get('weight_per_unit')
         )
+        if material.get('spot_index'):
+            db.calibrate_spot_link(material['id'])
         
         price_label = 'per g' if pricing_type == 'per_kg' else ''
         weight_msg = f' | Weight: {weight_per_unit}g/unit' if weight_per_unit else ''
@@ -212,7 +314,8 @@ def show_add_material_dialog(refresh_callback):
                             ui.notify('Please enter Supplier URL first', type='warning')
                             return
                         ui.notify('Fetching weight info...', type='info')
-                        weight = scrape_weight_per_unit(url_input.value)
+                        product = fetch_product(url_input.value)
+                        weight = product['weight_per_unit'] if product else None
                         if weight:
                             weight_input.value = weight
                             if update_price_calculations_func:
@@ -392,7 +495,8 @@ def show_edit_material_dialog(material, refresh_callback):
                             ui.notify('Please enter a supplier URL first', type='warning')
                             return
                         try:
-                            weight = scrape_weight_per_unit(url_input.value)
+                            product = fetch_product(url_input.value)
+                            weight = product['weight_per_unit'] if product else None
                             if weight:
                                 weight_input.value = weight
                                 if update_price_calculations_func:
@@ -412,6 +516,12 @@ def show_edit_material_dialog(material, refresh_callback):
         update_weight_visibility()
         pricing_type_select.on('update:model-value', lambda: update_weight_visibility())
         
+        # Per-gram prices can follow the silver price instead of being scraped
+        with ui.column().classes('w-full gap-0') as spot_container:
+            spot_checkbox = ui.checkbox('🔗 Follow the silver price', value=material.get('spot_index') == 'silver')
+            ui.label('(Repriced from each silver price fetch, scaled from this price)').classes('text-xs text-gray-500')
+        spot_container.bind_visibility_from(pricing_type_select, 'value', backward=lambda v: v != 'Fixed Price')
+        
         markup_input = ui.number('Markup Percentage (%)', min=0, max=1000, step=0.1, precision=1,
                                 value=material.get('markup_percentage', 0)).classes('w-full')
         
@@ -502,6 +612,9 @@ def show_edit_material_dialog(material, refresh_callback):
                     pricing_type=pricing_type,
                     weight_per_unit=weight_input.value if weight_input and weight_input.value else None
                 )
+                follow_spot = spot_checkbox.value and pricing_type != 'fixed'
+                if follow_spot or material.get('spot_index'):
+                    db.set_material_spot_link(material['id'], 'silver' if follow_spot else None)
                 ui.notify(f'Material {name_input.value} updated! Category: {category_value}', type='positive')
                 dialog.close()
                 refresh_callback()
@@ -700,10 +813,11 @@ def render_material_row(material, refresh_callback):
     
     # Pricing type badge
     pricing_type = material.get('pricing_type', 'fixed')
+    spot_link = ' 🔗' if material.get('spot_index') else ''
     if pricing_type == 'per_kg':
-        ui.label('Per g').classes('text-xs bg-purple-100 text-purple-800 px-2 py-1 rounded')
+        ui.label(f'Per g{spot_link}').classes('text-xs bg-purple-100 text-purple-800 px-2 py-1 rounded')
     elif pricing_type == 'per_kg_item':
-        ui.label('Per g (item)').classes('text-xs bg-orange-100 text-orange-800 px-2 py-1 rounded')
+        ui.label(f'Per g (item){spot_link}').classes('text-xs bg-orange-100 text-orange-800 px-2 py-1 rounded')
     else:
         ui.label('Fixed').classes('text-xs bg-blue-100 text-blue-800 px-2 py-1 rounded')
     
@@ -776,6 +890,8 @@ def materials_page():
                          on_click=lambda: show_reorder_categories_dialog(refresh)).props('color=purple')
                 ui.button('🔄 Update All Prices', 
                          on_click=lambda: update_all_prices(refresh)).props('color=orange')
+                ui.button('📋 Update from Category Page', 
+                         on_click=lambda: show_listing_refresh_dialog(refresh)).props('color=orange outline')
                 ui.button('+ Add Material', 
                          on_click=lambda: show_add_material_dialog(refresh))
         
@@ -1,13 +1,93 @@
 """Purchase recording page"""
 from nicegui import ui
 from database import Database
+from catalogue import ALL_CATEGORIES, get_material_catalogue
 from utils import create_header, format_currency
 from datetime import date
 from typing import Optional
 from urllib.parse import quote
+import json
 
 db = Database()
 
+# Client half of the purchase price preview. The page ships
+# window.purchasePreview = {prices, ids, labels}; these methods keep the unit,
+# price and total labels current without a server round trip.
+PRICE_PREVIEW_JS = """
+Object.assign(window.purchasePreview, {
+  materialId: null,
+  quantity: null,
+  formatCurrency(amount) {
+    const precision = amount > 0 && amount < 0.01 ? 4 : 2;
+    return '£' + amount.toFixed(precision);
+  },
+  setMaterial(option) {
+    this.materialId = option ? this.ids[option.label] : null;
+    this.render();
+  },
+  setQuantity(value) {
+    this.quantity = parseFloat(value);
+    this.render();
+  },
+  render() {
+    // Blank labels rather than a stale total when the material or quantity is cleared
+    const price = this.prices[this.materialId];
+    document.getElementById(this.labels.unit).textContent = price ? price.unit : '';
+    document.getElementById(this.labels.price).textContent = price ? price.price : '';
+    document.getElementById(this.labels.total).textContent = price && this.quantity
+      ? 'Total Cost: ' + this.formatCurrency(price.final * this.quantity) : '';
+  },
+});
+"""
+
+
+def material_price_preview(material: dict) -> dict:
+    """
+    Build the purchase-form pricing breakdown for a material.
+    
+    Returns:
+        Dict with the 'unit' and 'price' label texts and the 'final' price per unit
+    """
+    # Calculate prices with pack quantity consideration and pricing type
+    pricing_type = material.get('pricing_type', 'fixed')
+    base_price = material['base_price']
+    pack_qty = material.get('pack_quantity', 1)
+    markup = material.get('markup_percentage', 0)
+    
+    # Calculate per-item prices based on pricing type
+    if pricing_type == 'per_kg_item' and material.get('weight_per_unit'):
+        # Item weight-based: price_per_gram * grams_per_item
+        price_per_item = base_price * material['weight_per_unit']
+    else:
+        # Fixed or bulk per_kg: divide pack price by quantity
+        price_per_item = base_price / pack_qty if pack_qty > 0 else base_price
+    
+    final_price_per_item = price_per_item * (1 + markup / 100)
+    
+    # Show pack information if applicable (without markup details)
+    if pricing_type == 'per_kg_item':
+        # Show weight-based pricing info
+        weight = material.get('weight_per_unit', 0)
+        price_text = (
+            f"{format_currency(base_price)}/g × {weight}g = "
+            f"{format_currency(price_per_item)}/item | "
+            f"Price: {format_currency(final_price_per_item)} per {material['unit_type']}"
+        )
+    elif pack_qty > 1:
+        price_text = (
+            f"Pack of {int(pack_qty)} @ {format_currency(base_price)} = "
+            f"{format_currency(price_per_item)}/item | "
+            f"Price: {format_currency(final_price_per_item)} per {material['unit_type']}"
+        )
+    else:
+        price_text = f"Price: {format_currency(final_price_per_item)} per {material['unit_type']}"
+    
+    return {
+        'unit': f"Unit: {material['unit_type']}",
+        'price': price_text,
+        'final': final_price_per_item,
+    }
+
 
 def purchases_page(
     selected_class: Optional[str] = None,
@@ -43,7 +123,8 @@ def purchases_page(
             ui.label('Record New Purchase').classes('text-2xl font-bold mb-4')
             
             students = db.get_all_students()
-            materials = db.get_active_materials_ordered()  # Get active materials in proper order
+            catalogue = get_material_catalogue(db)  # Active materials in proper order
+            materials = catalogue.materials
 
             if selected_class:
                 students = [s for s in students if (s.get('class_name') or 'No Class Assigned') == selected_class]
@@ -81,28 +162,36 @@ def purchases_page(
             # Date input (defaults to today)
             date_input = ui.input('Date *', value=str(date.today())).props('type=date').classes('w-full')
             
-            # Get unique categories from materials
-            categories = sorted(set(m.get('category', 'Uncategorized') or 'Uncategorized' for m in materials))
-            category_filter = ui.select(['All Categories'] + categories, label='Filter by Category', value='All Categories').classes('w-full')
+            # Category -> options maps are prebuilt once per catalogue version and
+            # shared across sessions; material_options holds every active material
+            category_filter = ui.select([ALL_CATEGORIES] + catalogue.categories, label='Filter by Category', value=ALL_CATEGORIES).classes('w-full')
+            material_options = catalogue.all_options
+            
+            def visible_options(query: str = '') -> list:
+                """Material labels to send to the browser for the selected category"""
+                if catalogue.is_large(category_filter.value):
+                    return catalogue.search(category_filter.value, query)
+                return catalogue.labels(category_filter.value)
             
             # Material select - will be filtered by category
-            material_options = {f"{m['name']} ({m['category']})": m['id'] for m in materials}
-            material_select = ui.select(list(material_options.keys()), label='Material *').classes('w-full')
+            material_select = ui.select(visible_options(), label='Material *', with_input=True).classes('w-full')
             
             def filter_materials():
-                """Filter materials based on selected category"""
-                if category_filter.value == 'All Categories':
-                    filtered_materials = materials
-                else:
-                    filtered_materials = [m for m in materials if (m.get('category') or 'Uncategorized') == category_filter.value]
-                
-                material_options.clear()
-                material_options.update({f"{m['name']} ({m['category']})": m['id'] for m in filtered_materials})
-                material_select.options = list(material_options.keys())
-                material_select.value = None
-                material_select.update()
+                """Swap in the prebuilt options for the selected category"""
+                material_select.set_options(visible_options(), value=None)
+                ui.run_javascript('purchasePreview.setMaterial(null)')
+            
+            def search_materials(e):
+                """Search large catalogues on the server as the user types"""
+                if not catalogue.is_large(category_filter.value):
+                    return  # Small lists are filtered in the browser
+                options = visible_options(e.args or '')
+                if material_select.value and material_select.value not in options:
+                    options.append(material_select.value)
+                material_select.set_options(options)
             
             category_filter.on('update:model-value', lambda: filter_materials())
+            material_select.on('input-value', search_materials)
             
             quantity_input = ui.number('Quantity *', min=0, step=0.01, precision=2).classes('w-full')
             
@@ -111,54 +200,23 @@ def purchases_page(
             price_label = ui.label('').classes('text-lg font-bold')
             total_label = ui.label('').classes('text-2xl font-bold text-green-600')
             
-            def update_price_info():
-                if material_select.value and quantity_input.value:
-                    material_id = material_options[material_select.value]
-                    material = db.get_material(material_id)
-                    
-                    # Calculate prices with pack quantity consideration and pricing type
-                    pricing_type = material.get('pricing_type', 'fixed')
-                    base_price = material['base_price']
-                    pack_qty = material.get('pack_quantity', 1)
-                    markup = material.get('markup_percentage', 0)
-                    
-                    # Calculate per-item prices based on pricing type
-                    if pricing_type == 'per_kg_item' and material.get('weight_per_unit'):
-                        # Item weight-based: price_per_gram * grams_per_item
-                        price_per_item = base_price * material['weight_per_unit']
-                    else:
-                        # Fixed or bulk per_kg: divide pack price by quantity
-                        price_per_item = base_price / pack_qty if pack_qty > 0 else base_price
-                    
-                    final_price_per_item = price_per_item * (1 + markup / 100)
-                    
-                    unit_label.text = f"Unit: {material['unit_type']}"
-                    
-                    # Show pack information if applicable (without markup details)
-                    if pricing_type == 'per_kg_item':
-                        # Show weight-based pricing info
-                        weight = material.get('weight_per_unit', 0)
-                        price_label.text = (
-                            f"{format_currency(base_price)}/g × {weight}g = "
-                            f"{format_currency(price_per_item)}/item | "
-                            f"Price: {format_currency(final_price_per_item)} per {material['unit_type']}"
-                        )
-                    elif pack_qty > 1:
-                        price_label.text = (
-                            f"Pack of {int(pack_qty)} @ {format_currency(base_price)} = "
-                            f"{format_currency(price_per_item)}/item | "
-                            f"Price: {format_currency(final_price_per_item)} per {material['unit_type']}"
-                        )
-                    else:
-                        price_label.text = (
-                            f"Price: {format_currency(final_price_per_item)} per {material['unit_type']}"
-                        )
-                    
-                    total = final_price_per_item * quantity_input.value
-                    total_label.text = f"Total Cost: {format_currency(total)}"
-            
-            material_select.on('update:model-value', update_price_info)
-            quantity_input.on('update:model-value', update_price_info)
+            # Ship every material's pricing breakdown with the page so the labels
+            # update in the browser rather than calling back to the server per keystroke
+            price_map = {m['id']: material_price_preview(m) for m in materials}
+            preview_data = {
+                'prices': price_map,
+                'ids': material_options,
+                'labels': {
+                    'unit': f'c{unit_label.id}',
+                    'price': f'c{price_label.id}',
+                    'total': f'c{total_label.id}',
+                },
+            }
+            preview_json = json.dumps(preview_data).replace('</', '<\\/')
+            ui.add_body_html(f'<script>window.purchasePreview = {preview_json};{PRICE_PREVIEW_JS}</script>')
+            
+            material_select.on('update:model-value', js_handler='(option) => purchasePreview.setMaterial(option)')
+            quantity_input.on('update:model-value', js_handler='(value) => purchasePreview.setQuantity(value)')
             
             notes_input = ui.textarea('Notes').classes('w-full')
             
@@ -170,6 +228,18 @@ def purchases_page(
                 student_id = student_options[student_select.value]
                 material_id = material_options[material_select.value]
                 
+                # Re-verify the previewed price once against the database
+                material = db.get_material(material_id)
+                if not material:
+                    ui.notify('Material no longer exists', type='negative')
+                    return
+                current_price = material_price_preview(material)['final']
+                if current_price != price_map.get(material_id, {}).get('final'):
+                    ui.notify(
+                        f'Price changed since the page was loaded - charged {format_currency(current_price)} per {material["unit_type"]}',
+                        type='warning'
+                    )
+                
                 # Get project ID if selected
                 project_id = None
                 if project_select.value and project_select.value != 'None':
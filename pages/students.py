@@ -2,12 +2,16 @@
 from nicegui import ui
 from datetime import datetime
 from database import Database
+from catalogue import get_class_names, get_material_catalogue, get_project_options
 from utils import create_header, format_currency
 from typing import Optional
 from urllib.parse import quote
 
 db = Database()
 
+# Purchases/payments shown per page on the student detail page
+PAGE_SIZE = 50
+
 
 def students_page(selected_class: Optional[str] = None):
     """Students management page"""
@@ -24,102 +28,161 @@ def students_page(selected_class: Optional[str] = None):
         # Student list with balances
         student_container = ui.column().classes('w-full max-w-6xl gap-4')
         
-        def refresh_students():
-            student_container.clear()
-            balances = db.get_all_student_balances()
+        # Keyed view state so a refresh only touches the rows that changed:
+        # class_name -> {'expansion', 'rows', header labels, 'students', 'cards', 'rendered'}
+        class_sections = {}
+        
+        def student_signature(student):
+            """Everything a student card displays - the card is re-rendered when this changes"""
+            return (
+                student['name'], student['email'], student['phone'],
+                student['balance'], student['total_purchases'], student['total_payments']
+            )
+        
+        def place(element, container, index):
+            """Move an element to position `index` in a container only if it isn't already there"""
+            children = container.default_slot.children
+            if index >= len(children) or children[index] is not element:
+                element.move(container, index)
+        
+        def render_student_card(student, class_name):
+            with ui.row().classes('w-full items-center justify-between'):
+                with ui.column():
+                    ui.label(student['name']).classes('text-xl font-bold')
+                    if student['email']:
+                        ui.label(f"📧 {student['email']}").classes('text-sm text-gray-600')
+                    if student['phone']:
+                        ui.label(f"📱 {student['phone']}").classes('text-sm text-gray-600')
+                
+                with ui.column().classes('items-end'):
+                    balance_amount = student['balance']
+                    if balance_amount < 0:
+                        ui.label(f"Owes: {format_currency(abs(balance_amount))}").classes('text-lg font-bold text-red-600')
+                    elif balance_amount > 0:
+                        ui.label(f"Credit: {format_currency(balance_amount)}").classes('text-lg font-bold text-green-600')
+                    else:
+                        ui.label('Settled').classes('text-lg font-bold text-gray-600')
+                    
+                    ui.label(f"Total Purchases: {format_currency(student['total_purchases'])}").classes('text-sm text-gray-600')
+                    ui.label(f"Total Payments: {format_currency(student['total_payments'])}").classes('text-sm text-gray-600')
+                
+                with ui.row().classes('gap-2'):
+                    encoded_class = quote(class_name)
+                    ui.button(
+                        '🛒 Purchase',
+                        on_click=lambda s_id=student['id'], cn=encoded_class: ui.navigate.to(
+                            f'/purchases?student_id={s_id}&class_name={cn}&return_to=students'
+                        )
+                    ).props('outline').classes('min-w-[120px]')
+                    ui.button(
+                        '💷 Payment',
+                        on_click=lambda s_id=student['id'], cn=encoded_class: ui.navigate.to(
+                            f'/payments?student_id={s_id}&class_name={cn}&return_to=students'
+                        )
+                    ).props('outline color=green').classes('min-w-[120px]')
+                    ui.button(
+                        'View Details',
+                        on_click=lambda s_id=student['id'], cn=class_name: ui.navigate.to(f'/student/{s_id}?class_name={quote(cn)}')
+                    )
+        
+        def sync_student_cards(class_name):
+            """Add, remove, re-render and reorder only the student cards that changed"""
+            section = class_sections[class_name]
+            cards = section['cards']
+            current_ids = {s['id'] for s in section['students']}
+            
+            for student_id in list(cards):
+                if student_id not in current_ids:
+                    cards.pop(student_id)['card'].delete()
             
-            # Group students by class (exclude sales channels)
+            for index, student in enumerate(section['students']):
+                entry = cards.get(student['id'])
+                if entry is None:
+                    with section['rows']:
+                        entry = cards[student['id']] = {'card': ui.card().classes('w-full'), 'signature': None}
+                
+                signature = student_signature(student)
+                if entry['signature'] != signature:
+                    entry['card'].clear()
+                    with entry['card']:
+                        render_student_card(student, class_name)
+                    entry['signature'] = signature
+                
+                place(entry['card'], section['rows'], index)
+        
+        def create_class_section(class_name, should_open):
+            section = {'students': [], 'cards': {}, 'rendered': False}
+            
+            def on_toggle(e):
+                # Collapsed classes only render their student rows on first expand
+                if e.value and not section['rendered']:
+                    section['rendered'] = True
+                    sync_student_cards(class_name)
+            
+            with student_container:
+                # Set value=True to open, value=False to close
+                with ui.expansion(class_name, icon='school', value=should_open, on_value_change=on_toggle).classes('w-full bg-blue-50 mb-2') as expansion:
+                    with expansion.add_slot('header'):
+                        with ui.row().classes('w-full items-center justify-between'):
+                            ui.label(class_name).classes('text-xl font-bold')
+                            with ui.row().classes('gap-4'):
+                                section['count_label'] = ui.label('').classes('text-sm text-gray-600')
+                                section['owed_label'] = ui.label('').classes('text-sm font-bold text-red-600')
+                                section['credit_label'] = ui.label('').classes('text-sm font-bold text-green-600')
+                    
+                    # Students in this class
+                    section['rows'] = ui.column().classes('w-full gap-4')
+            
+            section['expansion'] = expansion
+            section['rendered'] = should_open
+            class_sections[class_name] = section
+            return section
+        
+        def refresh_students():
+            # One query for every student with their totals (exclude sales channels)
             classes = {}
-            for balance in balances:
-                student = db.get_student(balance['student_id'])
-                # Skip sales channels
+            for student in db.get_student_summaries():
                 if student.get('is_sales_channel'):
                     continue
                 class_name = student.get('class_name') or 'No Class Assigned'
+                classes.setdefault(class_name, []).append(student)
+            
+            # Get custom class order
+            ordered_classes = db.get_ordered_classes()
+            
+            # Add 'No Class Assigned' at the end if it exists
+            if 'No Class Assigned' in classes and 'No Class Assigned' not in ordered_classes:
+                ordered_classes.append('No Class Assigned')
+            
+            # Skip classes with no students (all were sales channels)
+            ordered_classes = [c for c in ordered_classes if c in classes]
+            
+            # Drop sections for classes that have gone away
+            for class_name in list(class_sections):
                 if class_name not in classes:
-                    classes[class_name] = []
-                classes[class_name].append({'student': student, 'balance': balance})
+                    class_sections.pop(class_name)['expansion'].delete()
             
-            with student_container:
-                # Get custom class order
-                ordered_classes = db.get_ordered_classes()
-                
-                # Add 'No Class Assigned' at the end if it exists
-                if 'No Class Assigned' in classes and 'No Class Assigned' not in ordered_classes:
-                    ordered_classes.append('No Class Assigned')
-                
-                # Display classes in custom order
-                for class_name in ordered_classes:
-                    # Skip if this class has no students (all were sales channels)
-                    if class_name not in classes:
-                        continue
-                    
-                    students_in_class = classes[class_name]
-                    
-                    # Create an expansion panel for each class
-                    # Set value=True to open, value=False to close
+            # Display classes in custom order
+            for index, class_name in enumerate(ordered_classes):
+                students_in_class = classes[class_name]
+                section = class_sections.get(class_name)
+                if section is None:
                     should_open = (selected_class is None) or (class_name == selected_class)
-                    
-                    with ui.expansion(class_name, icon='school', value=should_open).classes('w-full bg-blue-50 mb-2') as expansion:
-                        
-                        # Add class summary in header
-                        total_owed = sum(s['balance']['balance'] for s in students_in_class if s['balance']['balance'] < 0)
-                        total_credit = sum(s['balance']['balance'] for s in students_in_class if s['balance']['balance'] > 0)
-                        
-                        with expansion.add_slot('header'):
-                            with ui.row().classes('w-full items-center justify-between'):
-                                ui.label(class_name).classes('text-xl font-bold')
-                                with ui.row().classes('gap-4'):
-                                    ui.label(f"{len(students_in_class)} student{'s' if len(students_in_class) != 1 else ''}").classes('text-sm text-gray-600')
-                                    if total_owed < 0:
-                                        ui.label(f"Total Owed: {format_currency(abs(total_owed))}").classes('text-sm font-bold text-red-600')
-                                    if total_credit > 0:
-                                        ui.label(f"Total Credit: {format_currency(total_credit)}").classes('text-sm font-bold text-green-600')
-                        
-                        # Students in this class
-                        for item in students_in_class:
-                            student = item['student']
-                            balance = item['balance']
-                            
-                            with ui.card().classes('w-full'):
-                                with ui.row().classes('w-full items-center justify-between'):
-                                    with ui.column():
-                                        ui.label(student['name']).classes('text-xl font-bold')
-                                        if student['email']:
-                                            ui.label(f"📧 {student['email']}").classes('text-sm text-gray-600')
-                                        if student['phone']:
-                                            ui.label(f"📱 {student['phone']}").classes('text-sm text-gray-600')
-                                    
-                                    with ui.column().classes('items-end'):
-                                        balance_amount = balance['balance']
-                                        if balance_amount < 0:
-                                            ui.label(f"Owes: {format_currency(abs(balance_amount))}").classes('text-lg font-bold text-red-600')
-                                        elif balance_amount > 0:
-                                            ui.label(f"Credit: {format_currency(balance_amount)}").classes('text-lg font-bold text-green-600')
-                                        else:
-                                            ui.label('Settled').classes('text-lg font-bold text-gray-600')
-                                        
-                                        ui.label(f"Total Purchases: {format_currency(balance['total_purchases'])}").classes('text-sm text-gray-600')
-                                        ui.label(f"Total Payments: {format_currency(balance['total_payments'])}").classes('text-sm text-gray-600')
-                                    
-                                    with ui.row().classes('gap-2'):
-                                        encoded_class = quote(class_name)
-                                        ui.button(
-                                            '🛒 Purchase',
-                                            on_click=lambda s_id=student['id'], cn=encoded_class: ui.navigate.to(
-                                                f'/purchases?student_id={s_id}&class_name={cn}&return_to=students'
-                                            )
-                                        ).props('outline').classes('min-w-[120px]')
-                                        ui.button(
-                                            '💷 Payment',
-                                            on_click=lambda s_id=student['id'], cn=encoded_class: ui.navigate.to(
-                                                f'/payments?student_id={s_id}&class_name={cn}&return_to=students'
-                                            )
-                                        ).props('outline color=green').classes('min-w-[120px]')
-                                        ui.button(
-                                            'View Details',
-                                            on_click=lambda s_id=student['id'], cn=class_name: ui.navigate.to(f'/student/{s_id}?class_name={quote(cn)}')
-                                        )
+                    section = create_class_section(class_name, should_open)
+                place(section['expansion'], student_container, index)
+                
+                # Class summary in header
+                total_owed = sum(s['balance'] for s in students_in_class if s['balance'] < 0)
+                total_credit = sum(s['balance'] for s in students_in_class if s['balance'] > 0)
+                section['count_label'].text = f"{len(students_in_class)} student{'s' if len(students_in_class) != 1 else ''}"
+                section['owed_label'].text = f"Total Owed: {format_currency(abs(total_owed))}"
+                section['owed_label'].set_visibility(total_owed < 0)
+                section['credit_label'].text = f"Total Credit: {format_currency(total_credit)}"
+                section['credit_label'].set_visibility(total_credit > 0)
+                
+                section['students'] = students_in_class
+                if section['rendered']:
+                    sync_student_cards(class_name)
         
         refresh_students()
         
@@ -238,21 +301,19 @@ def student_detail_page(student_id: int, class_name: Optional[str] = None):
     """Individual student detail page"""
     create_header()
     
-    student = db.get_student(student_id)
-    if not student:
+    # Student, balance, first page of purchases/payments and projects in one read
+    profile = db.get_student_profile(student_id, page_size=PAGE_SIZE)
+    if not profile:
         ui.label('Student not found')
         return
     
-    balance_info = db.get_student_balance(student_id)
+    student = profile['student']
+    balance_info = profile['balance']
     
     def show_edit_student_dialog(student_data):
         """Show dialog to edit student information"""
-        # Get existing class names for autocomplete
-        all_students = db.get_all_students()
-        existing_classes = sorted(list(set(s.get('class_name') for s in all_students if s.get('class_name'))))
-        
-        # Ensure we always have a list (even if empty)
-        class_options = existing_classes if existing_classes else []
+        # Existing class names for autocomplete (shared cached list)
+        class_options = get_class_names(db)
         
         with ui.dialog() as dialog, ui.card().classes('w-96'):
             ui.label('Edit Student Details').classes('text-xl font-bold mb-4')
@@ -391,6 +452,7 @@ def student_detail_page(student_id: int, class_name: Optional[str] = None):
         with ui.tabs().classes('w-full max-w-6xl') as tabs:
             purchases_tab = ui.tab('Purchases')
             payments_tab = ui.tab('Payments')
+            ledger_tab = ui.tab('Ledger')
             projects_tab = ui.tab('Projects')
         
         with ui.tab_panels(tabs, value=purchases_tab).classes('w-full max-w-6xl'):
@@ -398,151 +460,230 @@ def student_detail_page(student_id: int, class_name: Optional[str] = None):
             with ui.tab_panel(purchases_tab):
                 purchases_container = ui.column().classes('w-full')
                 
-                def refresh_purchases():
-                    purchases_container.clear()
-                    purchases = db.get_student_purchases(student_id)
-                    
-                    with purchases_container:
-                        if purchases:
-                            with ui.grid(columns=7).classes('w-full gap-2'):
-                                ui.label('Date').classes('font-bold')
-                                ui.label('Material').classes('font-bold')
-                                ui.label('Quantity').classes('font-bold')
-                                ui.label('Unit Price').classes('font-bold')
-                                ui.label('Total').classes('font-bold')
-                                ui.label('Project').classes('font-bold')
-                                ui.label('Actions').classes('font-bold')
-                                
-                                for purchase in purchases:
-                                    date = datetime.fromisoformat(purchase['purchase_date']).strftime('%d/%m/%Y %H:%M')
-                                    ui.label(date)
-                                    ui.label(purchase['material_name'])
-                                    ui.label(f"{purchase['quantity']:.2f} {purchase['unit_type']}")
-                                    ui.label(format_currency(purchase['unit_price']))
-                                    ui.label(format_currency(purchase['total_cost'])).classes('font-bold')
-                                    ui.label(purchase['project_name'] or '-')
-                                    
-                                    with ui.row().classes('gap-1'):
-                                        ui.button('✏️', on_click=lambda p=purchase: show_edit_purchase_dialog(p)).props('flat dense').tooltip('Edit purchase')
-                                        ui.button('🗑️', on_click=lambda p=purchase: show_delete_purchase_dialog(p)).props('flat dense color=red').tooltip('Delete purchase')
-                        else:
-                            ui.label('No purchases yet').classes('text-gray-500')
-                
-                refresh_purchases()
+                def render_purchase_rows(purchases):
+                    for purchase in purchases:
+                        date = datetime.fromisoformat(purchase['purchase_date']).strftime('%d/%m/%Y %H:%M')
+                        ui.label(date)
+                        ui.label(purchase['material_name'])
+                        ui.label(f"{purchase['quantity']:.2f} {purchase['unit_type']}")
+                        ui.label(format_currency(purchase['unit_price']))
+                        ui.label(format_currency(purchase['total_cost'])).classes('font-bold')
+                        ui.label(purchase['project_name'] or '-')
+                        
+                        with ui.row().classes('gap-1'):
+                            ui.button('✏️', on_click=lambda p=purchase: show_edit_purchase_dialog(p)).props('flat dense').tooltip('Edit purchase')
+                            ui.button('🗑️', on_click=lambda p=purchase: show_delete_purchase_dialog(p)).props('flat dense color=red').tooltip('Delete purchase')
+                
+                with purchases_container:
+                    if profile['purchases']:
+                        with ui.grid(columns=7).classes('w-full gap-2') as purchases_grid:
+                            ui.label('Date').classes('font-bold')
+                            ui.label('Material').classes('font-bold')
+                            ui.label('Quantity').classes('font-bold')
+                            ui.label('Unit Price').classes('font-bold')
+                            ui.label('Total').classes('font-bold')
+                            ui.label('Project').classes('font-bold')
+                            ui.label('Actions').classes('font-bold')
+                            render_purchase_rows(profile['purchases'])
+                        
+                        if profile['has_more_purchases']:
+                            purchases_loaded = len(profile['purchases'])
+                            
+                            def load_more_purchases():
+                                nonlocal purchases_loaded
+                                # One extra row tells us whether another page exists
+                                page = db.get_student_purchases(student_id, limit=PAGE_SIZE + 1, offset=purchases_loaded)
+                                purchases_loaded += len(page[:PAGE_SIZE])
+                                with purchases_grid:
+                                    render_purchase_rows(page[:PAGE_SIZE])
+                                if len(page) <= PAGE_SIZE:
+                                    more_purchases_button.delete()
+                            
+                            more_purchases_button = ui.button('Load more purchases', on_click=load_more_purchases).props('flat').classes('mt-2')
+                    else:
+                        ui.label('No purchases yet').classes('text-gray-500')
             
             # Payments panel
             with ui.tab_panel(payments_tab):
-                payments = db.get_student_payments(student_id)
-                
                 with ui.row().classes('w-full justify-end mb-4'):
                     ui.button('+ Record Payment', on_click=lambda: show_add_payment_dialog(student_id))
                 
-                if payments:
-                    with ui.grid(columns=6).classes('w-full gap-2'):
-                        ui.label('Date').classes('font-bold')
-                        ui.label('Amount').classes('font-bold')
-                        ui.label('Method').classes('font-bold')
-                        ui.label('Notes').classes('font-bold')
-                        ui.label('Actions').classes('font-bold')
-                        ui.label('')  # Empty cell for layout
-                        
-                        for payment in payments:
-                            date = datetime.fromisoformat(payment['payment_date']).strftime('%d/%m/%Y %H:%M')
-                            ui.label(date)
-                            ui.label(format_currency(payment['amount'])).classes('font-bold text-green-600')
-                            ui.label(payment['payment_method'] or '-')
-                            ui.label(payment['notes'] or '-')
+                def render_payment_rows(payments):
+                    for payment in payments:
+                        date = datetime.fromisoformat(payment['payment_date']).strftime('%d/%m/%Y %H:%M')
+                        ui.label(date)
+                        ui.label(format_currency(payment['amount'])).classes('font-bold text-green-600')
+                        ui.label(payment['payment_method'] or '-')
+                        ui.label(payment['notes'] or '-')
                             
-                            # Action buttons
-                            payment_id = payment['id']
+                        # Action buttons
+                        payment_id = payment['id']
                             
-                            def create_edit_handler(payment_data, sid):
-                                def edit_handler():
-                                    with ui.dialog() as edit_dialog, ui.card().classes('w-96'):
-                                        ui.label('Edit Payment').classes('text-xl font-bold mb-4')
+                        def create_edit_handler(payment_data, sid):
+                            def edit_handler():
+                                with ui.dialog() as edit_dialog, ui.card().classes('w-96'):
+                                    ui.label('Edit Payment').classes('text-xl font-bold mb-4')
                                         
-                                        # Parse the date for the input
-                                        payment_date_str = payment_data.get('payment_date') or ''
-                                        try:
-                                            date_value = datetime.fromisoformat(payment_date_str.split(' ')[0]).strftime('%Y-%m-%d')
-                                        except Exception:
-                                            date_value = str(date.today())
+                                    # Parse the date for the input
+                                    payment_date_str = payment_data.get('payment_date') or ''
+                                    try:
+                                        date_value = datetime.fromisoformat(payment_date_str.split(' ')[0]).strftime('%Y-%m-%d')
+                                    except Exception:
+                                        date_value = str(date.today())
                                         
-                                        date_input = ui.input('Date *', value=date_value).props('type=date').classes('w-full')
-                                        amount_input = ui.number('Amount (£) *', min=0, step=0.01, precision=2, value=float(payment_data.get('amount') or 0)).classes('w-full')
-                                        method_input = ui.select(['Cash', 'Card', 'Bank Transfer', 'Other'], 
-                                                                label='Payment Method', value=payment_data.get('payment_method') or '').classes('w-full')
-                                        notes_input = ui.textarea('Notes', value=payment_data.get('notes') or '').classes('w-full')
+                                    date_input = ui.input('Date *', value=date_value).props('type=date').classes('w-full')
+                                    amount_input = ui.number('Amount (£) *', min=0, step=0.01, precision=2, value=float(payment_data.get('amount') or 0)).classes('w-full')
+                                    method_input = ui.select(['Cash', 'Card', 'Bank Transfer', 'Other'], 
+                                                            label='Payment Method', value=payment_data.get('payment_method') or '').classes('w-full')
+                                    notes_input = ui.textarea('Notes', value=payment_data.get('notes') or '').classes('w-full')
                                         
-                                        with ui.row().classes('w-full justify-end gap-2 mt-4'):
-                                            ui.button('Cancel', on_click=edit_dialog.close).props('flat')
+                                    with ui.row().classes('w-full justify-end gap-2 mt-4'):
+                                        ui.button('Cancel', on_click=edit_dialog.close).props('flat')
                                             
-                                            def update_payment():
-                                                if not amount_input.value or amount_input.value <= 0:
-                                                    ui.notify('Please enter a valid amount', type='warning')
-                                                    return
+                                        def update_payment():
+                                            if not amount_input.value or amount_input.value <= 0:
+                                                ui.notify('Please enter a valid amount', type='warning')
+                                                return
                                                 
-                                                if db.update_payment(
-                                                    payment_id=payment_data['id'],
-                                                    amount=amount_input.value,
-                                                    payment_method=method_input.value or '',
-                                                    notes=notes_input.value or '',
-                                                    payment_date=date_input.value
-                                                ):
-                                                    ui.notify('Payment updated successfully', type='positive')
-                                                    edit_dialog.close()
-                                                    # Preserve class_name in navigation
-                                                    if class_name:
-                                                        ui.navigate.to(f'/student/{sid}?class_name={quote(class_name)}')  # Refresh page
-                                                    else:
-                                                        ui.navigate.to(f'/student/{sid}')  # Refresh page
+                                            if db.update_payment(
+                                                payment_id=payment_data['id'],
+                                                amount=amount_input.value,
+                                                payment_method=method_input.value or '',
+                                                notes=notes_input.value or '',
+                                                payment_date=date_input.value
+                                            ):
+                                                ui.notify('Payment updated successfully', type='positive')
+                                                edit_dialog.close()
+                                                # Preserve class_name in navigation
+                                                if class_name:
+                                                    ui.navigate.to(f'/student/{sid}?class_name={quote(class_name)}')  # Refresh page
                                                 else:
-                                                    ui.notify('Failed to update payment', type='negative')
+                                                    ui.navigate.to(f'/student/{sid}')  # Refresh page
+                                            else:
+                                                ui.notify('Failed to update payment', type='negative')
                                             
-                                            ui.button('Update', on_click=update_payment)
+                                        ui.button('Update', on_click=update_payment)
                                     
-                                    edit_dialog.open()
-                                return edit_handler
+                                edit_dialog.open()
+                            return edit_handler
                             
-                            def create_delete_handler(payment_data, sid):
-                                def delete_handler():
-                                    with ui.dialog() as delete_dialog, ui.card().classes('w-96'):
-                                        ui.label('Delete Payment?').classes('text-xl font-bold mb-4')
-                                        ui.label(f"Amount: {format_currency(payment_data['amount'])}").classes('text-gray-600')
-                                        ui.label(f"Date: {datetime.fromisoformat(payment_data['payment_date']).strftime('%d/%m/%Y %H:%M')}").classes('text-gray-600')
-                                        if payment_data.get('payment_method'):
-                                            ui.label(f"Method: {payment_data['payment_method']}").classes('text-gray-600')
-                                        ui.label('This action cannot be undone.').classes('text-red-600 mt-4')
+                        def create_delete_handler(payment_data, sid):
+                            def delete_handler():
+                                with ui.dialog() as delete_dialog, ui.card().classes('w-96'):
+                                    ui.label('Delete Payment?').classes('text-xl font-bold mb-4')
+                                    ui.label(f"Amount: {format_currency(payment_data['amount'])}").classes('text-gray-600')
+                                    ui.label(f"Date: {datetime.fromisoformat(payment_data['payment_date']).strftime('%d/%m/%Y %H:%M')}").classes('text-gray-600')
+                                    if payment_data.get('payment_method'):
+                                        ui.label(f"Method: {payment_data['payment_method']}").classes('text-gray-600')
+                                    ui.label('This action cannot be undone.').classes('text-red-600 mt-4')
                                         
-                                        with ui.row().classes('w-full justify-end gap-2 mt-4'):
-                                            ui.button('Cancel', on_click=delete_dialog.close).props('flat')
+                                    with ui.row().classes('w-full justify-end gap-2 mt-4'):
+                                        ui.button('Cancel', on_click=delete_dialog.close).props('flat')
                                             
-                                            def confirm_delete():
-                                                if db.delete_payment(payment_data['id']):
-                                                    ui.notify('Payment deleted successfully', type='positive')
-                                                    delete_dialog.close()
-                                                    # Preserve class_name in navigation
-                                                    if class_name:
-                                                        ui.navigate.to(f'/student/{sid}?class_name={quote(class_name)}')  # Refresh page
-                                                    else:
-                                                        ui.navigate.to(f'/student/{sid}')  # Refresh page
+                                        def confirm_delete():
+                                            if db.delete_payment(payment_data['id']):
+                                                ui.notify('Payment deleted successfully', type='positive')
+                                                delete_dialog.close()
+                                                # Preserve class_name in navigation
+                                                if class_name:
+                                                    ui.navigate.to(f'/student/{sid}?class_name={quote(class_name)}')  # Refresh page
                                                 else:
-                                                    ui.notify('Failed to delete payment', type='negative')
+                                                    ui.navigate.to(f'/student/{sid}')  # Refresh page
+                                            else:
+                                                ui.notify('Failed to delete payment', type='negative')
                                             
-                                            ui.button('Delete', on_click=confirm_delete).props('color=red')
+                                        ui.button('Delete', on_click=confirm_delete).props('color=red')
                                     
-                                    delete_dialog.open()
-                                return delete_handler
+                                delete_dialog.open()
+                            return delete_handler
                             
-                            with ui.row().classes('gap-1'):
-                                ui.button('✏️', on_click=create_edit_handler(payment, student_id)).props('flat dense color=blue').classes('text-sm')
-                                ui.button('🗑', on_click=create_delete_handler(payment, student_id)).props('flat dense color=red').classes('text-sm')
+                        with ui.row().classes('gap-1'):
+                            ui.button('✏️', on_click=create_edit_handler(payment, student_id)).props('flat dense color=blue').classes('text-sm')
+                            ui.button('🗑', on_click=create_delete_handler(payment, student_id)).props('flat dense color=red').classes('text-sm')
+                
+                if profile['payments']:
+                    with ui.grid(columns=6).classes('w-full gap-2') as payments_grid:
+                        ui.label('Date').classes('font-bold')
+                        ui.label('Amount').classes('font-bold')
+                        ui.label('Method').classes('font-bold')
+                        ui.label('Notes').classes('font-bold')
+                        ui.label('Actions').classes('font-bold')
+                        ui.label('')  # Empty cell for layout
+                        render_payment_rows(profile['payments'])
+                    
+                    if profile['has_more_payments']:
+                        payments_loaded = len(profile['payments'])
+                        
+                        def load_more_payments():
+                            nonlocal payments_loaded
+                            # One extra row tells us whether another page exists
+                            page = db.get_student_payments(student_id, limit=PAGE_SIZE + 1, offset=payments_loaded)
+                            payments_loaded += len(page[:PAGE_SIZE])
+                            with payments_grid:
+                                render_payment_rows(page[:PAGE_SIZE])
+                            if len(page) <= PAGE_SIZE:
+                                more_payments_button.delete()
+                        
+                        more_payments_button = ui.button('Load more payments', on_click=load_more_payments).props('flat').classes('mt-2')
                 else:
                     ui.label('No payments yet').classes('text-gray-500')
             
+            # Ledger panel - purchases and payments in date order with a running balance
+            with ui.tab_panel(ledger_tab):
+                ledger_cursor = None
+                
+                def render_ledger_rows(entries):
+                    for entry in entries:
+                        try:
+                            shown_date = datetime.fromisoformat(entry['entry_date']).strftime('%d/%m/%Y')
+                        except Exception:
+                            shown_date = entry['entry_date'] or ''
+                        ui.label(shown_date)
+                        
+                        if entry['entry_type'] == 'purchase':
+                            ui.label('Purchase')
+                            ui.label(f"{entry['description']} ({entry['quantity']:.2f} {entry['unit_type']})")
+                            ui.label(format_currency(-entry['amount']))
+                            ui.label('-')
+                        else:
+                            ui.label('Payment').classes('text-green-600')
+                            ui.label(entry['description'])
+                            ui.label('-')
+                            ui.label(format_currency(entry['amount'])).classes('text-green-600')
+                        
+                        running = entry['running_balance']
+                        if running < -0.005:
+                            ui.label(f"Owes {format_currency(abs(running))}").classes('font-bold text-red-600')
+                        elif running > 0.005:
+                            ui.label(f"Credit {format_currency(running)}").classes('font-bold text-green-600')
+                        else:
+                            ui.label('Settled').classes('font-bold text-gray-600')
+                
+                def load_more_ledger():
+                    nonlocal ledger_cursor
+                    page = db.get_student_ledger(student_id, cursor=ledger_cursor, limit=PAGE_SIZE)
+                    ledger_cursor = page['next_cursor']
+                    with ledger_grid:
+                        render_ledger_rows(page['entries'])
+                    if ledger_cursor is None:
+                        more_ledger_button.delete()
+                
+                if profile['purchases'] or profile['payments']:
+                    with ui.grid(columns=6).classes('w-full gap-2') as ledger_grid:
+                        ui.label('Date').classes('font-bold')
+                        ui.label('Type').classes('font-bold')
+                        ui.label('Description').classes('font-bold')
+                        ui.label('Charge').classes('font-bold')
+                        ui.label('Payment').classes('font-bold')
+                        ui.label('Balance').classes('font-bold')
+                    more_ledger_button = ui.button('Load older entries', on_click=load_more_ledger).props('flat').classes('mt-2')
+                    load_more_ledger()
+                else:
+                    ui.label('No purchases or payments yet').classes('text-gray-500')
+            
             # Projects panel
             with ui.tab_panel(projects_tab):
-                projects = db.get_student_projects(student_id)
+                projects = profile['projects']
                 
                 with ui.row().classes('w-full justify-end mb-4'):
                     ui.button('+ Add Project', on_click=lambda: show_add_project_dialog(student_id))
@@ -626,12 +767,9 @@ def student_detail_page(student_id: int, class_name: Optional[str] = None):
     
     def show_edit_purchase_dialog(purchase):
         """Show dialog to edit an existing purchase"""
-        # Get list of materials and projects
-        materials = db.get_active_materials()
-        all_projects = db.get_all_projects()
-        
-        material_options = {m['name']: m['id'] for m in materials}
-        project_options = {p['name']: p['id'] for p in all_projects}
+        # Material and project options come from the shared cached catalogue
+        material_options = get_material_catalogue(db).options_by_name
+        project_options = get_project_options(db)
         
         with ui.dialog() as dialog, ui.card().classes('w-96'):
             ui.label('Edit Purchase').classes('text-xl font-bold mb-4')
@@ -0,0 +1,339 @@
+"""Background "Update All Prices" job.
+
+Supplier prices are fetched concurrently, with a small cap on the number of
+requests in flight to any one supplier, and every fetched price is saved in a
+single transaction once the job finishes (or is cancelled). The job runs on its
+own thread so the UI stays responsive; pages poll `snapshot()` for progress.
+ListingRefreshJob reprices from a supplier's category listing instead, one
+request per page of results rather than one per product.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+from database import Database
+from scraping import cached_products, fetch_product, match_to_materials, product_price, scrape_listing
+from supplier_health import is_available
+
+# Requests in flight per supplier host - enough to hide latency without
+# hammering a single shop
+PER_SUPPLIER_LIMIT = 3
+
+# Results fetched this recently (e.g. by a cancelled run) are reused as-is
+REUSE_RESULTS_FOR = 10 * 60
+
+# Everything else is revalidated so a refresh sees current prices; unchanged
+# pages cost a 304 rather than a full download
+PAGE_MAX_AGE = 0
+
+# Row statuses
+PENDING = 'pending'
+FETCHING = 'fetching'
+UPDATED = 'updated'
+UNCHANGED = 'unchanged'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+SKIPPED = 'skipped'
+UNAVAILABLE = 'unavailable'
+
+
+def supplier_host(url: str) -> str:
+    """Host name used to group requests per supplier (www. stripped)"""
+    host = urlparse(url).netloc.lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+class PriceRefreshJob:
+    """Fetch new prices for a list of materials in the background"""
+
+    def __init__(self, db: Database, materials: List[Dict],
+                 fetch: Callable[..., Optional[Dict]] = fetch_product,
+                 lookup: Callable[..., Dict[str, Dict]] = cached_products,
+                 per_supplier: int = PER_SUPPLIER_LIMIT, save: bool = True):
+        self.db = db
+        self.fetch = fetch
+        self.lookup = lookup
+        self.per_supplier = per_supplier
+        self.save = save  # False for a dry run: prices are fetched but not written
+        self.rows: Dict[int, Dict] = {
+            m['id']: {
+                'id': m['id'],
+                'name': m['name'],
+                'supplier_url': m['supplier_url'],
+                'pricing_type': m.get('pricing_type') or 'fixed',
+                'old_price': m['base_price'],
+                'new_price': None,
+                'status': PENDING,
+            }
+            for m in materials
+        }
+        self.started_at: Optional[datetime] = None
+        self.finished = False
+        self.saved = 0  # materials whose price changed
+        self.error: Optional[str] = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._version = 0  # bumped on every row change so pollers can skip idle ticks
+        self._thread: Optional[threading.Thread] = None
+        self._done = threading.Event()
+
+    # ---- control ----
+
+    def start(self):
+        """Start the job on a background thread"""
+        self.started_at = datetime.now()
+        self._thread = threading.Thread(target=self._run, name='price-refresh', daemon=True)
+        self._thread.start()
+
+    def run(self):
+        """Run the job to completion on the calling thread (for background schedulers)"""
+        self.started_at = datetime.now()
+        self._run()
+
+    def cancel(self):
+        """Stop fetching; prices already fetched are still saved"""
+        self._cancel.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for a started job (on any thread) to finish saving; True if it has"""
+        if self.running:
+            self._done.wait(timeout)
+        return not self.running
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def running(self) -> bool:
+        """Started, in the background or with run(), and not finished saving"""
+        return self.started_at is not None and not self.finished
+
+    # ---- progress ----
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def snapshot(self) -> Dict:
+        """Consistent copy of the job state for rendering"""
+        with self._lock:
+            rows = [dict(row) for row in self.rows.values()]
+        done = sum(1 for row in rows if row['status'] not in (PENDING, FETCHING))
+        return {
+            'rows': rows,
+            'total': len(rows),
+            'done': done,
+            'updated': sum(1 for row in rows if row['status'] == UPDATED),
+            'failed': sum(1 for row in rows if row['status'] == FAILED),
+            'unavailable': sum(1 for row in rows if row['status'] == UNAVAILABLE),
+            'finished': self.finished,
+            'cancelled': self.cancelled,
+            'saved': self.saved,
+            'error': self.error,
+        }
+
+    def _set(self, material_id: int, **changes):
+        with self._lock:
+            self.rows[material_id].update(changes)
+            self._version += 1
+
+    # ---- work ----
+
+    def _fetch_one(self, material_id: int):
+        row = self.rows[material_id]
+        if self.cancelled:
+            self._set(material_id, status=CANCELLED)
+            return
+        # Once a supplier is failing, the rest of its materials are skipped
+        # instead of each waiting out its own timeout
+        if not is_available(row['supplier_url']):
+            self._set(material_id, status=UNAVAILABLE)
+            return
+        self._set(material_id, status=FETCHING)
+        try:
+            product = self.fetch(row['supplier_url'], max_age=PAGE_MAX_AGE)
+        except Exception as e:
+            print(f"Error refreshing price for {row['name']}: {e}")
+            product = None
+        if product is None and not is_available(row['supplier_url']):
+            self._set(material_id, status=UNAVAILABLE)
+            return
+        self._record(material_id, product)
+
+    def _record(self, material_id: int, product: Optional[Dict]):
+        row = self.rows[material_id]
+        new_price = product_price(product, use_vat=True, pricing_type=row['pricing_type'])
+        if not new_price:
+            self._set(material_id, status=FAILED)
+        elif abs(new_price - (row['old_price'] or 0)) < 1e-9:
+            self._set(material_id, status=UNCHANGED, new_price=new_price)
+        else:
+            self._set(material_id, status=UPDATED, new_price=new_price)
+
+    def _run(self):
+        try:
+            self._collect()
+        except Exception as e:
+            print(f"Error refreshing prices: {e}")
+            self.error = str(e)
+        self._save()
+
+    def _collect(self):
+        # Freshness of the whole list is checked in one query; only the
+        # materials without a recent result are fetched
+        try:
+            recent = self.lookup([row['supplier_url'] for row in self.rows.values()],
+                                 max_age=REUSE_RESULTS_FOR)
+        except Exception as e:
+            print(f"Error reading cached prices: {e}")
+            recent = {}
+
+        # One small pool per supplier caps concurrency per host while
+        # different suppliers are fetched in parallel
+        by_host: Dict[str, List[int]] = {}
+        for row in self.rows.values():
+            if row['supplier_url'] in recent:
+                self._record(row['id'], recent[row['supplier_url']])
+                continue
+            by_host.setdefault(supplier_host(row['supplier_url']), []).append(row['id'])
+
+        pools = [ThreadPoolExecutor(max_workers=min(self.per_supplier, len(ids)),
+                                    thread_name_prefix=f'price-{host}')
+                 for host, ids in by_host.items()]
+        try:
+            for pool, ids in zip(pools, by_host.values()):
+                for material_id in ids:
+                    pool.submit(self._fetch_one, material_id)
+        finally:
+            for pool in pools:
+                pool.shutdown(wait=True)
+
+    def _save(self):
+        try:
+            prices = {row['id']: row['new_price'] for row in self.rows.values()
+                      if row['status'] in (UPDATED, UNCHANGED)}
+            if self.save:
+                self.saved = self.db.update_material_prices(prices)
+        except Exception as e:
+            print(f"Error saving refreshed prices: {e}")
+            self.error = self.error or str(e)
+        finally:
+            with self._lock:
+                self.finished = True
+                self._version += 1
+            self._done.set()
+
+
+class ListingRefreshJob(PriceRefreshJob):
+    """
+    Reprice materials from one supplier category/search listing.
+
+    The listing (all of its pages) is fetched once and every material whose
+    supplier URL appears on it takes the listed price; materials not on the
+    listing are skipped rather than fetched one by one.
+    """
+
+    def __init__(self, db: Database, listing_url: str, materials: List[Dict],
+                 scrape: Callable[..., List[Dict]] = scrape_listing):
+        super().__init__(db, materials)
+        self.listing_url = listing_url
+        self.scrape = scrape
+        self.listed_products = 0
+
+    def _collect(self):
+        for material_id in self.rows:
+            self._set(material_id, status=FETCHING)
+        products = []
+        if is_available(self.listing_url):
+            products = self.scrape(self.listing_url, max_age=PAGE_MAX_AGE)
+        self.listed_products = len(products)
+        supplier_down = not products and not is_available(self.listing_url)
+        matches = match_to_materials(products, self.rows.values())
+        for material_id in self.rows:
+            if supplier_down:
+                self._set(material_id, status=UNAVAILABLE)
+            elif self.cancelled:
+                self._set(material_id, status=CANCELLED)
+            elif material_id in matches:
+                self._record(material_id, matches[material_id])
+            else:
+                self._set(material_id, status=SKIPPED)
+
+    def _save(self):
+        # Rows still marked fetching (the listing failed to load) didn't get a price
+        for row in self.rows.values():
+            if row['status'] == FETCHING:
+                self._set(row['id'], status=FAILED)
+        super()._save()
+
+
+def listing_candidates(listing_url: str, materials: List[Dict]) -> List[Dict]:
+    """
+    Materials a listing can reprice: same supplier, with a supplier URL, and a
+    fixed price (listings show item prices, not the per-gram prices per_kg
+    materials are based on)
+    """
+    host = supplier_host(listing_url)
+    return [m for m in materials
+            if m.get('supplier_url') and supplier_host(m['supplier_url']) == host
+            and (m.get('pricing_type') or 'fixed') != 'per_kg']
+
+
+_current_job: Optional[PriceRefreshJob] = None
+_current_lock = threading.Lock()
+
+
+def get_current_job() -> Optional[PriceRefreshJob]:
+    """The most recent price refresh job (running or finished), if any"""
+    return _current_job
+
+
+def claim_current_job(make_job: Callable[[], PriceRefreshJob], background: bool = True) -> PriceRefreshJob:
+    """
+    Make a new job the current one, unless a refresh is already running.
+
+    Only one refresh runs at a time, whoever starts it (the UI or the
+    scheduler), so two jobs never fetch from the same suppliers and write the
+    same rows at once.
+
+    Args:
+        make_job: Builds the new job
+        background: Start it on its own thread; False marks it running for a
+                    caller that is about to run() it on its own thread
+
+    Returns:
+        The new job, or the job already running (check `is` to tell them apart)
+    """
+    global _current_job
+    with _current_lock:
+        if _current_job is not None and _current_job.running:
+            return _current_job
+        _current_job = make_job()
+        if background:
+            _current_job.start()
+        else:
+            _current_job.started_at = datetime.now()
+        return _current_job
+
+
+def start_price_refresh(db: Database, materials: List[Dict]) -> PriceRefreshJob:
+    """Start a price refresh, or return the one already running"""
+    return claim_current_job(lambda: PriceRefreshJob(db, materials))
+
+
+def start_listing_refresh(db: Database, listing_url: str, materials: List[Dict]) -> PriceRefreshJob:
+    """Start repricing from a category listing, or return the refresh already running"""
+    return claim_current_job(
+        lambda: ListingRefreshJob(db, listing_url, listing_candidates(listing_url, materials)))
+
+
+def stop_current_job(timeout: Optional[float] = None):
+    """Cancel the running job, if any, and wait for it to save what it has fetched (call on shutdown)"""
+    job = _current_job
+    if job is not None and job.running:
+        job.cancel()
+        if not job.wait(timeout):
+            print("⚠️ Price refresh still saving at shutdown")
@@ -0,0 +1,117 @@
+"""Background refresh of supplier prices, a few materials at a time.
+
+Every BATCH_INTERVAL seconds the scheduler takes the BATCH_SIZE materials most
+in need of a check - stalest first, weighted by how often they are bought
+(see Database.get_price_refresh_queue) - and refreshes them with the same job
+as "Update All Prices". Each batch is saved in one transaction and only prices
+that changed are written, so the catalogue stays current without anyone
+pressing a button and without rewriting rows that are already right.
+
+Configured with environment variables:
+    PRICE_SCHEDULE_INTERVAL   seconds between batches (0 disables the scheduler)
+    PRICE_SCHEDULE_BATCH      materials per batch
+"""
+import os
+import threading
+from typing import Dict, Optional
+
+import price_refresh
+from database import Database
+
+BATCH_INTERVAL = int(os.environ.get('PRICE_SCHEDULE_INTERVAL', 5 * 60))
+BATCH_SIZE = int(os.environ.get('PRICE_SCHEDULE_BATCH', 5))
+
+# Materials checked more recently than this are left alone
+MIN_AGE_HOURS = 24
+
+
+class PriceRefreshScheduler:
+    """Refresh the stalest, most-used material prices in small background batches"""
+
+    def __init__(self, db: Database, interval: int = BATCH_INTERVAL, batch_size: int = BATCH_SIZE,
+                 min_age_hours: float = MIN_AGE_HOURS):
+        self.db = db
+        self.interval = interval
+        self.batch_size = batch_size
+        self.min_age_hours = min_age_hours
+        self.last_batch: Optional[Dict] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._job: Optional[price_refresh.PriceRefreshJob] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start refreshing in the background (no-op if disabled or already running)"""
+        if self.interval <= 0 or self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='price-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop the scheduler; a batch in progress stops fetching and saves what it has"""
+        self._stop.set()
+        if self._job is not None:
+            self._job.cancel()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_batch()
+            except Exception as e:
+                print(f"Error in scheduled price refresh: {e}")
+
+    def run_batch(self) -> Optional[Dict]:
+        """
+        Refresh one batch now.
+
+        Returns:
+            The finished job's snapshot, or None if there was nothing to do or a
+            manual refresh was running
+        """
+        current = price_refresh.get_current_job()
+        if current is not None and current.running:
+            return None
+        materials = self.db.get_price_refresh_queue(self.batch_size, min_age_hours=self.min_age_hours)
+        if not materials:
+            return None
+
+        # Registered as the current job so "Update All Prices" waits for the
+        # batch (and shows its progress) instead of running alongside it
+        job = price_refresh.PriceRefreshJob(self.db, materials)
+        if price_refresh.claim_current_job(lambda: job, background=False) is not job:
+            return None
+        self._job = job
+        try:
+            job.run()
+        finally:
+            self._job = None
+        state = job.snapshot()
+        self.last_batch = state
+        if state['saved'] or state['failed'] or state['unavailable']:
+            print(f"🔄 Scheduled price refresh: {state['total']} checked, {state['saved']} changed, "
+                  f"{state['failed']} failed, {state['unavailable']} supplier unavailable")
+        return state
+
+
+_scheduler: Optional[PriceRefreshScheduler] = None
+
+
+def start(db: Database) -> PriceRefreshScheduler:
+    """Start the app-wide scheduler (call once the app is up)"""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = PriceRefreshScheduler(db)
+    _scheduler.start()
+    return _scheduler
+
+
+def stop():
+    """Stop the app-wide scheduler (call on shutdown)"""
+    if _scheduler is not None:
+        _scheduler.stop(timeout=5)
@@ -1,275 +1,403 @@
 """Web scraping utilities for fetching material prices from suppliers"""
 import requests
-from bs4 import BeautifulSoup
 from typing import Optional, Dict
 import re
-import urllib3
+import http_cache
+import page_parser
 from metalclay_price_scraper import MetalClayPriceScraper
-
-# Disable SSL warnings when verify=False
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+from scraper_cache import results_cache, supplier_namespace
 
 # Initialize Metal Clay scraper
 metalclay_scraper = MetalClayPriceScraper()
 
 # Constants
-USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-REQUEST_TIMEOUT = 10
 VAT_RATE = 1.2
 
+# Seconds a parsed product is reused before the page is checked again
+PRODUCT_TTL = http_cache.DEFAULT_TTL
 
-def scrape_cooksongold_price(url: str) -> Optional[Dict[str, float]]:
+# Extraction patterns, compiled once
+PRICE_TEXT_RE = re.compile(r'£\d+\.\d+')
+PRICE_RE = re.compile(r'£(\d+\.\d+)')
+PER_KG_RE = re.compile(r'([\d,]+\.?\d*)\s*per\s*kg', re.IGNORECASE)
+# (?!\w) negative lookahead ensures we don't match "per gram"
+PER_G_RE = re.compile(r'([\d,]+\.?\d*)\s*per\s*g(?!\w)', re.IGNORECASE)
+WEIGHT_PER_100_PATTERNS = [
+    # "Approx. weight of 100 [items] is X.Xg"
+    re.compile(r'(?:approx(?:imate)?\.?\s+)?weight\s+(?:of\s+)?100\s+(?:\w+\s+)?(?:is\s+)?(\d+\.?\d*)\s*g', re.IGNORECASE),
+    # "Weight per 100: X.Xg"
+    re.compile(r'weight\s+per\s+100[:\s]+(\d+\.?\d*)\s*g', re.IGNORECASE),
+    # "100 pieces weigh approximately X.Xg"
+    re.compile(r'100\s+(?:pieces|items|rings|units)\s+weigh\s+(?:approx(?:imately)?\.?\s+)?(\d+\.?\d*)\s*g', re.IGNORECASE),
+]
+# Looser match for weight info inside a single list/table cell
+WEIGHT_ITEM_RE = re.compile(r'(?:weight|approx).*?100.*?(\d+\.?\d*)\s*g', re.IGNORECASE)
+
+
+# ============ PAGE PARSERS (work on a page_parser.parse_page() tree) ============
+
+def parse_structured_price(doc) -> Optional[Dict[str, float]]:
+    """Fixed price from schema.org JSON-LD product data"""
+    return page_parser.offer_prices(page_parser.json_ld_offer(doc), VAT_RATE)
+
+
+def parse_microdata_price(doc) -> Optional[Dict[str, float]]:
+    """Fixed price from schema.org microdata (a plain itemprop="price" amount)"""
+    return page_parser.offer_prices(page_parser.microdata_offer(doc), VAT_RATE)
+
+
+def parse_fixed_price(doc) -> Optional[Dict[str, float]]:
     """
-    Scrape fixed price from Cooksongold product page for items sold as single units or packs.
-    
-    This function looks for prices displayed on the page in common formats like:
+    Parse a fixed (per item / per pack) price from the text of a Cooksongold product page.
+
+    Looks for prices displayed on the page in common formats like:
     - "£3.32" (with VAT)
     - "£2.77 exc. VAT" (excluding VAT)
-    
+
+    Returns:
+        Dict with 'inc_vat' and 'exc_vat' prices, or None if no price was found
+    """
+    # Product-detail text first; the whole page when the price sits in other markup
+    return _fixed_price(page_parser.price_texts(doc)) or \
+        _fixed_price(page_parser.price_texts(doc, whole_page=True))
+
+
+def _fixed_price(texts) -> Optional[Dict[str, float]]:
+    price_inc_vat = None
+    price_exc_vat = None
+
+    # Text containing a £ price
+    for text in texts:
+        if not PRICE_TEXT_RE.search(text):
+            continue
+        text = text.strip()
+        lowered = text.lower()
+
+        # Extract price with VAT (usually just "£X.XX")
+        if 'exc' not in lowered and price_inc_vat is None:
+            match = PRICE_RE.search(text)
+            if match:
+                price_inc_vat = float(match.group(1))
+
+        # Extract price excluding VAT
+        if 'exc' in lowered and 'vat' in lowered:
+            match = PRICE_RE.search(text)
+            if match:
+                price_exc_vat = float(match.group(1))
+
+    # If we found at least the inc VAT price, return it
+    if price_inc_vat is not None:
+        return {
+            'inc_vat': price_inc_vat,
+            'exc_vat': price_exc_vat if price_exc_vat else price_inc_vat / VAT_RATE
+        }
+
+    return None
+
+
+def parse_per_gram_price(doc) -> Optional[Dict[str, float]]:
+    """
+    Parse per-gram pricing from the structured price meta tag of a Cooksongold page.
+
+    Reads the meta tag: <meta itemprop="price" content="4072.910 per kg"/>
+
+    Handles both formats:
+    - "per kg" (e.g., £2,889.44 per kg) - automatically converts to per gram
+    - "per g" (e.g., £4.16 per g) - uses value directly
+
+    Returns:
+        Dict with 'inc_vat' (price per gram) and 'exc_vat' prices, or None if not found
+    """
+    content = page_parser.meta_itemprop(doc, 'price')
+    if content:
+
+        # Check for "per kg" format first (needs conversion)
+        match = PER_KG_RE.search(content)
+        if match:
+            price_str = match.group(1).replace(',', '')
+            price_per_gram = float(price_str) / 1000
+            return {
+                'inc_vat': price_per_gram,
+                'exc_vat': price_per_gram / VAT_RATE
+            }
+
+        # Check for "per g" format (already in grams)
+        match = PER_G_RE.search(content)
+        if match:
+            price_str = match.group(1).replace(',', '')
+            price_per_gram = float(price_str)
+            return {
+                'inc_vat': price_per_gram,
+                'exc_vat': price_per_gram / VAT_RATE
+            }
+
+    return None
+
+
+def parse_weight_per_100(doc) -> Optional[float]:
+    """
+    Parse the weight of 100 units (in grams) from a product page.
+
+    Looks for patterns like:
+    - "Approx. weight of 100 jump rings is 12.7g"
+    - "Weight per 100: 8.5g"
+    - "100 pieces weigh approximately 15.2g"
+    """
+    # Text of the product-detail tags, then of the whole page
+    for whole_page in (False, True):
+        page_text = page_parser.product_text(doc, whole_page)
+        for pattern in WEIGHT_PER_100_PATTERNS:
+            match = pattern.search(page_text)
+            if match:
+                return float(match.group(1))
+
+    # Look in bullet points or lists for weight info
+    # This catches formats in structured lists
+    for cell in page_parser.spec_cells(doc):
+        match = WEIGHT_ITEM_RE.search(cell)
+        if match:
+            return float(match.group(1))
+
+    return None
+
+
+def parse_title(doc) -> Optional[str]:
+    """Product title from the page heading (or the og:title meta tag)"""
+    title = page_parser.heading(doc) or page_parser.meta_property(doc, 'og:title')
+    return title.strip() if title else None
+
+
+# Fixed-price extractors, cheapest and most reliable first. The one that worked
+# last for a supplier is tried first (see page_parser.StrategyMemo).
+FIXED_PRICE_STRATEGIES = [
+    ('json_ld', parse_structured_price),
+    ('microdata', parse_microdata_price),
+    ('page_text', parse_fixed_price),
+]
+
+
+def extract_fixed_price(doc, url: str) -> Optional[Dict[str, float]]:
+    """Fixed inc/exc VAT price, trying structured data before the text heuristics"""
+    return page_parser.strategy_memo.run(supplier_namespace(url), FIXED_PRICE_STRATEGIES, doc)
+
+
+# ============ SINGLE-FETCH PRODUCT EXTRACTION ============
+
+def extract_product(content, url: str) -> Dict:
+    """Run every extractor over one parsed product page (see fetch_product for the fields)"""
+    doc = page_parser.parse_page(content)
+    product = _empty_product(url)
+    product['title'] = parse_title(doc)
+
+    # Prices are only read from supplier layouts we know
+    if 'cooksongold.com' in url:
+        fixed = extract_fixed_price(doc, url)
+        if fixed:
+            product['inc_vat'] = fixed['inc_vat']
+            product['exc_vat'] = fixed['exc_vat']
+        per_gram = parse_per_gram_price(doc)
+        if per_gram:
+            product['per_gram_inc_vat'] = per_gram['inc_vat']
+            product['per_gram_exc_vat'] = per_gram['exc_vat']
+
+    weight_per_100 = parse_weight_per_100(doc)
+    if weight_per_100 is not None:
+        product['weight_per_100'] = weight_per_100
+        product['weight_per_unit'] = weight_per_100 / 100
+
+    return product
+
+
+def fetch_product(url: str, max_age: Optional[int] = None) -> Optional[Dict]:
+    """
+    Download and parse a supplier product page once, extracting every field we know about.
+
     Args:
-        url: The Cooksongold product page URL
-    
+        url: The supplier product page URL
+        max_age: Seconds a cached result or page may be used without revalidating
+                 (defaults to PRODUCT_TTL; 0 always asks the supplier, which costs
+                 only a 304 when the page hasn't changed)
+
     Returns:
-        Dict with 'inc_vat' and 'exc_vat' prices, or None if scraping fails
-        
+        Dict with the fields below (any of which may be None if not found on the page),
+        or None if the page could not be fetched:
+        - 'url', 'title'
+        - 'inc_vat', 'exc_vat': fixed price per item/pack
+        - 'per_gram_inc_vat', 'per_gram_exc_vat': weight-based price per gram
+        - 'weight_per_100': grams per 100 units, 'weight_per_unit': grams per unit
+
     Example:
-        >>> scrape_cooksongold_price("https://www.cooksongold.com/...")
-        {'inc_vat': 3.32, 'exc_vat': 2.77}
+        >>> fetch_product("https://www.cooksongold.com/.../Jump-Ring/...")
+        {'url': '...', 'title': 'Sterling Silver Jump Ring ...', 'inc_vat': 3.32, 'exc_vat': 2.77,
+         'per_gram_inc_vat': 2.8894, 'per_gram_exc_vat': 2.4078, 'weight_per_100': 12.7,
+         'weight_per_unit': 0.127}
     """
+    if 'metalclay.co.uk' in url:
+        # Metal Clay Ltd products - always fixed pricing, cached by the Metal Clay scraper
+        price_data = metalclay_scraper.fetch_product_price(url, max_age=max_age)
+        return _metalclay_product(url, price_data) if price_data else None
+
+    cached = results_cache.get(url, max_age=max_age)
+    if cached:
+        return cached
+
     try:
-        headers = {'User-Agent': USER_AGENT}
-        
-        response = requests.get(url, headers=headers, timeout=REQUEST_TIMEOUT, verify=False)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        price_inc_vat = None
-        price_exc_vat = None
-        
-        # Find all text containing £ symbol
-        price_elements = soup.find_all(string=re.compile(r'£\d+\.\d+'))
-        
-        for element in price_elements:
-            text = element.strip()
-            
-            # Extract price with VAT (usually just "£X.XX")
-            if 'exc' not in text.lower() and price_inc_vat is None:
-                match = re.search(r'£(\d+\.\d+)', text)
-                if match:
-                    price_inc_vat = float(match.group(1))
-            
-            # Extract price excluding VAT
-            if 'exc' in text.lower() and 'vat' in text.lower():
-                match = re.search(r'£(\d+\.\d+)', text)
-                if match:
-                    price_exc_vat = float(match.group(1))
-        
-        # If we found at least the inc VAT price, return it
-        if price_inc_vat is not None:
-            return {
-                'inc_vat': price_inc_vat,
-                'exc_vat': price_exc_vat if price_exc_vat else price_inc_vat / VAT_RATE
-            }
-        
-        return None
-        
+        # Served from the page cache while fresh, then revalidated (304 if unchanged);
+        # an unchanged page reuses its product instead of being parsed again
+        page = http_cache.get(url, ttl=max_age)
+        product = page.parsed
+        if product is None:
+            product = extract_product(page.content, url)
+            http_cache.save_parsed(url, product)
+        results_cache.set(url, product, ttl=PRODUCT_TTL)
+        return product
+
     except requests.exceptions.RequestException as e:
         print(f"Error fetching URL {url}: {e}")
         return None
     except Exception as e:
-        print(f"Error parsing price from {url}: {e}")
+        print(f"Error parsing product page {url}: {e}")
+        return None
+
+
+def cached_products(urls, max_age: Optional[int] = None) -> Dict[str, Dict]:
+    """
+    Fresh cached fetch_product() results for many URLs, as {url: product}.
+
+    Checks the whole list against the results cache in one query, so a batch
+    refresh only has to fetch the URLs missing from the result.
+    """
+    products = {}
+    for url, data in results_cache.get_many(urls, max_age=max_age).items():
+        products[url] = _metalclay_product(url, data) if 'metalclay.co.uk' in url else data
+    return products
+
+
+def _empty_product(url: str) -> Dict:
+    return {
+        'url': url,
+        'title': None,
+        'inc_vat': None,
+        'exc_vat': None,
+        'per_gram_inc_vat': None,
+        'per_gram_exc_vat': None,
+        'weight_per_100': None,
+        'weight_per_unit': None,
+    }
+
+
+def _metalclay_product(url: str, price_data: Dict) -> Dict:
+    """fetch_product() result from a MetalClayPriceScraper price record"""
+    product = _empty_product(url)
+    product['title'] = price_data.get('product_title')
+    product['inc_vat'] = price_data.get('price_inc_vat')
+    product['exc_vat'] = price_data.get('price_ex_vat')
+    return product
+
+
+def product_price(product: Optional[Dict], use_vat: bool = True, pricing_type: str = "fixed") -> Optional[float]:
+    """
+    Pick the price for a pricing type out of a fetch_product() result.
+
+    'per_kg' materials use the per-gram price; everything else uses the fixed price.
+    """
+    if not product:
         return None
+    if pricing_type == 'per_kg':  # Note: Despite name, always per GRAM
+        return product['per_gram_inc_vat'] if use_vat else product['per_gram_exc_vat']
+    return product['inc_vat'] if use_vat else product['exc_vat']
+
+
+# ============ SINGLE-FIELD HELPERS ============
+
+def scrape_cooksongold_price(url: str) -> Optional[Dict[str, float]]:
+    """
+    Scrape fixed price from Cooksongold product page for items sold as single units or packs.
+
+    Returns:
+        Dict with 'inc_vat' and 'exc_vat' prices, or None if scraping fails
+
+    Example:
+        >>> scrape_cooksongold_price("https://www.cooksongold.com/...")
+        {'inc_vat': 3.32, 'exc_vat': 2.77}
+    """
+    product = fetch_product(url)
+    if product and product['inc_vat'] is not None:
+        return {'inc_vat': product['inc_vat'], 'exc_vat': product['exc_vat']}
+    return None
 
 
 def scrape_cooksongold_per_gram_price(url: str) -> Optional[Dict[str, float]]:
     """
     Scrape per-gram pricing from Cooksongold product pages using structured meta tags.
-    
-    This function reads the meta tag: <meta itemprop="price" content="4072.910 per kg"/>
-    This is the most accurate and consistent source for weight-based pricing.
-    
-    Handles both formats:
-    - "per kg" (e.g., £2,889.44 per kg) - automatically converts to per gram
-    - "per g" (e.g., £4.16 per g) - uses value directly
-    
-    Works for:
-    - Sheet silver
-    - Wire (round, D-shape, etc.)
-    - Bezel strips
-    - Tube
-    - Any other weight-based precious metal products
-    
-    Args:
-        url: The Cooksongold product page URL
-    
+
+    Works for sheet silver, wire (round, D-shape, etc.), bezel strips, tube and
+    any other weight-based precious metal products.
+
     Returns:
         Dict with 'inc_vat' (price per gram) and 'exc_vat' prices, or None if scraping fails
-        
+
     Example:
         >>> scrape_cooksongold_per_gram_price("https://www.cooksongold.com/.../Sheet/...")
         {'inc_vat': 2.8894, 'exc_vat': 2.4078}
     """
-    try:
-        headers = {'User-Agent': USER_AGENT}
-        
-        response = requests.get(url, headers=headers, timeout=REQUEST_TIMEOUT, verify=False)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Look for meta tag with price per kg or per g
-        meta_price = soup.find('meta', {'itemprop': 'price'})
-        if meta_price and 'content' in meta_price.attrs:
-            content = str(meta_price['content'])
-            
-            # Check for "per kg" format first (needs conversion)
-            match = re.search(r'([\d,]+\.?\d*)\s*per\s*kg', content, re.IGNORECASE)
-            if match:
-                price_str = match.group(1).replace(',', '')
-                price_per_kg = float(price_str)
-                price_per_gram = price_per_kg / 1000
-                return {
-                    'inc_vat': price_per_gram,
-                    'exc_vat': price_per_gram / VAT_RATE
-                }
-            
-            # Check for "per g" format (already in grams)
-            # (?!\w) negative lookahead ensures we don't match "per gram"
-            match = re.search(r'([\d,]+\.?\d*)\s*per\s*g(?!\w)', content, re.IGNORECASE)
-            if match:
-                price_str = match.group(1).replace(',', '')
-                price_per_gram = float(price_str)
-                return {
-                    'inc_vat': price_per_gram,
-                    'exc_vat': price_per_gram / VAT_RATE
-                }
-        
-        # If no meta tag found, return None
+    product = fetch_product(url)
+    if product and product['per_gram_inc_vat'] is not None:
+        return {'inc_vat': product['per_gram_inc_vat'], 'exc_vat': product['per_gram_exc_vat']}
+    if product:
         print(f"Warning: No price meta tag found for URL: {url}")
-        return None
-        
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching URL {url}: {e}")
-        return None
-    except Exception as e:
-        print(f"Error parsing per-gram price from {url}: {e}")
-        return None
+    return None
 
 
 def get_material_price_from_url(url: str, use_vat: bool = True, pricing_type: str = "fixed") -> Optional[float]:
     """
     Get material price from supplier URL.
-    
-    This is the main entry point for price scraping. It routes to the appropriate
-    scraper function based on the pricing type and supplier.
-    
+
+    This is the main entry point for price scraping when only the price is needed.
+    Use fetch_product() directly when other fields (e.g. weight) are needed too, so
+    the page is only downloaded once.
+
     Args:
         url: The supplier product page URL
         use_vat: If True, return price including VAT, otherwise excluding VAT
         pricing_type: Pricing model to use:
             - 'fixed': Standard per-item or per-pack pricing
             - 'per_kg': Weight-based pricing (returns price per gram)
-    
+
     Returns:
         Price as float, or None if scraping fails
         - For 'fixed': price per item/pack
         - For 'per_kg': price per gram (always in grams, never kg)
-        
+
     Example:
         >>> # Fixed price item
         >>> get_material_price_from_url(url, use_vat=True, pricing_type='fixed')
         3.32
-        
+
         >>> # Weight-based item (returns price per gram)
         >>> get_material_price_from_url(url, use_vat=True, pricing_type='per_kg')
         2.8894
     """
-    if 'cooksongold.com' in url:
-        if pricing_type == 'per_kg':  # Note: Despite name, always returns per GRAM
-            prices = scrape_cooksongold_per_gram_price(url)
-        else:
-            prices = scrape_cooksongold_price(url)
-            
-        if prices:
-            return prices['inc_vat'] if use_vat else prices['exc_vat']
-    
-    elif 'metalclay.co.uk' in url:
-        # Metal Clay Ltd products - always fixed pricing
-        price_data = metalclay_scraper.fetch_product_price(url)
-        if price_data:
-            return price_data.get('price_inc_vat' if use_vat else 'price_ex_vat')
-    
-    return None
+    if 'cooksongold.com' not in url and 'metalclay.co.uk' not in url:
+        return None
+    return product_price(fetch_product(url), use_vat, pricing_type)
 
 
 def scrape_weight_per_unit(url: str) -> Optional[float]:
     """
     Scrape the weight per unit information from product pages.
-    
+
     This function looks for weight specifications on product pages, particularly
     for items like jump rings that are sold by weight but used individually.
-    
-    Looks for patterns like:
-    - "Approx. weight of 100 jump rings is 12.7g"
-    - "Weight per 100: 8.5g"
-    - "100 pieces weigh approximately 15.2g"
-    
-    Args:
-        url: The supplier product page URL
-    
+
     Returns:
         Weight in grams per single unit (not per 100), or None if not found
-        
+
     Example:
         >>> scrape_weight_per_unit("https://www.cooksongold.com/.../Jump-Ring/...")
         0.127  # 12.7g / 100 = 0.127g per ring
     """
-    try:
-        headers = {'User-Agent': USER_AGENT}
-        
-        response = requests.get(url, headers=headers, timeout=REQUEST_TIMEOUT, verify=False)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Get all text from the page
-        page_text = soup.get_text()
-        
-        # Pattern 1: "Approx. weight of 100 [items] is X.Xg"
-        match = re.search(r'(?:approx(?:imate)?\.?\s+)?weight\s+(?:of\s+)?100\s+(?:\w+\s+)?(?:is\s+)?(\d+\.?\d*)\s*g', page_text, re.IGNORECASE)
-        if match:
-            weight_per_100 = float(match.group(1))
-            return weight_per_100 / 100  # Convert to per single unit
-        
-        # Pattern 2: "Weight per 100: X.Xg"
-        match = re.search(r'weight\s+per\s+100[:\s]+(\d+\.?\d*)\s*g', page_text, re.IGNORECASE)
-        if match:
-            weight_per_100 = float(match.group(1))
-            return weight_per_100 / 100
-        
-        # Pattern 3: "100 pieces weigh approximately X.Xg"
-        match = re.search(r'100\s+(?:pieces|items|rings|units)\s+weigh\s+(?:approx(?:imately)?\.?\s+)?(\d+\.?\d*)\s*g', page_text, re.IGNORECASE)
-        if match:
-            weight_per_100 = float(match.group(1))
-            return weight_per_100 / 100
-        
-        # Pattern 4: Look in bullet points or lists for weight info
-        # This catches formats in structured lists
-        list_items = soup.find_all(['li', 'td', 'dd'])
-        for item in list_items:
-            text = item.get_text()
-            match = re.search(r'(?:weight|approx).*?100.*?(\d+\.?\d*)\s*g', text, re.IGNORECASE)
-            if match:
-                weight_per_100 = float(match.group(1))
-                return weight_per_100 / 100
-        
+    product = fetch_product(url)
+    if product and product['weight_per_unit'] is None:
         print(f"Info: No weight per unit information found for URL: {url}")
-        return None
-        
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching URL {url}: {e}")
-        return None
-    except Exception as e:
-        print(f"Error parsing weight info from {url}: {e}")
-        return None
+    return product['weight_per_unit'] if product else None
@@ -0,0 +1,161 @@
+"""
+Refresh supplier prices from the command line, outside the web app.
+
+Runs the same refresh as "Update All Prices" (concurrent fetches capped per
+supplier, change-only writes in one transaction, fast-fail for suppliers that
+are down) without a browser, so the catalogue can be repriced overnight from
+cron instead of competing with live users for the app's event loop and the
+database write lock.
+
+    python refresh_prices.py                              # every active material with a supplier URL
+    python refresh_prices.py --supplier cooksongold --stale-hours 24
+    python refresh_prices.py --category "Sheet Silver" --category Wire --workers 2
+    python refresh_prices.py --output summary.csv         # or .json
+    python refresh_prices.py --dry-run                    # fetch and report, don't save
+
+Exit codes:
+    0  every price was checked and saved
+    1  some prices could not be fetched (failed or supplier unavailable)
+    2  nothing could be refreshed, or the prices could not be saved
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+from typing import Dict, List
+
+import price_refresh
+from database import Database
+
+EXIT_OK = 0
+EXIT_PARTIAL = 1
+EXIT_FAILED = 2
+
+SUMMARY_FIELDS = ['id', 'name', 'category', 'supplier', 'supplier_url', 'pricing_type',
+                  'status', 'old_price', 'new_price', 'delta']
+
+
+def select_materials(db: Database, suppliers: List[str], categories: List[str],
+                     stale_hours: float, limit: int) -> List[Dict]:
+    """Active materials with supplier URLs matching the filters, most in need of a check first"""
+    # Spot-linked materials too: the scheduler only re-scrapes them monthly, but
+    # an explicit refresh should recalibrate them from their supplier page
+    materials = db.get_price_refresh_queue(-1, min_age_hours=stale_hours, recalibrate_days=None)
+    if suppliers:
+        wanted = [s.lower() for s in suppliers]
+        materials = [m for m in materials
+                     if any(s in (m.get('supplier') or '').lower()
+                            or s in price_refresh.supplier_host(m['supplier_url']) for s in wanted)]
+    if categories:
+        wanted = {c.lower() for c in categories}
+        materials = [m for m in materials if (m.get('category') or '').lower() in wanted]
+    return materials[:limit] if limit else materials
+
+
+def summary_rows(materials: List[Dict], state: Dict) -> List[Dict]:
+    """One summary row per material: old price, new price and the change"""
+    rows_by_id = {row['id']: row for row in state['rows']}
+    summary = []
+    for material in materials:
+        row = rows_by_id[material['id']]
+        new_price = row['new_price']
+        summary.append({
+            'id': material['id'],
+            'name': material['name'],
+            'category': material.get('category'),
+            'supplier': material.get('supplier'),
+            'supplier_url': material['supplier_url'],
+            'pricing_type': row['pricing_type'],
+            'status': row['status'],
+            'old_price': row['old_price'],
+            'new_price': new_price,
+            'delta': round(new_price - (row['old_price'] or 0), 4) if new_price is not None else None,
+        })
+    return summary
+
+
+def write_summary(path: str, rows: List[Dict], totals: Dict):
+    """Write the summary as CSV or JSON, chosen by the file extension"""
+    if path.lower().endswith('.csv'):
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'totals': totals, 'materials': rows}, f, indent=2)
+
+
+def exit_code(totals: Dict) -> int:
+    if totals['error'] or (totals['checked'] and not totals['updated'] + totals['unchanged']):
+        return EXIT_FAILED
+    if totals['failed'] or totals['unavailable']:
+        return EXIT_PARTIAL
+    return EXIT_OK
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--db', default='jewelry_business.db', help='database file (default: %(default)s)')
+    parser.add_argument('--supplier', action='append', default=[],
+                        help='only materials from this supplier (name or website; repeatable)')
+    parser.add_argument('--category', action='append', default=[],
+                        help='only materials in this category (repeatable)')
+    parser.add_argument('--stale-hours', type=float, default=0,
+                        help='only materials not checked for this many hours')
+    parser.add_argument('--limit', type=int, default=0, help='refresh at most this many materials')
+    parser.add_argument('--workers', type=int, default=price_refresh.PER_SUPPLIER_LIMIT,
+                        help='concurrent requests per supplier (default: %(default)s)')
+    parser.add_argument('--output', help='write a summary to this .json or .csv file')
+    parser.add_argument('--dry-run', action='store_true', help="fetch prices but don't save them")
+    args = parser.parse_args()
+
+    db = Database(args.db)
+    materials = select_materials(db, args.supplier, args.category, args.stale_hours, args.limit)
+    if not materials:
+        print('No materials to refresh')
+        if args.output:
+            write_summary(args.output, [], {'checked': 0})
+        return EXIT_OK
+
+    print(f"🔄 Refreshing {len(materials)} prices ({args.workers} per supplier)...")
+    started = time.perf_counter()
+    job = price_refresh.PriceRefreshJob(db, materials, per_supplier=max(1, args.workers),
+                                        save=not args.dry_run)
+    job.run()
+    state = job.snapshot()
+
+    rows = summary_rows(materials, state)
+    totals = {
+        'checked': state['total'],
+        'updated': state['updated'],
+        'unchanged': sum(1 for row in rows if row['status'] == price_refresh.UNCHANGED),
+        'failed': state['failed'],
+        'unavailable': state['unavailable'],
+        'saved': state['saved'],
+        'dry_run': args.dry_run,
+        'error': state['error'],
+        'seconds': round(time.perf_counter() - started, 1),
+    }
+
+    for row in rows:
+        if row['status'] == price_refresh.UPDATED:
+            print(f"  {row['name']}: £{row['old_price']:.2f} → £{row['new_price']:.2f} ({row['delta']:+.2f})")
+        elif row['status'] in (price_refresh.FAILED, price_refresh.UNAVAILABLE):
+            print(f"  {row['name']}: {row['status']}")
+    saved = 'not saved (dry run)' if args.dry_run else f"{totals['saved']} saved"
+    print(f"✅ {totals['checked']} checked in {totals['seconds']}s: {totals['updated']} changed ({saved}), "
+          f"{totals['unchanged']} unchanged, {totals['failed']} failed, "
+          f"{totals['unavailable']} supplier unavailable")
+    if totals['error']:
+        print(f"⚠️ Could not save prices: {totals['error']}")
+
+    if args.output:
+        write_summary(args.output, rows, totals)
+        print(f"Summary written to {args.output}")
+    return exit_code(totals)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
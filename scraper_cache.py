@@ -0,0 +1,207 @@
+"""Shared store for scraper results (product prices, silver price).
+
+Replaces the one-JSON-file-per-product caches: every result lives in one
+indexed SQLite table in the scraper cache database, keyed by supplier
+namespace and URL. Each write is one transaction, so a reader never sees a
+half-written entry. Entries count as stale after their TTL but are kept (the
+silver price falls back to its last known value) until the table grows past
+MAX_ENTRIES, when the oldest are evicted (checked every EVICT_EVERY writes). get_many() checks a whole
+catalogue's worth of URLs in one query.
+"""
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+from http_cache import CACHE_DB_PATH
+
+# Upper bound on stored results; the oldest are evicted beyond this
+MAX_ENTRIES = 5000
+
+# Writes between eviction checks; counting the table on every write would
+# cost a full index scan per fetched price, so it may briefly hold up to
+# this many entries over MAX_ENTRIES
+EVICT_EVERY = 100
+
+# SQLite's default limit on bound parameters is 999
+_QUERY_CHUNK = 500
+
+
+def supplier_namespace(url: str) -> str:
+    """Namespace for a URL's results - the supplier host without www."""
+    host = urlparse(url).netloc.lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+def seconds_until_midnight() -> int:
+    """TTL for results that should be refreshed once per calendar day"""
+    now = datetime.now()
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    return max(1, int((midnight - now).total_seconds()))
+
+
+class ScraperCache:
+    """Namespaced, TTL-bounded store of scraper results"""
+
+    def __init__(self, db_path: str = CACHE_DB_PATH, max_entries: int = MAX_ENTRIES,
+                 evict_every: int = EVICT_EVERY):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.evict_every = evict_every
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        self._writes_lock = threading.Lock()
+        self._writes = 0  # since the last eviction check
+
+    def get_connection(self):
+        """Create a cache database connection"""
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    self._init_schema(conn)
+                    self._initialized = True
+        return conn
+
+    def _init_schema(self, conn):
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS scraper_results (
+                namespace TEXT NOT NULL,
+                url TEXT NOT NULL,
+                data TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                PRIMARY KEY (namespace, url)
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_scraper_results_fetched ON scraper_results(fetched_at)')
+        conn.commit()
+
+    @staticmethod
+    def _is_fresh(fetched_at: float, expires_at: float, now: float, max_age: Optional[int]) -> bool:
+        if expires_at <= now:
+            return False
+        return max_age is None or now - fetched_at < max_age
+
+    # ---- reads ----
+
+    def get(self, url: str, namespace: Optional[str] = None, max_age: Optional[int] = None,
+            allow_expired: bool = False) -> Optional[Dict]:
+        """
+        Cached result for a URL, or None if missing or stale.
+
+        Args:
+            url: Result key
+            namespace: Defaults to the URL's supplier host
+            max_age: Also treat results older than this many seconds as stale
+            allow_expired: Return the result however old it is (for fallbacks)
+        """
+        namespace = namespace or supplier_namespace(url)
+        conn = self.get_connection()
+        try:
+            row = conn.execute(
+                'SELECT data, fetched_at, expires_at FROM scraper_results WHERE namespace = ? AND url = ?',
+                (namespace, url)
+            ).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        if not allow_expired and not self._is_fresh(row[1], row[2], time.time(), max_age):
+            return None
+        return json.loads(row[0])
+
+    def get_many(self, urls: Iterable[str], max_age: Optional[int] = None) -> Dict[str, Dict]:
+        """Fresh cached results for many URLs as {url: result}, in one query per namespace"""
+        by_namespace: Dict[str, List[str]] = {}
+        for url in set(urls):
+            by_namespace.setdefault(supplier_namespace(url), []).append(url)
+
+        now = time.time()
+        results = {}
+        conn = self.get_connection()
+        try:
+            for namespace, namespace_urls in by_namespace.items():
+                for start in range(0, len(namespace_urls), _QUERY_CHUNK):
+                    chunk = namespace_urls[start:start + _QUERY_CHUNK]
+                    placeholders = ','.join('?' * len(chunk))
+                    rows = conn.execute(
+                        f'''SELECT url, data, fetched_at, expires_at FROM scraper_results
+                            WHERE namespace = ? AND url IN ({placeholders}) AND expires_at > ?''',
+                        [namespace, *chunk, now]
+                    ).fetchall()
+                    for url, data, fetched_at, expires_at in rows:
+                        if self._is_fresh(fetched_at, expires_at, now, max_age):
+                            results[url] = json.loads(data)
+        finally:
+            conn.close()
+        return results
+
+    # ---- writes ----
+
+    def set(self, url: str, data: Dict, ttl: int, namespace: Optional[str] = None):
+        """Store a result for `ttl` seconds, now and then evicting the oldest entries if the store is full"""
+        namespace = namespace or supplier_namespace(url)
+        now = time.time()
+        conn = self.get_connection()
+        try:
+            with conn:
+                conn.execute(
+                    '''INSERT OR REPLACE INTO scraper_results (namespace, url, data, fetched_at, expires_at)
+                       VALUES (?, ?, ?, ?, ?)''',
+                    (namespace, url, json.dumps(data), now, now + ttl)
+                )
+                if self._eviction_due():
+                    self._evict(conn)
+        finally:
+            conn.close()
+
+    def _eviction_due(self) -> bool:
+        with self._writes_lock:
+            self._writes += 1
+            if self._writes < self.evict_every:
+                return False
+            self._writes = 0
+            return True
+
+    def _evict(self, conn):
+        excess = conn.execute('SELECT COUNT(*) FROM scraper_results').fetchone()[0] - self.max_entries
+        if excess > 0:
+            conn.execute(
+                '''DELETE FROM scraper_results WHERE rowid IN (
+                       SELECT rowid FROM scraper_results ORDER BY fetched_at LIMIT ?)''',
+                (excess,)
+            )
+
+    def expire(self, url: str, namespace: Optional[str] = None):
+        """Mark a result stale now, keeping it for allow_expired fallbacks"""
+        conn = self.get_connection()
+        try:
+            with conn:
+                conn.execute('UPDATE scraper_results SET expires_at = ? WHERE namespace = ? AND url = ?',
+                             (time.time(), namespace or supplier_namespace(url), url))
+        finally:
+            conn.close()
+
+    def delete(self, url: Optional[str] = None, namespace: Optional[str] = None):
+        """Delete one URL's result, a whole namespace, or (with no arguments) everything"""
+        conn = self.get_connection()
+        try:
+            with conn:
+                if url:
+                    conn.execute('DELETE FROM scraper_results WHERE namespace = ? AND url = ?',
+                                 (namespace or supplier_namespace(url), url))
+                elif namespace:
+                    conn.execute('DELETE FROM scraper_results WHERE namespace = ?', (namespace,))
+                else:
+                    conn.execute('DELETE FROM scraper_results')
+        finally:
+            conn.close()
+
+
+# Shared store used by all scrapers
+results_cache = ScraperCache()
@@ -0,0 +1,41 @@
+"""Entry points into the supplier scrapers, loaded on first use.
+
+The scrapers pull in lxml, the page parsers, the page and results caches and
+the Metal Clay scraper. None of that is needed to start the app or to show
+any page until a price is actually fetched, so pages and the refresh jobs
+call these functions instead of importing the scrapers directly. The first
+call imports the real module, and later calls go straight to it.
+"""
+from typing import Dict, Iterable, List, Optional
+
+
+def fetch_product(url: str, max_age: Optional[int] = None) -> Optional[Dict]:
+    """See price_scraper.fetch_product"""
+    import price_scraper
+    return price_scraper.fetch_product(url, max_age=max_age)
+
+
+def cached_products(urls, max_age: Optional[int] = None) -> Dict[str, Dict]:
+    """See price_scraper.cached_products"""
+    import price_scraper
+    return price_scraper.cached_products(urls, max_age=max_age)
+
+
+def product_price(product: Optional[Dict], use_vat: bool = True, pricing_type: str = "fixed") -> Optional[float]:
+    """See price_scraper.product_price"""
+    import price_scraper
+    return price_scraper.product_price(product, use_vat=use_vat, pricing_type=pricing_type)
+
+
+def scrape_listing(url: str, max_pages: Optional[int] = None, max_age: Optional[int] = None) -> List[Dict]:
+    """See listing_scraper.scrape_listing"""
+    import listing_scraper
+    if max_pages is None:
+        max_pages = listing_scraper.MAX_PAGES
+    return listing_scraper.scrape_listing(url, max_pages=max_pages, max_age=max_age)
+
+
+def match_to_materials(products: Iterable[Dict], materials: Iterable[Dict]) -> Dict[int, Dict]:
+    """See listing_scraper.match_to_materials"""
+    import listing_scraper
+    return listing_scraper.match_to_materials(products, materials)
@@ -1,18 +1,60 @@
-"""Fetch current silver price from Cooksongold"""
-import re
-import requests
-import urllib3
-from datetime import datetime, timedelta
-import json
+"""Fetch current silver price from Cooksongold (and any other configured sources)
+
+Pages read the price with current(), which never touches the network: it
+returns the last known price at once (stale-while-revalidate) and, when that
+price has expired, starts one background refresh shared by every open page.
+Pages poll `version` to pick up the new price when it arrives.
+"""
 import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+from database import Database
+from scraper_cache import ScraperCache, results_cache, seconds_until_midnight
+from silver_sources import FileSource, HedgedSilverPrice, PageSource, SilverSource
+
+COOKSONGOLD_URL = "https://www.cooksongold.com/Sheet/Sterling-Silver-Sheet-1.00mm-Fully-Annealed,-100-Recycled-Silver-prcode-CSA-100"
+
+# Optional local feed file with the price per kg, used alongside Cooksongold
+FEED_PATH = os.environ.get('SILVER_PRICE_FEED')
+
+# Minimum seconds between background refresh attempts, across all clients
+REFRESH_INTERVAL = 5 * 60
+
+def default_sources() -> List[SilverSource]:
+    """
+    Cooksongold, plus the feed file when SILVER_PRICE_FEED is set. Without the
+    feed there is a single live source, so nothing is hedged or cross-checked.
+    """
+    sources: List[SilverSource] = [PageSource('Cooksongold Sterling Silver 925', COOKSONGOLD_URL)]
+    if FEED_PATH:
+        sources.append(FileSource('Local price feed', FEED_PATH))
+    return sources
 
-# Disable SSL warnings
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 class SilverPriceFetcher:
-    def __init__(self, cache_file="silver_price_cache.json"):
-        self.cache_file = cache_file
-        self.cooksongold_url = "https://www.cooksongold.com/Sheet/Sterling-Silver-Sheet-1.00mm-Fully-Annealed,-100-Recycled-Silver-prcode-CSA-100"
+    namespace = 'silver'
+    
+    def __init__(self, cache: ScraperCache = results_cache, refresh_interval: float = REFRESH_INTERVAL,
+                 db: Optional[Database] = None, sources: Optional[Sequence[SilverSource]] = None):
+        self.cache = cache
+        # When set, every fetch is recorded in the price history and fresh prices
+        # reprice the materials linked to the silver spot price
+        self.db = db
+        self.cooksongold_url = COOKSONGOLD_URL  # also the cache key
+        self.sources = HedgedSilverPrice(sources if sources is not None else default_sources(), cache=cache)
+        self.refresh_interval = refresh_interval
+        # Last known price, kept in memory so pages can render without I/O
+        self._latest: Optional[Dict] = None
+        self._fresh_until = 0.0
+        self._loaded = False
+        self._refreshing = False
+        self._thread: Optional[threading.Thread] = None
+        self._last_attempt = 0.0
+        self._lock = threading.Lock()
+        self._version = 0  # bumped whenever a refresh finishes
         
     def get_cached_price(self):
         """Get price from cache if it's from today.
@@ -20,30 +62,47 @@ class SilverPriceFetcher:
         Note: This uses the local calendar day rather than a rolling 24-hour window.
         That matches the typical expectation of "refresh once per day".
         """
-        if not os.path.exists(self.cache_file):
-            return None
-        
         try:
-            with open(self.cache_file, 'r') as f:
-                cache_data = json.load(f)
-            
-            cached_time = datetime.fromisoformat(cache_data['timestamp'])
-            if cached_time.date() == datetime.now().date():
-                return cache_data
-            
+            return self.cache.get(self.cooksongold_url, namespace=self.namespace)
         except Exception as e:
             print(f"⚠️ Error reading cache: {e}")
-        
-        return None
+            return None
     
     def save_to_cache(self, price_data):
-        """Save price to cache"""
+        """Save price to cache until the end of the day"""
         try:
-            with open(self.cache_file, 'w') as f:
-                json.dump(price_data, f)
+            self.cache.set(self.cooksongold_url, price_data, ttl=seconds_until_midnight(), namespace=self.namespace)
         except Exception as e:
             print(f"⚠️ Error saving cache: {e}")
     
+    def record_history(self, price_data, is_fallback: bool = False):
+        """Append a fetched (or fallback) price to the price history"""
+        if self.db is None:
+            return
+        try:
+            self.db.add_silver_price(price_data['price_per_kg'], price_data.get('source', ''), is_fallback)
+        except Exception as e:
+            print(f"⚠️ Error recording silver price history: {e}")
+    
+    def reprice_linked_materials(self, price_data):
+        """Reprice every material linked to the silver price in one update"""
+        if self.db is None:
+            return
+        try:
+            changed = self.db.reprice_spot_linked('silver', price_data['price_per_gram'])
+            if changed:
+                print(f"✅ Repriced {changed} silver-linked materials")
+        except Exception as e:
+            print(f"⚠️ Error repricing silver-linked materials: {e}")
+    
+    def clear_cache(self):
+        """Expire the cached price so the next request fetches a fresh one.
+
+        The old price is kept as the fallback in case that fetch fails.
+        """
+        self.cache.expire(self.cooksongold_url, namespace=self.namespace)
+        self._fresh_until = 0.0
+    
     def fetch_price(self):
         """Fetch current silver price from Cooksongold"""
         try:
@@ -54,39 +113,29 @@ class SilverPriceFetcher:
                 return cached
             
             # Only print when actually fetching
-            print("🔍 Fetching fresh silver price from Cooksongold...")
-            
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
+            print("🔍 Fetching fresh silver price...")
             
-            # Disable SSL verification to avoid certificate issues on macOS
-            response = requests.get(self.cooksongold_url, headers=headers, timeout=10, verify=False)
-            response.raise_for_status()
+            # All sources at once, cross-checked; the best-ranked agreeing answer wins
+            result = self.sources.fetch()
             
-            # Look for price per kg pattern in the HTML
-            # Pattern: £2,939.35 or similar
-            price_pattern = r'£([\d,]+\.?\d*)\s*(?:</td>|per kg|/kg)'
-            matches = re.findall(price_pattern, response.text)
-            
-            if matches:
-                # Get the first price (usually the 1g price per kg)
-                price_str = matches[0].replace(',', '')
-                price = float(price_str)
+            if result:
+                source, price = result
                 
                 price_data = {
                     'price_per_kg': price,
                     'price_per_gram': price / 1000,
                     'timestamp': datetime.now().isoformat(),
-                    'source': 'Cooksongold Sterling Silver 925'
+                    'source': source
                 }
                 
                 self.save_to_cache(price_data)
-                print(f"✅ Fetched silver price: £{price:.2f}/kg (£{price/1000:.3f}/g)")
+                self.record_history(price_data)
+                self.reprice_linked_materials(price_data)
+                print(f"✅ Fetched silver price: £{price:.2f}/kg (£{price/1000:.3f}/g) from {source}")
                 
                 return price_data
             else:
-                print("⚠️ Could not find price on page")
+                print("⚠️ No silver price source answered")
                 return self._get_fallback_price()
                 
         except Exception as e:
@@ -96,15 +145,15 @@ class SilverPriceFetcher:
     def _get_fallback_price(self):
         """Return fallback price if fetch fails"""
         # Check cache even if it's old
-        if os.path.exists(self.cache_file):
-            try:
-                with open(self.cache_file, 'r') as f:
-                    cache_data = json.load(f)
-                    print(f"⚠️ Using old cached price from {cache_data['timestamp']}")
-                    cache_data['is_fallback'] = True
-                    return cache_data
-            except:
-                pass
+        try:
+            cache_data = self.cache.get(self.cooksongold_url, namespace=self.namespace, allow_expired=True)
+        except Exception:
+            cache_data = None
+        if cache_data:
+            print(f"⚠️ Using old cached price from {cache_data['timestamp']}")
+            cache_data['is_fallback'] = True
+            self.record_history(cache_data, is_fallback=True)
+            return cache_data
         
         # Don't show estimate - return None so dashboard shows "Unable to fetch"
         print("⚠️ No price available - unable to fetch and no cache exists")
@@ -114,6 +163,93 @@ class SilverPriceFetcher:
         """Get current silver price (cached or fresh)"""
         return self.fetch_price()
 
+    # ---- stale-while-revalidate ----
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    @property
+    def refreshing(self) -> bool:
+        return self._refreshing
+
+    def _load(self):
+        """Seed the in-memory price from the cache (once, on first use)"""
+        cached = self.get_cached_price()
+        if cached:
+            self._latest, self._fresh_until = cached, time.time() + seconds_until_midnight()
+        else:
+            try:
+                self._latest = self.cache.get(self.cooksongold_url, namespace=self.namespace, allow_expired=True)
+            except Exception:
+                self._latest = None
+        self._loaded = True
+
+    def current(self) -> Optional[Dict]:
+        """
+        The last known price, immediately, without waiting for the network.
+
+        Starts a background refresh if the price has expired. The result has
+        'is_stale' set while it is out of date; None means no price has ever
+        been fetched.
+        """
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._load()
+        self.revalidate()
+        if self._latest is None:
+            return None
+        return dict(self._latest, is_stale=time.time() >= self._fresh_until)
+
+    def revalidate(self, force: bool = False) -> bool:
+        """
+        Start a background refresh if the price has expired (or `force`).
+
+        Only one refresh runs at a time, and attempts are at least
+        refresh_interval seconds apart unless forced, however many pages ask.
+
+        Returns:
+            True if a refresh was started
+        """
+        now = time.time()
+        with self._lock:
+            if self._refreshing:
+                return False
+            if not force and (now < self._fresh_until or now - self._last_attempt < self.refresh_interval):
+                return False
+            self._refreshing = True
+            self._last_attempt = now
+        if force:
+            self.clear_cache()
+        self._thread = threading.Thread(target=self._refresh, name='silver-price', daemon=True)
+        self._thread.start()
+        return True
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for a background refresh to finish recording its price; True if none is running"""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        return not self._refreshing
+
+    def _refresh(self):
+        try:
+            price = self.fetch_price()
+            with self._lock:
+                if price and not price.get('is_fallback'):
+                    self._latest, self._fresh_until = price, time.time() + seconds_until_midnight()
+                elif price:
+                    self._latest = price
+        finally:
+            with self._lock:
+                self._refreshing = False
+                self._version += 1
+
+
+# Shared by all pages so every client sees (and waits on) the same refresh
+silver_fetcher = SilverPriceFetcher(db=Database())
+
 
 if __name__ == "__main__":
     # Test the fetcher
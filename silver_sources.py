@@ -0,0 +1,286 @@
+"""Silver price sources and the hedged fetch across them.
+
+A source is anything that can report a sterling silver price per kg: a
+supplier product page, or a local feed file kept up to date by another tool.
+HedgedSilverPrice.fetch() asks every source at once, so one slow source
+doesn't hold up the price. Once the first plausible answer is in it waits
+CROSS_CHECK_WINDOW for the others, drops any answer that agrees with none of
+them (while others agree) and returns the answer of the best-ranked source
+left. Sources are ranked by their success rate and latency, which are kept
+in the results cache so the ranking survives restarts, and are shown on the
+dashboard.
+
+By default there is one live source (the Cooksongold sheet page) plus an
+optional local feed file, so unless SILVER_PRICE_FEED is set there is
+nothing to hedge or cross-check and the price is Cooksongold's.
+"""
+import json
+import os
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import http_client
+from scraper_cache import ScraperCache
+
+# Price per kg in the HTML, e.g. £2,939.35</td> or £2,939.35 per kg
+PRICE_PER_KG_RE = re.compile(r'£([\d,]+\.?\d*)\s*(?:</td>|per kg|/kg)')
+
+# Seconds to wait for any plausible answer
+DEADLINE = 8.0
+
+# Once one answer is in, seconds to wait for others to cross-check it
+CROSS_CHECK_WINDOW = 0.5
+
+# Two answers agree when they are within this fraction of each other
+AGREEMENT_TOLERANCE = 0.05
+
+# Per-source stats live in the results cache under this namespace
+STATS_NAMESPACE = 'silver-sources'
+STATS_TTL = 90 * 24 * 60 * 60
+
+# Sterling silver prices per kg outside this range are parse errors, not prices
+PLAUSIBLE_RANGE = (200.0, 20000.0)
+
+# Smoothing for the per-source latency average
+LATENCY_SMOOTHING = 0.3
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='silver-source')
+
+
+class SilverSource(ABC):
+    """A source of the sterling silver price per kg"""
+
+    name = 'source'
+
+    @abstractmethod
+    def fetch(self) -> Optional[float]:
+        """Price per kg, or None if the source has no price right now"""
+
+
+class PageSource(SilverSource):
+    """A supplier page showing a price per kg"""
+
+    def __init__(self, name: str, url: str, pattern: re.Pattern = PRICE_PER_KG_RE, scale: float = 1.0):
+        """
+        Args:
+            name: Shown as the price's source
+            url: Page to fetch
+            pattern: Regex whose first group is the price per kg
+            scale: Factor converting the page's price to the sterling sheet
+                   price, for pages quoting a related product
+        """
+        self.name = name
+        self.url = url
+        self.pattern = pattern
+        self.scale = scale
+
+    def fetch(self) -> Optional[float]:
+        response = http_client.get(self.url)
+        # The first price per kg on the page (usually the 1g price per kg)
+        match = self.pattern.search(response.text)
+        return float(match.group(1).replace(',', '')) * self.scale if match else None
+
+
+class FileSource(SilverSource):
+    """A local feed file: {"price_per_kg": 2939.35} or just the number"""
+
+    def __init__(self, name: str, path: str, max_age: float = 24 * 60 * 60):
+        self.name = name
+        self.path = path
+        self.max_age = max_age  # older files are ignored
+
+    def fetch(self) -> Optional[float]:
+        if not os.path.exists(self.path) or time.time() - os.path.getmtime(self.path) > self.max_age:
+            return None
+        with open(self.path, encoding='utf-8') as f:
+            content = f.read().strip()
+        try:
+            data = json.loads(content)
+        except ValueError:
+            return None
+        value = data.get('price_per_kg') if isinstance(data, dict) else data
+        return float(value) if isinstance(value, (int, float)) else None
+
+
+def is_plausible(price: Optional[float]) -> bool:
+    return price is not None and PLAUSIBLE_RANGE[0] <= price <= PLAUSIBLE_RANGE[1]
+
+
+class SourceStats:
+    """Latency and success record of one source"""
+
+    def __init__(self):
+        self.attempts = 0
+        self.successes = 0
+        self.latency: Optional[float] = None  # smoothed seconds, successful fetches only
+        self.last_error: Optional[str] = None
+
+    @property
+    def success_rate(self) -> float:
+        # Untried sources count as reliable so they get a chance to prove it
+        return self.successes / self.attempts if self.attempts else 1.0
+
+    def record(self, ok: bool, seconds: float, error: Optional[str] = None):
+        self.attempts += 1
+        if ok:
+            self.successes += 1
+            self.latency = seconds if self.latency is None else \
+                LATENCY_SMOOTHING * seconds + (1 - LATENCY_SMOOTHING) * self.latency
+        else:
+            self.last_error = error
+
+    def mark_disagreed(self, price: float):
+        """Turn the last recorded success into a failure: its price agreed with no other source"""
+        self.successes -= 1
+        self.last_error = f'price {price} disagreed with the other sources'
+
+    def as_dict(self) -> Dict:
+        return {'attempts': self.attempts, 'success_rate': self.success_rate,
+                'latency': self.latency, 'last_error': self.last_error}
+
+    def saved(self) -> Dict:
+        return {'attempts': self.attempts, 'successes': self.successes,
+                'latency': self.latency, 'last_error': self.last_error}
+
+    @classmethod
+    def from_saved(cls, data: Dict) -> 'SourceStats':
+        stats = cls()
+        stats.attempts = data.get('attempts', 0)
+        stats.successes = data.get('successes', 0)
+        stats.latency = data.get('latency')
+        stats.last_error = data.get('last_error')
+        return stats
+
+
+def agree(a: float, b: float) -> bool:
+    return abs(a - b) <= AGREEMENT_TOLERANCE * min(a, b)
+
+
+class HedgedSilverPrice:
+    """Ask several silver sources at once, cross-check them and keep score of how each performs"""
+
+    def __init__(self, sources: Sequence[SilverSource], deadline: float = DEADLINE,
+                 cross_check_window: float = CROSS_CHECK_WINDOW, cache: Optional[ScraperCache] = None):
+        self.sources = list(sources)
+        self.deadline = deadline
+        self.cross_check_window = cross_check_window
+        # Where the stats are kept between restarts (None: memory only)
+        self.cache = cache
+        self._stats: Optional[Dict[str, SourceStats]] = None  # loaded on first use
+        self._lock = threading.Lock()
+
+    @property
+    def stats(self) -> Dict[str, SourceStats]:
+        with self._lock:
+            if self._stats is None:
+                self._stats = {source.name: SourceStats.from_saved(self._load_stats(source.name))
+                               for source in self.sources}
+            return self._stats
+
+    def _load_stats(self, name: str) -> Dict:
+        if self.cache is None:
+            return {}
+        try:
+            return self.cache.get(name, namespace=STATS_NAMESPACE, allow_expired=True) or {}
+        except Exception as e:
+            print(f"⚠️ Error reading silver source stats: {e}")
+            return {}
+
+    def _save_stats(self, names):
+        if self.cache is None:
+            return
+        stats = self.stats
+        for name in names:
+            try:
+                with self._lock:
+                    saved = stats[name].saved()
+                self.cache.set(name, saved, ttl=STATS_TTL, namespace=STATS_NAMESPACE)
+            except Exception as e:
+                print(f"⚠️ Error saving silver source stats: {e}")
+
+    def ranked(self) -> List[SilverSource]:
+        """Sources best first: most reliable, then fastest; the first is the primary"""
+        stats = self.stats
+
+        def score(source):
+            source_stats = stats[source.name]
+            return (-round(source_stats.success_rate, 1),
+                    source_stats.latency if source_stats.latency is not None else 0.0)
+        with self._lock:
+            return sorted(self.sources, key=score)
+
+    def _timed_fetch(self, source: SilverSource) -> Optional[float]:
+        stats = self.stats[source.name]
+        start = time.perf_counter()
+        try:
+            price = source.fetch()
+        except Exception as e:
+            print(f"⚠️ Silver price source {source.name} failed: {e}")
+            with self._lock:
+                stats.record(False, time.perf_counter() - start, str(e))
+            self._save_stats([source.name])
+            raise
+        ok = is_plausible(price)
+        with self._lock:
+            stats.record(ok, time.perf_counter() - start, None if ok else f'implausible price {price}')
+        self._save_stats([source.name])
+        return price if ok else None
+
+    def fetch(self) -> Optional[Tuple[str, float]]:
+        """
+        (source name, price per kg) from the best-ranked source whose answer
+        agrees with another, or None if no source answered plausibly in time.
+
+        After the first plausible answer the others get cross_check_window
+        seconds to arrive. When some answers agree, those agreeing with none
+        are dropped and count as failures for their source; when none agree
+        (or only one source answered) the best-ranked answer is used.
+        Sources still running carry on in the background so their latency
+        and success are still recorded.
+        """
+        ranked = self.ranked()
+        futures: Dict[Future, SilverSource] = {_executor.submit(self._timed_fetch, source): source
+                                               for source in ranked}
+        answers: Dict[str, float] = {}
+        pending = set(futures)
+        deadline = time.monotonic() + self.deadline
+        while pending:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None and future.result() is not None:
+                    answers[futures[future].name] = future.result()
+            if answers:
+                # Cross-check: give the others a moment to answer too
+                deadline = min(deadline, time.monotonic() + self.cross_check_window)
+
+        if not answers:
+            return None
+        order = [source.name for source in ranked if source.name in answers]
+        agreeing = [name for name in order
+                    if any(agree(answers[name], answers[other]) for other in order if other != name)]
+        if agreeing:
+            disagreeing = [name for name in order if name not in agreeing]
+            with self._lock:
+                for name in disagreeing:
+                    self._stats[name].mark_disagreed(answers[name])
+            self._save_stats(disagreeing)
+            for name in disagreeing:
+                print(f"⚠️ Ignoring silver price {answers[name]} from {name}: no other source agrees")
+            return agreeing[0], answers[agreeing[0]]
+        if len(order) > 1:
+            print(f"⚠️ Silver price sources disagree ({answers}); using {order[0]}")
+        return order[0], answers[order[0]]
+
+    def source_stats(self) -> Dict[str, Dict]:
+        """{source name: {'attempts', 'success_rate', 'latency', 'last_error'}}, best source first"""
+        ranked = self.ranked()
+        stats = self.stats
+        with self._lock:
+            return {source.name: stats[source.name].as_dict() for source in ranked}
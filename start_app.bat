@@ -27,6 +27,6 @@ echo Press Ctrl+C to stop the server
 echo ====================================
 echo.
 
-python app_new.py
+python app_new.py --production
 
 pause
@@ -23,4 +23,4 @@ source "venv/bin/activate"
 pip install --upgrade pip
 pip install -r requirements.txt
 
-exec "$PYTHON_BIN" app_new.py
+exec "$PYTHON_BIN" app_new.py --production
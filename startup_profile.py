@@ -0,0 +1,164 @@
+"""Where the app's startup time goes: `python app_new.py --profile-startup`.
+
+Records, from the moment app_new starts importing:
+    - the self time of every module imported on the main thread
+    - phases: all imports, the schema and backup checks run by
+      Database(), page registration, and the app's startup hooks
+    - when the app was ready and when the dashboard first answered
+
+Once the dashboard has answered, the report is printed (slowest first),
+written to startup_profile.json and the app shuts down, so the same command
+works for a one-off look and for benchmarks/startup_budget.py.
+"""
+import builtins
+import functools
+import json
+import sys
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+REPORT_PATH = 'startup_profile.json'
+
+# Slowest modules listed in the printed report (the JSON has them all)
+REPORT_MODULES = 20
+
+# Seconds to wait for the first response before giving up
+FIRST_RESPONSE_TIMEOUT = 60
+
+
+class StartupProfile:
+    """Import, phase and first-response timings of one app start"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.modules: Dict[str, float] = {}  # module: self time, children excluded
+        self.phases: Dict[str, Dict] = {}  # phase: {'seconds', 'calls'}
+        self.ready: Optional[float] = None
+        self.first_response: Optional[float] = None
+        self._thread = threading.get_ident()
+        self._children = []  # time spent in nested imports, one entry per import in progress
+        self._original_import = builtins.__import__
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    # ---- imports ----
+
+    def install(self):
+        """Start timing imports, and the Database and page registration phases"""
+        builtins.__import__ = self._timed_import
+        from nicegui import ui
+        from database import Database
+        self.time_calls(Database, 'init_database', 'schema checks')
+        self.time_calls(Database, 'check_and_create_backup', 'backup check')
+        self.time_calls(ui.page, '__call__', 'page registration')
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        # Already-loaded modules, relative imports and other threads' imports
+        # count toward the importing module
+        if level or name in sys.modules or threading.get_ident() != self._thread:
+            return self._original_import(name, globals, locals, fromlist, level)
+        self._children.append(0.0)
+        start = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            seconds = time.perf_counter() - start
+            children = self._children.pop()
+            if self._children:
+                self._children[-1] += seconds
+            else:
+                self.add_phase('imports', seconds)
+            self.modules[name] = self.modules.get(name, 0.0) + seconds - children
+
+    # ---- phases ----
+
+    def add_phase(self, name: str, seconds: float):
+        phase = self.phases.setdefault(name, {'seconds': 0.0, 'calls': 0})
+        phase['seconds'] += seconds
+        phase['calls'] += 1
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.perf_counter() - start)
+
+    def time_calls(self, owner, attribute: str, phase: str):
+        """Count every call of owner.attribute toward phase"""
+        original = getattr(owner, attribute)
+
+        @functools.wraps(original)
+        def timed(*args, **kwargs):
+            with self.phase(phase):
+                return original(*args, **kwargs)
+        setattr(owner, attribute, timed)
+
+    # ---- first response ----
+
+    def app_started(self, port: int):
+        """Call from app.on_startup: waits for the dashboard to answer, then reports and shuts down"""
+        self.ready = self.elapsed()
+        builtins.__import__ = self._original_import
+        threading.Thread(target=self._wait_for_first_response, args=(port,),
+                         name='startup-profile', daemon=True).start()
+
+    def _wait_for_first_response(self, port: int):
+        from nicegui import app
+        deadline = time.monotonic() + FIRST_RESPONSE_TIMEOUT
+        while time.monotonic() < deadline:
+            try:
+                with urllib.request.urlopen(f'http://127.0.0.1:{port}/', timeout=FIRST_RESPONSE_TIMEOUT) as response:
+                    response.read()
+                self.first_response = self.elapsed()
+                break
+            except OSError:
+                time.sleep(0.05)
+        print(self.report())
+        self.save()
+        app.shutdown()
+
+    # ---- report ----
+
+    def as_dict(self) -> Dict:
+        return {
+            'ready': self.ready,
+            'first_response': self.first_response,
+            'phases': dict(sorted(self.phases.items(), key=lambda item: -item[1]['seconds'])),
+            'modules': dict(sorted(self.modules.items(), key=lambda item: -item[1])),
+        }
+
+    def save(self, path: str = REPORT_PATH):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.as_dict(), f, indent=2)
+
+    def report(self) -> str:
+        data = self.as_dict()
+        first_response = f"{data['first_response']:.3f}s" if data['first_response'] is not None else 'no response'
+        lines = ['', 'Startup profile (seconds since app_new started importing)',
+                 f"  {'app ready':<24}{data['ready']:.3f}s",
+                 f"  {'first response':<24}{first_response}",
+                 '', 'Phases']
+        for name, phase in data['phases'].items():
+            lines.append(f"  {name:<24}{phase['seconds']:.3f}s  ({phase['calls']} calls)")
+        lines += ['', f'Slowest imports (self time, {len(data["modules"])} modules)']
+        for name, seconds in list(data['modules'].items())[:REPORT_MODULES]:
+            lines.append(f"  {name:<40}{seconds * 1000:8.1f} ms")
+        return '\n'.join(lines)
+
+
+profile: Optional[StartupProfile] = None
+
+
+def enable() -> StartupProfile:
+    """Start profiling; call before the app's own imports"""
+    global profile
+    if profile is None:
+        profile = StartupProfile()
+        profile.install()
+    return profile
@@ -0,0 +1,176 @@
+"""Per-supplier retries and circuit breaker for the scrapers.
+
+Every request made through http_client goes through here. Transient failures
+(connection errors, timeouts, 5xx and 429 responses) are retried with capped
+exponential backoff. Consecutive failures are counted per supplier host, and
+after FAILURE_THRESHOLD of them the supplier's circuit opens: further requests
+fail immediately with SupplierUnavailable instead of each waiting out its own
+timeout. After OPEN_FOR seconds a single trial request is let through, and
+its outcome closes the circuit again or keeps it open.
+"""
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional, TypeVar
+from urllib.parse import urlparse
+
+import requests
+
+# Attempts per request, including the first
+MAX_ATTEMPTS = 3
+
+# Backoff before retry n is BACKOFF_BASE * 2**(n-1) seconds, capped at BACKOFF_MAX
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 4.0
+
+# Consecutive failed attempts that open a supplier's circuit, and how long it stays open
+FAILURE_THRESHOLD = 5
+OPEN_FOR = 60
+
+# Circuit states
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+T = TypeVar('T')
+
+
+class SupplierUnavailable(requests.exceptions.ConnectionError):
+    """A supplier's circuit is open, so the request was not attempted"""
+
+
+def _host(url: str) -> str:
+    host = urlparse(url).netloc.lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+def is_transient(error: Exception) -> bool:
+    """Whether a request error is worth retrying (and counts against the supplier)"""
+    if isinstance(error, requests.exceptions.HTTPError):
+        status = error.response.status_code if error.response is not None else None
+        return status is None or status >= 500 or status == 429
+    return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+
+def backoff_delay(attempt: int) -> float:
+    """Seconds to wait before retry number `attempt` (1-based), with jitter"""
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempt - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+class CircuitBreaker:
+    """Failure tracking for one supplier host"""
+
+    def __init__(self, threshold: int = FAILURE_THRESHOLD, open_for: float = OPEN_FOR):
+        self.threshold = threshold
+        self.open_for = open_for
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def is_open(self) -> bool:
+        """True while requests should fail fast (a half-open trial counts as open)"""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.open_for:
+                return False
+            return self.state != CLOSED
+
+    def allow(self) -> bool:
+        """Whether a request may be made now; claims the trial request when half-opening"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.open_for:
+                self.state = HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.threshold:
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+
+class SupplierHealth:
+    """Circuit breakers for every supplier host seen so far"""
+
+    def __init__(self, max_attempts: int = MAX_ATTEMPTS, threshold: int = FAILURE_THRESHOLD,
+                 open_for: float = OPEN_FOR):
+        self.max_attempts = max_attempts
+        self.threshold = threshold
+        self.open_for = open_for
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, url: str) -> CircuitBreaker:
+        host = _host(url)
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(self.threshold, self.open_for)
+            return self._breakers[host]
+
+    def is_available(self, url: str) -> bool:
+        """False while the URL's supplier is failing fast"""
+        return not self.breaker(url).is_open()
+
+    def call(self, url: str, request: Callable[[], T]) -> T:
+        """
+        Make a request to a supplier with retries, respecting its circuit.
+
+        Raises:
+            SupplierUnavailable if the supplier's circuit is open (or opens while retrying)
+            The request's own exception if it fails for a non-transient reason, or
+            transiently on every attempt
+        """
+        breaker = self.breaker(url)
+        attempt = 1
+        while True:
+            if not breaker.allow():
+                raise SupplierUnavailable(f'{_host(url)} is unavailable (too many recent failures)')
+            try:
+                result = request()
+            except requests.exceptions.RequestException as e:
+                if not is_transient(e):
+                    # The supplier answered (e.g. 404) - it is up, the page is the problem
+                    breaker.record_success()
+                    raise
+                breaker.record_failure()
+                if attempt >= self.max_attempts or breaker.state == OPEN:
+                    raise
+                time.sleep(backoff_delay(attempt))
+                attempt += 1
+            else:
+                breaker.record_success()
+                return result
+
+    def status(self) -> Dict[str, Dict]:
+        """{host: {'state', 'failures'}} for display and logging"""
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {host: {'state': b.state, 'failures': b.failures} for host, b in breakers.items()}
+
+    def reset(self, url: Optional[str] = None):
+        """Close one supplier's circuit, or all of them"""
+        with self._lock:
+            if url:
+                self._breakers.pop(_host(url), None)
+            else:
+                self._breakers.clear()
+
+
+# Shared by all scrapers through http_client
+supplier_health = SupplierHealth()
+
+
+def is_available(url: str) -> bool:
+    """False while the URL's supplier is failing fast (see SupplierHealth)"""
+    return supplier_health.is_available(url)